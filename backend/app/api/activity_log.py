@@ -15,12 +15,14 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
-from elasticsearch import Elasticsearch
+from elasticsearch import AsyncElasticsearch
 from app.core.config import settings
 
 router = APIRouter(prefix="/api/activity", tags=["activity-log"])
 
-es = Elasticsearch(
+# Async client: log_activity runs inline in the GitHub/Slack/Jira action handlers, so a
+# blocking index call would stall the event loop for every other request
+es = AsyncElasticsearch(
     hosts=[settings.elasticsearch_url],
     api_key=settings.elasticsearch_api_key,
     verify_certs=True
@@ -61,7 +63,7 @@ async def log_activity(
             "metadata": metadata or {}
         }
         
-        es.index(
+        await es.index(
             index="activity-log",
             document=entry,
             refresh=True
@@ -100,7 +102,7 @@ async def get_recent_activities(
         if activity_type:
             query["bool"]["must"].append({"term": {"type": activity_type}})
         
-        result = es.search(
+        result = await es.search(
             index="activity-log",
             body={
                 "query": query,
@@ -132,7 +134,7 @@ async def get_activity_stats(hours: int = 24):
         now = datetime.utcnow()
         start_time = now - timedelta(hours=hours)
         
-        result = es.search(
+        result = await es.search(
             index="activity-log",
             body={
                 "query": {
@@ -189,7 +191,7 @@ async def get_activity_stats(hours: int = 24):
 async def get_github_activities(limit: int = 20):
     """Get GitHub-related activities (PRs, commits)"""
     try:
-        result = es.search(
+        result = await es.search(
             index="activity-log",
             body={
                 "query": {
@@ -219,7 +221,7 @@ async def get_github_activities(limit: int = 20):
 async def get_jira_activities(limit: int = 20):
     """Get Jira-related activities (tickets created)"""
     try:
-        result = es.search(
+        result = await es.search(
             index="activity-log",
             body={
                 "query": {"term": {"type": "jira_created"}},
@@ -247,7 +249,7 @@ async def get_jira_activities(limit: int = 20):
 async def get_slack_activities(limit: int = 20):
     """Get Slack-related activities (alerts sent)"""
     try:
-        result = es.search(
+        result = await es.search(
             index="activity-log",
             body={
                 "query": {"term": {"type": "slack_sent"}},
@@ -275,7 +277,7 @@ async def get_slack_activities(limit: int = 20):
 async def get_workflow_activities(limit: int = 20):
     """Get autonomous workflow executions"""
     try:
-        result = es.search(
+        result = await es.search(
             index="activity-log",
             body={
                 "query": {"term": {"type": "workflow_executed"}},
@@ -4,24 +4,298 @@ Supports incident registration and autonomous workflows
 """
 
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
+import asyncio
 import httpx
 import re
 import base64
+import logging
+import time
+from collections import defaultdict
 from datetime import datetime
 from github import Github
-from elasticsearch import Elasticsearch
+from elasticsearch import AsyncElasticsearch
 from app.core.config import settings
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/api/agent", tags=["agent-enhanced"])
 
+# Shared async Elasticsearch client (connection pool is reused across requests and
+# calls don't block the event loop)
+es = AsyncElasticsearch(
+    hosts=[settings.elasticsearch_url],
+    api_key=settings.elasticsearch_api_key,
+    verify_certs=True,
+    http_compress=True
+)
+
+# Incident IDs are matched case-insensitively so the message never needs upper-casing
+_INC_RE = re.compile(r'INC-\d+', re.IGNORECASE)
+# File paths are matched on the original message so their case is preserved
+_FILE_MENTION_RE = re.compile(r'([a-zA-Z0-9_/-]+\.(py|js|ts|md|json|yaml|yml|txt|java|go|rs))')
+_QUOTED_FILE_RE = re.compile(r'["\']([^"\']+\.(py|js|ts|tsx|jsx|md|txt|json|yaml|yml|sh|sql|html|css))["\']', re.IGNORECASE)
+_BARE_FILE_RE = re.compile(r'(\S+\.(py|js|ts|tsx|jsx|md|txt|json|yaml|yml|sh|sql|html|css))', re.IGNORECASE)
+_KW_FIX = ('fix incident', 'resolve incident', 'auto fix', 'trigger workflow')
+
+# Lowercase keyword -> candidate files it may refer to
+_FILE_KEYWORDS = {
+    'readme': ('README.md', 'readme.md', 'README'),
+    'documentation': ('README.md', 'DOCUMENTATION.md', 'docs/README.md'),
+    'config': ('config.py', 'config.json', 'config.yaml', 'settings.py'),
+    'main': ('main.py', 'app.py', 'index.js', 'index.ts'),
+    'auth': ('auth.py', 'authentication.py', 'auth_service.py'),
+    'payment': ('payment.py', 'payment_service.py', 'payments.py'),
+}
+
+# Simple confirmations (the whole message) that trigger a repository sync
+_CONFIRMATIONS = frozenset(['yes', 'proceed', 'yes proceed', 'go ahead', 'do it', 'ok', 'okay', 'sure'])
+
+# Keyword lists for intent detection (all lowercase, matched against the lowered message)
+_INTENT_KEYWORDS = {
+    'incident_request': ('fix', 'improve', 'update', 'change', 'issue', 'problem', 'incident', 'bug'),
+    'sync': ('sync', 'download', 'fetch'),
+    'repo': ('repository', 'repo', 'github', 'code'),
+    'show': ('show me', 'view', 'display', 'let me see'),
+    'view_file': ('view file', 'show file', 'get file', 'read file', 'file content'),
+    'sync_github': ('sync github', 'sync files', 'download github', 'sync code', 'sync repository'),
+    'search_code': ('search code', 'find code', 'search for', 'find in code'),
+    'register': ('register incident', 'create incident', 'new incident', 'report incident', 'create an incident'),
+    'fix': _KW_FIX,
+    'analyze': ('analyze', 'analysis', 'metrics', 'check', 'show me'),
+    'compare': ('compare', 'health', 'all services', 'which service'),
+}
+
+# One alternation per intent, so each check is a single scan instead of a loop of substring tests
+_INTENT_RES = {
+    intent: re.compile('|'.join(map(re.escape, keywords)))
+    for intent, keywords in _INTENT_KEYWORDS.items()
+}
+
+# Workflow step status -> icon (anything else is still in progress)
+_STATUS_ICON = {'completed': '✅', 'failed': '❌', 'skipped': '⏭️'}
+
+# Services users can refer to in chat
+_SERVICES = (
+    'api-gateway', 'auth-service', 'payment-service', 'user-service',
+    'order-service', 'inventory-service', 'notification-service',
+    'database', 'cache', 'frontend'
+)
+# Incidents can also be registered against the docs
+_DOC_SERVICES = ('readme', 'documentation')
+
+# Service name (and its space-separated spelling) -> canonical service name
+_SERVICE_ALIASES = {
+    alias: service
+    for service in _SERVICES
+    for alias in (service, service.replace('-', ' '))
+}
+_SERVICE_RE = re.compile(
+    r'\b(?:' + '|'.join(map(re.escape, sorted(_SERVICE_ALIASES, key=len, reverse=True))) + r')\b'
+)
+
+# Read-only analysis endpoints return the same aggregates for every chat within a few seconds,
+# so their payloads are shared for a short TTL (path -> (fetched_at, data))
+_ANALYSIS_CACHE_TTL_SECONDS = 30.0
+_analysis_cache: Dict[str, Tuple[float, Any]] = {}
+_analysis_locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+
+# Workflow triggers arriving within a short window are sent upstream as one batch
+_WORKFLOW_BATCH_WINDOW_SECONDS = 0.05
+_WORKFLOW_BATCH_MAX_SIZE = 16
+_workflow_queue: Optional[asyncio.Queue] = None
+_workflow_batcher: Optional[asyncio.Task] = None
+# In-flight batch posts (referenced so they aren't garbage-collected mid-request)
+_workflow_batch_tasks: set = set()
+# Cleared the first time the upstream answers the batch endpoint with 404/405
+_workflow_batch_supported = True
+
+
+def _find_service(message: str) -> Optional[str]:
+    """Return the canonical name of the first service mentioned in the message"""
+    match = _SERVICE_RE.search(message)
+    return _SERVICE_ALIASES[match.group(0)] if match else None
+
+
+def _mentions(intent: str, message: str) -> bool:
+    """Check whether the message contains any keyword of the given intent"""
+    return _INTENT_RES[intent].search(message) is not None
+
 
 class ChatMessage(BaseModel):
     message: str
     conversation_history: List[Dict[str, str]] = []
 
 
+async def _fetch_analysis(client: httpx.AsyncClient, path: str) -> Any:
+    """
+    GET a read-only analysis endpoint, reusing a cached payload younger than the TTL.
+    Concurrent callers for the same path share one upstream request; non-200 responses
+    raise and are never cached.
+    """
+    cached = _analysis_cache.get(path)
+    if cached and time.monotonic() - cached[0] < _ANALYSIS_CACHE_TTL_SECONDS:
+        return cached[1]
+    
+    async with _analysis_locks[path]:
+        # Another request may have refreshed the entry while we waited for the lock
+        cached = _analysis_cache.get(path)
+        if cached and time.monotonic() - cached[0] < _ANALYSIS_CACHE_TTL_SECONDS:
+            return cached[1]
+        
+        response = await client.get(f"http://localhost:8001{path}")
+        response.raise_for_status()
+        data = response.json()
+        _analysis_cache[path] = (time.monotonic(), data)
+        return data
+
+
+async def _post_workflows_individually(client: httpx.AsyncClient, batch: List[Tuple[str, asyncio.Future]]):
+    """Fallback for upstreams without the batch endpoint: one trigger_workflow call per incident"""
+    responses = await asyncio.gather(*(
+        client.post(
+            "http://localhost:8001/api/incidents/trigger_workflow",
+            json={"incident_id": incident_id, "auto_approve": True}
+        )
+        for incident_id, _ in batch
+    ), return_exceptions=True)
+    
+    for (_, future), response in zip(batch, responses):
+        if future.done():
+            continue
+        if isinstance(response, Exception):
+            future.set_exception(response)
+        else:
+            future.set_result(response.json() if response.status_code == 200 else None)
+
+
+async def _post_workflow_batch(client: httpx.AsyncClient, batch: List[Tuple[str, asyncio.Future]]):
+    """Send one batch of workflow triggers upstream and resolve each caller's Future"""
+    global _workflow_batch_supported
+    
+    try:
+        if _workflow_batch_supported:
+            response = await client.post(
+                "http://localhost:8001/api/incidents/trigger_workflow_batch",
+                json={"incidents": [
+                    {"incident_id": incident_id, "auto_approve": True}
+                    for incident_id, _ in batch
+                ]}
+            )
+            
+            if response.status_code not in (404, 405):
+                response.raise_for_status()
+                for (_, future), item in zip(batch, response.json()['results']):
+                    if not future.done():
+                        future.set_result(item['workflow'] if item['status_code'] == 200 else None)
+                return
+            
+            # No batch endpoint upstream - don't probe it again
+            _workflow_batch_supported = False
+        
+        await _post_workflows_individually(client, batch)
+    except Exception as e:
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(e)
+
+
+async def _run_workflow_batcher():
+    """
+    Drain the workflow queue into batches of incidents. Each batch is posted by its own
+    task, so collecting the next batch never waits on an upstream round trip.
+    """
+    loop = asyncio.get_running_loop()
+    
+    async with httpx.AsyncClient(timeout=60.0) as client:
+        while True:
+            batch = [await _workflow_queue.get()]
+            deadline = loop.time() + _WORKFLOW_BATCH_WINDOW_SECONDS
+            
+            try:
+                while len(batch) < _WORKFLOW_BATCH_MAX_SIZE:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(_workflow_queue.get(), remaining))
+                    except asyncio.TimeoutError:
+                        break
+            except asyncio.CancelledError:
+                # Don't leave the callers already taken off the queue waiting forever
+                for _, future in batch:
+                    future.cancel()
+                raise
+            
+            task = asyncio.create_task(_post_workflow_batch(client, batch))
+            _workflow_batch_tasks.add(task)
+            task.add_done_callback(_workflow_batch_tasks.discard)
+
+
+async def _trigger_workflow(incident_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Queue an incident for the autonomous workflow and wait for its result.
+    Returns the workflow data, or None when the upstream rejected the incident.
+    """
+    global _workflow_queue, _workflow_batcher
+    
+    if _workflow_queue is None:
+        _workflow_queue = asyncio.Queue()
+    if _workflow_batcher is None or _workflow_batcher.done():
+        # The queue is kept, so a restarted batcher picks up anything still waiting in it
+        _workflow_batcher = asyncio.create_task(_run_workflow_batcher())
+    
+    future = asyncio.get_running_loop().create_future()
+    await _workflow_queue.put((incident_id, future))
+    return await future
+
+
+def _format_workflow(incident_id: str, data: Dict[str, Any]) -> str:
+    """Format a trigger_workflow result as markdown"""
+    lines = [f"# 🤖 Autonomous Workflow: {incident_id}\n"]
+    lines.append("## Workflow Execution\n")
+    
+    for step in data['workflow_steps']:
+        if step['status'] == 'completed':
+            detail = f"\n   {step.get('result', 'Completed')}"
+            if step.get('pr_url'):
+                detail += f"\n   PR: {step['pr_url']}"
+        elif step['status'] == 'failed':
+            detail = f"\n   Error: {step.get('error', 'Unknown error')}"
+        elif step['status'] == 'skipped':
+            detail = f"\n   {step.get('message', 'Skipped')}"
+        else:
+            detail = ""
+        
+        # One append per step; the trailing newline keeps the blank separator line
+        lines.append(f"{_STATUS_ICON.get(step['status'], '⏳')} **Step {step['step']}: {step['name']}**{detail}\n")
+    
+    summary = data['summary']
+    lines.append(f"""
+## Summary
+- Total Steps: {summary['total_steps']}
+- Completed: {summary['completed']} ✅
+- Failed: {summary['failed']} ❌
+- Skipped: {summary['skipped']} ⏭️""")
+    
+    if data.get('pr_url'):
+        lines.append(f"""
+🔗 **Pull Request**: {data['pr_url']}
+
+✅ **Next Steps**: Review and approve the PR for deployment""")
+    
+    return "\n".join(lines)
+
+
+@router.on_event("shutdown")
+async def close_es_client():
+    """Close the shared Elasticsearch client"""
+    await es.close()
+
+
 def get_github_client():
     """Get GitHub client"""
     if not settings.github_token:
@@ -29,240 +303,210 @@ def get_github_client():
     return Github(settings.github_token)
 
 
-@router.post("/chat_enhanced")
-async def chat_enhanced(request: ChatMessage):
-    """
-    Enhanced chat that detects analysis requests and provides rich responses
-    Supports: metrics analysis, incident registration, autonomous workflows, intelligent file handling
-    """
-    message = request.message.lower()
-    original_message = request.message
-    
-    # PRIORITY: Check for simple confirmations first (yes, proceed, etc.)
-    if message.strip() in ['yes', 'proceed', 'yes proceed', 'go ahead', 'do it', 'ok', 'okay', 'sure']:
-        # User confirmed - sync the configured repository
-        async with httpx.AsyncClient(timeout=120.0) as client:
-            try:
-                response = await client.post(
-                    "http://localhost:8001/api/github/sync_to_elasticsearch",
-                    json={"force": True}
-                )
+async def _handle_confirmation(request: ChatMessage, message: str) -> Optional[Dict[str, Any]]:
+    """User confirmed (yes, proceed, ...) - sync the configured repository"""
+    async with httpx.AsyncClient(timeout=120.0) as client:
+        try:
+            response = await client.post(
+                "http://localhost:8001/api/github/sync_to_elasticsearch",
+                json={"force": True}
+            )
+            
+            if response.status_code == 200:
+                data = response.json()
+                
+                result_lines = [f"✅ Synced {data['synced_count']} files from {data.get('repository', 'repository')}!"]
+                result_lines.append("\nWhat would you like to do now?")
                 
-                if response.status_code == 200:
-                    data = response.json()
-                    
-                    result_lines = [f"✅ Synced {data['synced_count']} files from {data.get('repository', 'repository')}!"]
-                    result_lines.append("\nWhat would you like to do now?")
-                    
-                    return {
-                        "response": "\n".join(result_lines),
-                        "type": "sync_complete",
-                        "synced_count": data['synced_count']
-                    }
-                else:
-                    return {
-                        "response": f"❌ Sync failed: {response.text}",
-                        "type": "error"
-                    }
-            except Exception as e:
                 return {
-                    "response": f"❌ Failed to sync: {str(e)}",
+                    "response": "\n".join(result_lines),
+                    "type": "sync_complete",
+                    "synced_count": data['synced_count']
+                }
+            else:
+                return {
+                    "response": f"❌ Sync failed: {response.text}",
                     "type": "error"
                 }
+        except Exception as e:
+            return {
+                "response": f"❌ Failed to sync: {str(e)}",
+                "type": "error"
+            }
+
+
+async def _handle_file_incident(request: ChatMessage, message: str) -> Optional[Dict[str, Any]]:
+    """Fix/improve request naming a file - register an incident against it"""
+    original_message = request.message
     
     # Intelligent file detection and handling
-    # Extract potential file references from the message
-    file_keywords = {
-        'readme': ['README.md', 'readme.md', 'README'],
-        'documentation': ['README.md', 'DOCUMENTATION.md', 'docs/README.md'],
-        'config': ['config.py', 'config.json', 'config.yaml', 'settings.py'],
-        'main': ['main.py', 'app.py', 'index.js', 'index.ts'],
-        'auth': ['auth.py', 'authentication.py', 'auth_service.py'],
-        'payment': ['payment.py', 'payment_service.py', 'payments.py'],
-    }
-    
     # Check if user is asking about a specific file or service
     detected_files = []
-    for keyword, possible_files in file_keywords.items():
+    for keyword, possible_files in _FILE_KEYWORDS.items():
         if keyword in message:
             detected_files.extend(possible_files)
     
     # Also check for explicit file mentions (e.g., "src/main.py")
-    import re
-    file_pattern = r'([a-zA-Z0-9_/-]+\.(py|js|ts|md|json|yaml|yml|txt|java|go|rs))'
-    explicit_files = re.findall(file_pattern, original_message)
+    explicit_files = _FILE_MENTION_RE.findall(original_message)
     if explicit_files:
         detected_files.extend([f[0] for f in explicit_files])
     
-    # Check for incident/fix/improve requests
-    is_incident_request = any(keyword in message for keyword in [
-        'fix', 'improve', 'update', 'change', 'issue', 'problem', 'incident', 'bug'
-    ])
+    if not detected_files:
+        return None
     
-    if is_incident_request and detected_files:
-        # User wants to fix something - check if we have the file
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            try:
-                # Search for the file in Elasticsearch
-                for file_path in detected_files:
-                    search_response = await client.get(
-                        f"http://localhost:8001/api/github/search_code?query={file_path}&limit=5"
-                    )
-                    
-                    if search_response.status_code == 200:
-                        search_data = search_response.json()
-                        
-                        if search_data['total'] > 0:
-                            # Found the file - create incident
-                            found_file = search_data['files'][0]
-                            
-                            # Register incident
-                            incident_response = await client.post(
-                                "http://localhost:8001/api/incidents/register",
-                                json={
-                                    "title": original_message[:100],
-                                    "service": found_file.get('service', 'general'),
-                                    "severity": "Sev-3",
-                                    "description": original_message,
-                                    "target_file": found_file['file_path']
-                                }
-                            )
-                            
-                            if incident_response.status_code == 200:
-                                incident_data = incident_response.json()
-                                return {
-                                    "response": f"""✅ Incident created: {incident_data['incident_id']}
-
-Target: {found_file['file_path']}
-Issue: {original_message}
-
-Want me to generate a fix? Say "fix it" or "create PR" """,
-                                    "type": "incident_created",
-                                    "incident_id": incident_data['incident_id']
-                                }
-                
-                # File not found - fetch it from GitHub
-                github = get_github_client()
-                repo = github.get_repo(f"{settings.github_owner}/{settings.github_repo}")
+    # User wants to fix something - check if we have the file
+    async with httpx.AsyncClient(timeout=30.0) as client:
+        try:
+            # Search for the file in Elasticsearch
+            for file_path in detected_files:
+                search_response = await client.get(
+                    f"http://localhost:8001/api/github/search_code?query={file_path}&limit=5"
+                )
                 
-                # Try to find the file in GitHub
-                for file_path in detected_files:
-                    try:
-                        file_content = repo.get_contents(file_path)
-                        
-                        # Found it! Download and index this specific file
-                        if file_content.encoding == "base64":
-                            import base64
-                            content = base64.b64decode(file_content.content).decode('utf-8')
-                        else:
-                            content = file_content.content
-                        
-                        # Index in Elasticsearch
-                        from elasticsearch import Elasticsearch
-                        from datetime import datetime
-                        
-                        es = Elasticsearch(
-                            hosts=[settings.elasticsearch_url],
-                            api_key=settings.elasticsearch_api_key,
-                            verify_certs=True
-                        )
-                        
-                        extension = file_path.split('.')[-1] if '.' in file_path else 'unknown'
-                        language_map = {
-                            'py': 'python', 'js': 'javascript', 'ts': 'typescript',
-                            'md': 'markdown', 'json': 'json', 'yaml': 'yaml'
-                        }
-                        language = language_map.get(extension, extension)
-                        
-                        doc = {
-                            "file_path": file_path,
-                            "file_name": file_content.name,
-                            "content": content,
-                            "language": language,
-                            "service": file_path.split('/')[0] if '/' in file_path else 'general',
-                            "repository": f"{settings.github_owner}/{settings.github_repo}",
-                            "size": file_content.size,
-                            "sha": file_content.sha,
-                            "github_url": file_content.html_url,
-                            "synced_at": datetime.utcnow().isoformat()
-                        }
-                        
-                        es.index(index='code-repository', document=doc)
-                        es.indices.refresh(index='code-repository')
+                if search_response.status_code == 200:
+                    search_data = search_response.json()
+                    
+                    if search_data['total'] > 0:
+                        # Found the file - create incident
+                        found_file = search_data['files'][0]
                         
-                        # Now create the incident
+                        # Register incident
                         incident_response = await client.post(
                             "http://localhost:8001/api/incidents/register",
                             json={
                                 "title": original_message[:100],
-                                "service": doc['service'],
+                                "service": found_file.get('service', 'general'),
                                 "severity": "Sev-3",
                                 "description": original_message,
-                                "target_file": file_path
+                                "target_file": found_file['file_path']
                             }
                         )
                         
                         if incident_response.status_code == 200:
                             incident_data = incident_response.json()
                             return {
-                                "response": f"""✅ Found and indexed {file_path}!
-✅ Incident created: {incident_data['incident_id']}
+                                "response": f"""✅ Incident created: {incident_data['incident_id']}
 
+Target: {found_file['file_path']}
 Issue: {original_message}
 
-Want me to generate a fix? Say "fix it" """,
+Want me to generate a fix? Say "fix it" or "create PR" """,
                                 "type": "incident_created",
                                 "incident_id": incident_data['incident_id']
                             }
-                        
-                    except Exception as e:
-                        continue
-                
-                # Couldn't find the file anywhere
-                return {
-                    "response": f"""I couldn't find the file you're referring to in the repository.
+            
+            # File not found - fetch it from GitHub
+            github = get_github_client()
+            repo = github.get_repo(f"{settings.github_owner}/{settings.github_repo}")
+            
+            # Try to find the file in GitHub
+            for file_path in detected_files:
+                try:
+                    file_content = repo.get_contents(file_path)
+                    
+                    # Found it! Download and index this specific file
+                    if file_content.encoding == "base64":
+                        content = base64.b64decode(file_content.content).decode('utf-8')
+                    else:
+                        content = file_content.content
+                    
+                    # Index in Elasticsearch
+                    extension = file_path.split('.')[-1] if '.' in file_path else 'unknown'
+                    language_map = {
+                        'py': 'python', 'js': 'javascript', 'ts': 'typescript',
+                        'md': 'markdown', 'json': 'json', 'yaml': 'yaml'
+                    }
+                    language = language_map.get(extension, extension)
+                    
+                    doc = {
+                        "file_path": file_path,
+                        "file_name": file_content.name,
+                        "content": content,
+                        "language": language,
+                        "service": file_path.split('/')[0] if '/' in file_path else 'general',
+                        "repository": f"{settings.github_owner}/{settings.github_repo}",
+                        "size": file_content.size,
+                        "sha": file_content.sha,
+                        "github_url": file_content.html_url,
+                        "synced_at": datetime.utcnow().isoformat()
+                    }
+                    
+                    await es.index(index='code-repository', document=doc, refresh=True)
+                    
+                    # Now create the incident
+                    incident_response = await client.post(
+                        "http://localhost:8001/api/incidents/register",
+                        json={
+                            "title": original_message[:100],
+                            "service": doc['service'],
+                            "severity": "Sev-3",
+                            "description": original_message,
+                            "target_file": file_path
+                        }
+                    )
+                    
+                    if incident_response.status_code == 200:
+                        incident_data = incident_response.json()
+                        return {
+                            "response": f"""✅ Found and indexed {file_path}!
+✅ Incident created: {incident_data['incident_id']}
+
+Issue: {original_message}
+
+Want me to generate a fix? Say "fix it" """,
+                            "type": "incident_created",
+                            "incident_id": incident_data['incident_id']
+                        }
+                    
+                except Exception as e:
+                    continue
+            
+            # Couldn't find the file anywhere
+            return {
+                "response": f"""I couldn't find the file you're referring to in the repository.
 
 What I tried: {', '.join(detected_files[:3])}
 
 Can you specify the exact file path? Or say "sync repository" to download all files.""",
-                    "type": "file_not_found"
-                }
+                "type": "file_not_found"
+            }
+            
+        except Exception as e:
+            return {
+                "response": f"Error: {str(e)}",
+                "type": "error"
+            }
+
+
+async def _handle_sync_repo(request: ChatMessage, message: str) -> Optional[Dict[str, Any]]:
+    """Sync the configured repository into Elasticsearch"""
+    # Just sync the configured repository
+    async with httpx.AsyncClient(timeout=120.0) as client:
+        try:
+            response = await client.post(
+                "http://localhost:8001/api/github/sync_to_elasticsearch",
+                json={"force": True}
+            )
+            
+            if response.status_code == 200:
+                data = response.json()
                 
-            except Exception as e:
-                return {
-                    "response": f"Error: {str(e)}",
-                    "type": "error"
-                }
-    
-    # Check for sync requests
-    if any(keyword in message for keyword in ['sync', 'download', 'fetch']) and any(keyword in message for keyword in ['repository', 'repo', 'github', 'code']):
-        # Just sync the configured repository
-        async with httpx.AsyncClient(timeout=120.0) as client:
-            try:
-                response = await client.post(
-                    "http://localhost:8001/api/github/sync_to_elasticsearch",
-                    json={"force": True}
-                )
+                result_lines = [f"✅ Synced {data['synced_count']} files!"]
+                result_lines.append("\nWhat would you like to do?")
                 
-                if response.status_code == 200:
-                    data = response.json()
-                    
-                    result_lines = [f"✅ Synced {data['synced_count']} files!"]
-                    result_lines.append("\nWhat would you like to do?")
-                    
-                    return {
-                        "response": "\n".join(result_lines),
-                        "type": "sync_complete"
-                    }
-            except Exception as e:
                 return {
-                    "response": f"❌ Failed to sync: {str(e)}",
-                    "type": "error"
+                    "response": "\n".join(result_lines),
+                    "type": "sync_complete"
                 }
-            
-            # If search failed, ask for clarification
+        except Exception as e:
             return {
-                "response": """# 📝 I'd be happy to help improve the README!
+                "response": f"❌ Failed to sync: {str(e)}",
+                "type": "error"
+            }
+        
+        # If search failed, ask for clarification
+        return {
+            "response": """# 📝 I'd be happy to help improve the README!
 
 To get started, I need to understand what you'd like to change:
 
@@ -278,97 +522,33 @@ To get started, I need to understand what you'd like to change:
 - Say "Fix the README" and I'll analyze it and make improvements
 
 Which approach would you prefer?""",
-                "type": "clarification"
-            }
-        
-        # For other types of incidents, try to extract details intelligently
-        services = ['api-gateway', 'auth-service', 'payment-service', 'user-service', 
-                   'order-service', 'inventory-service', 'notification-service',
-                   'database', 'cache', 'frontend']
-        
-        service = None
-        for svc in services:
-            if svc in message or svc.replace('-', ' ') in message:
-                service = svc
-                break
-        
-        # Extract severity
-        severity = 'Sev-3'  # Default
-        if 'sev-1' in message or 'critical' in message or 'severe' in message or 'urgent' in message:
-            severity = 'Sev-1'
-        elif 'sev-2' in message or 'high' in message or 'important' in message:
-            severity = 'Sev-2'
-        
-        # If we have a service, ask for confirmation
-        if service:
-            return {
-                "response": f"""# 🔍 I understand you want to address an issue with **{service}**
-
-**What I detected:**
-- Service: {service}
-- Severity: {severity}
-- Description: {message[:200]}
-
-**Next steps:**
-1. I can create an incident to track this
-2. Search the codebase for relevant files
-3. Generate an AI-powered fix
-4. Create a GitHub PR
-5. Notify the team on Slack
-
-**Should I proceed with creating the incident and starting the autonomous fix workflow?**
-
-Reply with:
-- "Yes, proceed" - I'll handle everything automatically
-- "Just create the incident" - I'll register it for later
-- "Show me the code first" - I'll search for relevant files""",
-                "type": "confirmation",
-                "context": {
-                    "service": service,
-                    "severity": severity,
-                    "description": message
-                }
-            }
-        
-        # Not enough information, ask for details
-        return {
-            "response": """# 🤔 I'd like to help, but I need a bit more information
-
-**What I need to know:**
-1. Which service or component is affected? (e.g., api-gateway, payment-service, README)
-2. What's the issue or improvement you want?
-3. How urgent is it? (Critical/High/Medium)
-
-**Example:**
-"The payment-service has high latency and needs optimization"
-
-Or just describe the issue naturally, and I'll figure out the details!""",
             "type": "clarification"
         }
-    
-    # Check for "show me" requests
-    if any(keyword in message for keyword in ['show me', 'view', 'display', 'let me see']):
-        if 'readme' in message or 'documentation' in message:
-            # User wants to see README first
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                try:
-                    # First, search in Elasticsearch
-                    search_response = await client.get(
-                        "http://localhost:8001/api/github/search_code?query=README&limit=5"
-                    )
-                    
-                    readme_file = None
-                    
-                    if search_response.status_code == 200:
-                        search_data = search_response.json()
-                        
-                        if search_data['total'] > 0:
-                            readme_file = next((f['file_path'] for f in search_data['files'] if 'readme.md' in f['file_path'].lower()), None)
+
+
+async def _handle_show(request: ChatMessage, message: str) -> Optional[Dict[str, Any]]:
+    """Show the README (or offer to sync it when not indexed yet)"""
+    if 'readme' in message or 'documentation' in message:
+        # User wants to see README first
+        async with httpx.AsyncClient(timeout=30.0) as client:
+            try:
+                # First, search in Elasticsearch
+                search_response = await client.get(
+                    "http://localhost:8001/api/github/search_code?query=README&limit=5"
+                )
+                
+                readme_file = None
+                
+                if search_response.status_code == 200:
+                    search_data = search_response.json()
                     
-                    # If not found in Elasticsearch, offer to sync from GitHub
-                    if not readme_file:
-                        return {
-                            "response": """# 🔍 The README hasn't been uploaded to our database yet
+                    if search_data['total'] > 0:
+                        readme_file = next((f['file_path'] for f in search_data['files'] if 'readme.md' in f['file_path'].lower()), None)
+                
+                # If not found in Elasticsearch, offer to sync from GitHub
+                if not readme_file:
+                    return {
+                        "response": """# 🔍 The README hasn't been uploaded to our database yet
 
 **No worries!** I have access to your GitHub repositories and can fetch it right now.
 
@@ -383,279 +563,237 @@ This will:
 **Just say "yes" or "proceed" and I'll handle it automatically!**
 
 Or if you prefer, tell me which specific repository to sync (I have access to all your public repos).""",
-                            "type": "sync_offer",
-                            "context": {
-                                "action": "sync_github",
-                                "reason": "readme_not_found"
-                            }
+                        "type": "sync_offer",
+                        "context": {
+                            "action": "sync_github",
+                            "reason": "readme_not_found"
                         }
+                    }
+                
+                # Found in Elasticsearch, view it
+                if readme_file:
+                    view_response = await client.post(
+                        "http://localhost:8001/api/github/view_file",
+                        json={"file_path": readme_file}
+                    )
                     
-                    # Found in Elasticsearch, view it
-                    if readme_file:
-                        view_response = await client.post(
-                            "http://localhost:8001/api/github/view_file",
-                            json={"file_path": readme_file}
-                        )
+                    if view_response.status_code == 200:
+                        view_data = view_response.json()
                         
-                        if view_response.status_code == 200:
-                            view_data = view_response.json()
-                            
-                            lines = [f"# 📄 Current README: {readme_file}\n"]
-                            lines.append(f"**Size**: {view_data['size']} bytes")
-                            lines.append(f"**URL**: {view_data['url']}\n")
-                            lines.append("## Content\n")
-                            lines.append("```markdown")
-                            lines.append(view_data['content'][:2000])  # First 2000 chars
-                            if len(view_data['content']) > 2000:
-                                lines.append("\n... (truncated)")
-                            lines.append("```\n")
-                            lines.append("**What would you like me to improve?**")
-                            lines.append("- Add a better introduction?")
-                            lines.append("- Improve the structure?")
-                            lines.append("- Add more examples?")
-                            lines.append("\nJust tell me what to change, and I'll create a fix!")
-                            
-                            return {
-                                "response": "\n".join(lines),
-                                "type": "file_preview",
-                                "file_path": readme_file
-                            }
-                except Exception as e:
-                    pass
+                        lines = [f"# 📄 Current README: {readme_file}\n"]
+                        lines.append(f"**Size**: {view_data['size']} bytes")
+                        lines.append(f"**URL**: {view_data['url']}\n")
+                        lines.append("## Content\n")
+                        lines.append("```markdown")
+                        lines.append(view_data['content'][:2000])  # First 2000 chars
+                        if len(view_data['content']) > 2000:
+                            lines.append("\n... (truncated)")
+                        lines.append("```\n")
+                        lines.append("**What would you like me to improve?**")
+                        lines.append("- Add a better introduction?")
+                        lines.append("- Improve the structure?")
+                        lines.append("- Add more examples?")
+                        lines.append("\nJust tell me what to change, and I'll create a fix!")
+                        
+                        return {
+                            "response": "\n".join(lines),
+                            "type": "file_preview",
+                            "file_path": readme_file
+                        }
+            except Exception as e:
+                pass
+
+
+async def _handle_view_file(request: ChatMessage, message: str) -> Optional[Dict[str, Any]]:
+    """Show the content of an explicitly named file"""
+    # Try to extract file path (look for common patterns)
+    file_match = _QUOTED_FILE_RE.search(request.message) or _BARE_FILE_RE.search(request.message)
     
-    # Check for sync requests
-    if any(keyword in message for keyword in ['sync', 'download', 'fetch']) and any(keyword in message for keyword in ['repository', 'repo', 'github', 'code']):
-        # Just sync the configured repository
-        async with httpx.AsyncClient(timeout=120.0) as client:
+    if file_match:
+        file_path = file_match.group(1)
+        
+        async with httpx.AsyncClient(timeout=30.0) as client:
             try:
                 response = await client.post(
-                    "http://localhost:8001/api/github/sync_to_elasticsearch",
-                    json={"force": True}
+                    "http://localhost:8001/api/github/view_file",
+                    json={"file_path": file_path}
                 )
                 
                 if response.status_code == 200:
                     data = response.json()
                     
-                    result_lines = [f"# ✅ Synced {data['synced_count']} files!\n"]
-                    
-                    if data['synced_count'] > 0:
-                        for file in data['synced_files'][:5]:
-                            result_lines.append(f"- {file['file_path']}")
-                    
-                    result_lines.append("\n**All set!** What would you like to do?")
+                    lines = [f"# 📄 File: {file_path}\n"]
+                    lines.append(f"**Size**: {data['size']} bytes")
+                    lines.append(f"**Branch**: {data['branch']}")
+                    lines.append(f"**URL**: {data['url']}\n")
+                    lines.append("## Content\n")
+                    lines.append(f"```{file_path.split('.')[-1]}")
+                    lines.append(data['content'])
+                    lines.append("```")
                     
                     return {
-                        "response": "\n".join(result_lines),
-                        "type": "sync_complete"
+                        "response": "\n".join(lines),
+                        "type": "file_content",
+                        "file_path": file_path
                     }
             except Exception as e:
                 return {
-                    "response": f"❌ Failed to sync: {str(e)}",
+                    "response": f"❌ Failed to view file: {str(e)}",
                     "type": "error"
                 }
-    
-    # Check for GitHub file operations
-    if any(keyword in message for keyword in ['view file', 'show file', 'get file', 'read file', 'file content']):
-        # Extract file path
-        import re
-        
-        # Try to extract file path (look for common patterns)
-        file_match = re.search(r'["\']([^"\']+\.(py|js|ts|tsx|jsx|md|txt|json|yaml|yml|sh|sql|html|css))["\']', message)
-        if not file_match:
-            file_match = re.search(r'(\S+\.(py|js|ts|tsx|jsx|md|txt|json|yaml|yml|sh|sql|html|css))', message)
-        
-        if file_match:
-            file_path = file_match.group(1)
+    else:
+        return {
+            "response": "Please specify a file path. Example: `View file README.md`",
+            "type": "error"
+        }
+
+
+async def _handle_sync_github(request: ChatMessage, message: str) -> Optional[Dict[str, Any]]:
+    """Sync GitHub files and report a detailed summary"""
+    async with httpx.AsyncClient(timeout=120.0) as client:
+        try:
+            response = await client.post(
+                "http://localhost:8001/api/github/sync_to_elasticsearch",
+                json={"force": 'force' in message or 'refresh' in message}
+            )
             
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                try:
-                    response = await client.post(
-                        "http://localhost:8001/api/github/view_file",
-                        json={"file_path": file_path}
-                    )
-                    
-                    if response.status_code == 200:
-                        data = response.json()
-                        
-                        lines = [f"# 📄 File: {file_path}\n"]
-                        lines.append(f"**Size**: {data['size']} bytes")
-                        lines.append(f"**Branch**: {data['branch']}")
-                        lines.append(f"**URL**: {data['url']}\n")
-                        lines.append("## Content\n")
-                        lines.append(f"```{file_path.split('.')[-1]}")
-                        lines.append(data['content'])
-                        lines.append("```")
-                        
-                        return {
-                            "response": "\n".join(lines),
-                            "type": "file_content",
-                            "file_path": file_path
-                        }
-                except Exception as e:
-                    return {
-                        "response": f"❌ Failed to view file: {str(e)}",
-                        "type": "error"
-                    }
-        else:
+            if response.status_code == 200:
+                data = response.json()
+                
+                lines = [f"# ✅ GitHub Sync Complete\n"]
+                lines.append(f"**Synced**: {data['synced_count']} files")
+                lines.append(f"**Errors**: {data['error_count']}")
+                lines.append(f"**Time**: {data['synced_at']}\n")
+                
+                if data['synced_count'] > 0:
+                    lines.append("## Sample Files")
+                    for file in data['synced_files'][:10]:
+                        lines.append(f"- `{file['file_path']}` ({file['language']}, {file['size']} bytes)")
+                
+                if data['error_count'] > 0:
+                    lines.append("\n## Errors")
+                    for error in data['errors'][:5]:
+                        lines.append(f"- `{error['file_path']}`: {error['error']}")
+                
+                return {
+                    "response": "\n".join(lines),
+                    "type": "github_sync",
+                    "synced_count": data['synced_count']
+                }
+        except Exception as e:
             return {
-                "response": "Please specify a file path. Example: `View file README.md`",
+                "response": f"❌ Failed to sync GitHub: {str(e)}",
                 "type": "error"
             }
+
+
+async def _handle_search_code(request: ChatMessage, message: str) -> Optional[Dict[str, Any]]:
+    """Search the indexed code repository"""
+    # Extract search query
+    query = message
+    for keyword in ['search code', 'find code', 'search for', 'find in code', 'in github', 'in repository']:
+        query = query.replace(keyword, '').strip()
     
-    # Check for GitHub sync operations
-    if any(keyword in message for keyword in ['sync github', 'sync files', 'download github', 'sync code', 'sync repository']):
-        async with httpx.AsyncClient(timeout=120.0) as client:
+    if query:
+        async with httpx.AsyncClient(timeout=30.0) as client:
             try:
-                response = await client.post(
-                    "http://localhost:8001/api/github/sync_to_elasticsearch",
-                    json={"force": 'force' in message or 'refresh' in message}
+                response = await client.get(
+                    f"http://localhost:8001/api/github/search_code?query={query}&limit=10"
                 )
                 
                 if response.status_code == 200:
                     data = response.json()
                     
-                    lines = [f"# ✅ GitHub Sync Complete\n"]
-                    lines.append(f"**Synced**: {data['synced_count']} files")
-                    lines.append(f"**Errors**: {data['error_count']}")
-                    lines.append(f"**Time**: {data['synced_at']}\n")
+                    lines = [f"# 🔍 Code Search Results: \"{query}\"\n"]
+                    lines.append(f"**Total**: {data['total']} matches")
+                    lines.append(f"**Showing**: {data['count']} files\n")
                     
-                    if data['synced_count'] > 0:
-                        lines.append("## Sample Files")
-                        for file in data['synced_files'][:10]:
-                            lines.append(f"- `{file['file_path']}` ({file['language']}, {file['size']} bytes)")
-                    
-                    if data['error_count'] > 0:
-                        lines.append("\n## Errors")
-                        for error in data['errors'][:5]:
-                            lines.append(f"- `{error['file_path']}`: {error['error']}")
+                    for i, file in enumerate(data['files'], 1):
+                        lines.append(f"{i}. **{file['file_path']}** ({file['language']})")
+                        lines.append(f"   Score: {file['score']:.2f}")
+                        if file['highlights']:
+                            lines.append(f"   Preview: ...{file['highlights'][0]}...")
+                        lines.append("")
                     
                     return {
                         "response": "\n".join(lines),
-                        "type": "github_sync",
-                        "synced_count": data['synced_count']
+                        "type": "code_search",
+                        "total": data['total']
                     }
             except Exception as e:
                 return {
-                    "response": f"❌ Failed to sync GitHub: {str(e)}",
+                    "response": f"❌ Failed to search code: {str(e)}",
                     "type": "error"
                 }
+
+
+async def _handle_register(request: ChatMessage, message: str) -> Optional[Dict[str, Any]]:
+    """Register a new incident from a natural-language description"""
+    # Try to extract incident details from natural language
+    # Extract service name
+    service = _find_service(message) or next((svc for svc in _DOC_SERVICES if svc in message), None)
     
-    # Check for code search
-    if any(keyword in message for keyword in ['search code', 'find code', 'search for', 'find in code']):
-        # Extract search query
-        query = message
-        for keyword in ['search code', 'find code', 'search for', 'find in code', 'in github', 'in repository']:
-            query = query.replace(keyword, '').strip()
-        
-        if query:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                try:
-                    response = await client.get(
-                        f"http://localhost:8001/api/github/search_code?query={query}&limit=10"
-                    )
-                    
-                    if response.status_code == 200:
-                        data = response.json()
-                        
-                        lines = [f"# 🔍 Code Search Results: \"{query}\"\n"]
-                        lines.append(f"**Total**: {data['total']} matches")
-                        lines.append(f"**Showing**: {data['count']} files\n")
-                        
-                        for i, file in enumerate(data['files'], 1):
-                            lines.append(f"{i}. **{file['file_path']}** ({file['language']})")
-                            lines.append(f"   Score: {file['score']:.2f}")
-                            if file['highlights']:
-                                lines.append(f"   Preview: ...{file['highlights'][0]}...")
-                            lines.append("")
-                        
-                        return {
-                            "response": "\n".join(lines),
-                            "type": "code_search",
-                            "total": data['total']
-                        }
-                except Exception as e:
-                    return {
-                        "response": f"❌ Failed to search code: {str(e)}",
-                        "type": "error"
-                    }
+    # Extract severity
+    severity = 'Sev-3'  # Default
+    if 'sev-1' in message or 'critical' in message or 'severe' in message:
+        severity = 'Sev-1'
+    elif 'sev-2' in message or 'high' in message or 'important' in message:
+        severity = 'Sev-2'
     
-    # Check for incident registration
-    if any(keyword in message for keyword in ['register incident', 'create incident', 'new incident', 'report incident', 'create an incident']):
-        # Try to extract incident details from natural language
-        import re
-        
-        # Extract service name
-        services = ['api-gateway', 'auth-service', 'payment-service', 'user-service', 
-                   'order-service', 'inventory-service', 'notification-service',
-                   'database', 'cache', 'frontend', 'readme', 'documentation']
-        
-        service = None
-        for svc in services:
-            if svc in message or svc.replace('-', ' ') in message:
-                service = svc
-                break
-        
-        # Extract severity
-        severity = 'Sev-3'  # Default
-        if 'sev-1' in message or 'critical' in message or 'severe' in message:
-            severity = 'Sev-1'
-        elif 'sev-2' in message or 'high' in message or 'important' in message:
-            severity = 'Sev-2'
+    # If we have enough info, register the incident
+    if service or 'readme' in message or 'github' in message or 'codebase' in message:
+        # Determine service from context
+        if not service:
+            if 'readme' in message or 'documentation' in message:
+                service = 'documentation'
+            elif 'github' in message or 'codebase' in message:
+                service = 'code-repository'
+            else:
+                service = 'general'
         
-        # If we have enough info, register the incident
-        if service or 'readme' in message or 'github' in message or 'codebase' in message:
-            # Determine service from context
-            if not service:
-                if 'readme' in message or 'documentation' in message:
-                    service = 'documentation'
-                elif 'github' in message or 'codebase' in message:
-                    service = 'code-repository'
-                else:
-                    service = 'general'
-            
-            # Create incident via API
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                try:
-                    # Extract title and description from message
-                    title = message[:100] if len(message) < 100 else message[:97] + '...'
+        # Create incident via API
+        async with httpx.AsyncClient(timeout=30.0) as client:
+            try:
+                # Extract title and description from message
+                title = message[:100] if len(message) < 100 else message[:97] + '...'
+                
+                response = await client.post(
+                    "http://localhost:8001/api/incidents/register",
+                    json={
+                        "title": title,
+                        "service": service,
+                        "severity": severity,
+                        "description": message,
+                        "region": "us-west-1"
+                    }
+                )
+                
+                if response.status_code == 200:
+                    data = response.json()
+                    incident_id = data['incident_id']
                     
-                    response = await client.post(
-                        "http://localhost:8001/api/incidents/register",
-                        json={
-                            "title": title,
-                            "service": service,
-                            "severity": severity,
-                            "description": message,
-                            "region": "us-west-1"
-                        }
-                    )
+                    lines = [f"# ✅ Incident Registered: {incident_id}\n"]
+                    lines.append(f"**Service**: {service}")
+                    lines.append(f"**Severity**: {severity}")
+                    lines.append(f"**Status**: investigating\n")
+                    lines.append("## Next Steps")
+                    lines.append(f"- View details: `Show incident {incident_id}`")
+                    lines.append(f"- Trigger autonomous fix: `Fix incident {incident_id}`")
+                    lines.append(f"- Analyze metrics: `Analyze metrics for {service}`")
                     
-                    if response.status_code == 200:
-                        data = response.json()
-                        incident_id = data['incident_id']
-                        
-                        lines = [f"# ✅ Incident Registered: {incident_id}\n"]
-                        lines.append(f"**Service**: {service}")
-                        lines.append(f"**Severity**: {severity}")
-                        lines.append(f"**Status**: investigating\n")
-                        lines.append("## Next Steps")
-                        lines.append(f"- View details: `Show incident {incident_id}`")
-                        lines.append(f"- Trigger autonomous fix: `Fix incident {incident_id}`")
-                        lines.append(f"- Analyze metrics: `Analyze metrics for {service}`")
-                        
-                        return {
-                            "response": "\n".join(lines),
-                            "type": "incident_registered",
-                            "incident_id": incident_id
-                        }
-                except Exception as e:
                     return {
-                        "response": f"❌ Failed to register incident: {str(e)}",
-                        "type": "error"
+                        "response": "\n".join(lines),
+                        "type": "incident_registered",
+                        "incident_id": incident_id
                     }
-        else:
-            return {
-                "response": """# 📝 Register New Incident
+            except Exception as e:
+                return {
+                    "response": f"❌ Failed to register incident: {str(e)}",
+                    "type": "error"
+                }
+    else:
+        return {
+            "response": """# 📝 Register New Incident
 
 To register a new incident, provide:
 - Service name (e.g., api-gateway, payment-service, documentation)
@@ -668,311 +806,183 @@ Create a Sev-2 incident for payment-service with high latency
 ```
 
 Try again with more details!""",
-                "type": "help"
-            }
-    
-    # Check for workflow trigger
-    if any(keyword in message for keyword in ['fix incident', 'resolve incident', 'auto fix', 'trigger workflow']):
-        # Extract incident ID
-        incident_match = re.search(r'INC-\d+', message.upper())
-        
-        if incident_match:
-            incident_id = incident_match.group(0)
-            
-            # Trigger autonomous workflow
-            async with httpx.AsyncClient(timeout=60.0) as client:
-                try:
-                    response = await client.post(
-                        "http://localhost:8001/api/incidents/trigger_workflow",
-                        json={
-                            "incident_id": incident_id,
-                            "auto_approve": True
-                        }
-                    )
-                    
-                    if response.status_code == 200:
-                        data = response.json()
-                        
-                        # Format workflow response
-                        lines = [f"# 🤖 Autonomous Workflow: {incident_id}\n"]
-                        lines.append("## Workflow Execution\n")
-                        
-                        for step in data['workflow_steps']:
-                            status_icon = "✅" if step['status'] == 'completed' else "❌" if step['status'] == 'failed' else "⏭️" if step['status'] == 'skipped' else "⏳"
-                            lines.append(f"{status_icon} **Step {step['step']}: {step['name']}**")
-                            
-                            if step['status'] == 'completed':
-                                lines.append(f"   {step.get('result', 'Completed')}")
-                                if step.get('pr_url'):
-                                    lines.append(f"   PR: {step['pr_url']}")
-                            elif step['status'] == 'failed':
-                                lines.append(f"   Error: {step.get('error', 'Unknown error')}")
-                            elif step['status'] == 'skipped':
-                                lines.append(f"   {step.get('message', 'Skipped')}")
-                            
-                            lines.append("")
-                        
-                        lines.append(f"\n## Summary")
-                        summary = data['summary']
-                        lines.append(f"- Total Steps: {summary['total_steps']}")
-                        lines.append(f"- Completed: {summary['completed']} ✅")
-                        lines.append(f"- Failed: {summary['failed']} ❌")
-                        lines.append(f"- Skipped: {summary['skipped']} ⏭️")
-                        
-                        if data.get('pr_url'):
-                            lines.append(f"\n🔗 **Pull Request**: {data['pr_url']}")
-                            lines.append("\n✅ **Next Steps**: Review and approve the PR for deployment")
-                        
-                        return {
-                            "response": "\n".join(lines),
-                            "type": "workflow_execution",
-                            "incident_id": incident_id,
-                            "workflow_data": data
-                        }
-                except Exception as e:
-                    return {
-                        "response": f"❌ Failed to trigger workflow: {str(e)}",
-                        "type": "error"
-                    }
-        else:
-            return {
-                "response": "Please specify an incident ID. Example: `Fix incident INC-0063`",
-                "type": "error"
-            }
-    
-    # Detect analysis requests
-    if any(keyword in message for keyword in ['analyze', 'analysis', 'metrics', 'check', 'show me']):
-        # Extract service name
-        services = ['api-gateway', 'auth-service', 'payment-service', 'user-service', 
-                   'order-service', 'inventory-service', 'notification-service',
-                   'database', 'cache', 'frontend']
-        
-        service = None
-        for svc in services:
-            if svc in message or svc.replace('-', ' ') in message:
-                service = svc
-                break
-        
-        if service:
-            # Call rich analysis API
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                try:
-                    response = await client.post(
-                        "http://localhost:8001/api/analysis/service_metrics",
-                        json={"service": service, "hours": 24}
-                    )
-                    
-                    if response.status_code == 200:
-                        data = response.json()
-                        return {
-                            "response": data['analysis'],
-                            "type": "rich_analysis",
-                            "service": service,
-                            "raw_data": data.get('raw_data', {}),
-                            "anomaly_count": data.get('anomaly_count', 0)
-                        }
-                except Exception as e:
-                    pass
-    
-    # Check for service health comparison
-    if any(keyword in message for keyword in ['compare', 'health', 'all services', 'which service']):
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            try:
-                response = await client.get("http://localhost:8001/api/analysis/service_health")
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    services = data['services']
-                    
-                    # Format response
-                    lines = ["# 🏥 Service Health Comparison\n"]
-                    lines.append("## Services Ranked by Error Rate (Worst First)\n")
-                    
-                    for i, svc in enumerate(services[:10], 1):
-                        status = "🚨" if svc['error_rate'] > 2 else "⚠️" if svc['error_rate'] > 1 else "✅"
-                        lines.append(f"{i}. **{svc['service']}** {status}")
-                        lines.append(f"   - Error Rate: {svc['error_rate']:.2f}%")
-                        lines.append(f"   - Latency: {svc['latency']:.2f}ms")
-                        lines.append(f"   - CPU: {svc['cpu']:.2f}%\n")
-                    
-                    return {
-                        "response": "\n".join(lines),
-                        "type": "service_comparison",
-                        "services": services
-                    }
-            except Exception as e:
-                pass
+            "type": "help"
+        }
+
+
+async def _handle_workflow(request: ChatMessage, message: str) -> Optional[Dict[str, Any]]:
+    """Trigger the autonomous workflow for every incident ID in the message"""
+    # Extract incident IDs (a message may name several, e.g. "fix INC-0063 and INC-0064")
+    incident_ids = list(dict.fromkeys(match.upper() for match in _INC_RE.findall(message)))
     
-    # For everything else, use the actual AI agent (not hardcoded responses)
-    # This makes it truly adaptive and intelligent
-    async with httpx.AsyncClient(timeout=60.0) as client:
+    if incident_ids:
+        # Trigger autonomous workflows; concurrent triggers are batched upstream
         try:
-            response = await client.post(
-                "http://localhost:8001/api/agent/chat",
-                json=request.dict()
-            )
+            workflows = await asyncio.gather(*(_trigger_workflow(incident_id) for incident_id in incident_ids))
             
-            if response.status_code == 200:
-                return response.json()
-            else:
-                return {
-                    "response": "I'm having trouble processing your request. Please try rephrasing.",
-                    "type": "error"
+            results = [
+                (incident_id, data)
+                for incident_id, data in zip(incident_ids, workflows)
+                if data is not None
+            ]
+            
+            if results:
+                incident_id, data = results[0]
+                result = {
+                    "response": "\n\n".join(_format_workflow(*item) for item in results),
+                    "type": "workflow_execution",
+                    "incident_id": incident_id,
+                    "workflow_data": data
                 }
+                if len(results) > 1:
+                    result["workflows"] = [
+                        {"incident_id": incident_id, "workflow_data": data}
+                        for incident_id, data in results
+                    ]
+                return result
         except Exception as e:
             return {
-                "response": f"Error: {str(e)}",
+                "response": f"❌ Failed to trigger workflow: {str(e)}",
                 "type": "error"
             }
+    else:
+        return {
+            "response": "Please specify an incident ID. Example: `Fix incident INC-0063`",
+            "type": "error"
+        }
+
+
+async def _handle_analyze(request: ChatMessage, message: str) -> Optional[Dict[str, Any]]:
+    """Rich metrics analysis for a named service"""
+    # Extract service name
+    service = _find_service(message)
     
-    # Check for incident details
-    if any(keyword in message for keyword in ['incident', 'inc-']):
-        # Extract incident ID
-        import re
-        incident_match = re.search(r'INC-\d+', message.upper())
-        
-        if incident_match:
-            incident_id = incident_match.group(0)
-            
-            # Query Elasticsearch directly
-            from elasticsearch import Elasticsearch
-            from app.core.config import settings
-            
-            es = Elasticsearch(
-                hosts=[settings.elasticsearch_url],
-                api_key=settings.elasticsearch_api_key,
-                verify_certs=True
-            )
-            
-            try:
-                result = es.search(
-                    index='incident-history',
-                    body={
-                        'query': {'term': {'id': incident_id}},
-                        'size': 1
-                    }
-                )
-                
-                if result['hits']['hits']:
-                    incident = result['hits']['hits'][0]['_source']
-                    
-                    # Check if this is a basic incident (3 digits) or detailed incident (4 digits)
-                    is_basic = len(incident_id.split('-')[1]) == 3
-                    
-                    # Format rich incident details
-                    lines = [f"# 🚨 Incident Details: {incident_id}\n"]
-                    lines.append(f"**Title**: {incident.get('title', 'N/A')}")
-                    lines.append(f"**Service**: {incident.get('service', 'N/A')}")
-                    lines.append(f"**Severity**: {incident.get('severity', 'N/A')}")
-                    lines.append(f"**Status**: {incident.get('status', 'N/A')}")
-                    lines.append(f"**Region**: {incident.get('region', 'N/A')}")
-                    lines.append(f"**Created**: {incident.get('created_at', 'N/A')}")
-                    
-                    if incident.get('resolved_at'):
-                        lines.append(f"**Resolved**: {incident['resolved_at']}")
-                        lines.append(f"**MTTR**: {incident.get('mttr_minutes', 0)} minutes")
-                    
-                    lines.append(f"\n**Description**: {incident.get('description', 'N/A')}\n")
-                    
-                    # Anomaly details
-                    if 'anomaly' in incident:
-                        anom = incident['anomaly']
-                        lines.append("## 📊 Anomaly Details")
-                        lines.append(f"- **Metric**: {anom.get('metric', 'N/A')}")
-                        lines.append(f"- **Current Value**: {anom.get('current_value', 0):.2f}")
-                        lines.append(f"- **Expected Value**: {anom.get('expected_value', 0):.2f}")
-                        lines.append(f"- **Deviation**: {anom.get('deviation_sigma', 0):.1f}σ")
-                        lines.append(f"- **Detected At**: {anom.get('detected_at', 'N/A')}\n")
-                    
-                    # Diagnosis
-                    if 'diagnosis' in incident:
-                        diag = incident['diagnosis']
-                        lines.append("## 🔍 Diagnosis")
-                        lines.append(f"- **Root Cause**: {diag.get('root_cause', 'N/A')}")
-                        lines.append(f"- **Affected Component**: {diag.get('affected_component', 'N/A')}")
-                        lines.append(f"- **Impact**: {diag.get('impact_explanation', 'N/A')}")
-                        lines.append(f"- **Confidence**: {diag.get('confidence', 0):.0%}")
-                        
-                        if 'correlated_metrics' in diag:
-                            lines.append(f"- **Correlated Metrics**: {', '.join(diag['correlated_metrics'])}\n")
-                    
-                    # Remediation
-                    if 'remediation' in incident:
-                        rem = incident['remediation']
-                        lines.append("## 🔧 Remediation")
-                        lines.append(f"- **File**: `{rem.get('file_path', 'N/A')}`")
-                        lines.append(f"- **Fix**: {rem.get('explanation', 'N/A')}")
-                        
-                        if rem.get('pr_url'):
-                            lines.append(f"- **PR**: {rem['pr_url']}\n")
-                    
-                    # Tags
-                    if 'tags' in incident:
-                        tags = incident['tags']
-                        lines.append("## 🏷️ Tags")
-                        lines.append(f"- Auto-detected: {'✅' if tags.get('auto_detected') else '❌'}")
-                        lines.append(f"- Has Runbook: {'✅' if tags.get('has_runbook') else '❌'}")
-                        lines.append(f"- Customer Impact: {tags.get('customer_impact', 'unknown')}")
-                    
-                    # Add helpful note for basic incidents
-                    if is_basic and not ('diagnosis' in incident or 'remediation' in incident):
-                        lines.append("\n---")
-                        lines.append("\n💡 **Note**: This is a basic incident record with limited details.")
-                        lines.append("For comprehensive incident analysis including diagnosis, remediation, and tags, try:")
-                        lines.append(f"- `Show incident INC-0{incident_id.split('-')[1]}` (4-digit format)")
-                        lines.append("- Example: `Show incident INC-0001` through `INC-1000`")
-                    
-                    return {
-                        "response": "\n".join(lines),
-                        "type": "incident_details",
-                        "incident": incident
-                    }
-            except Exception as e:
-                pass
-    
-    # Check for incident statistics
-    if any(keyword in message for keyword in ['incident', 'statistics', 'stats', 'mttr']):
+    if service:
+        # Call rich analysis API
         async with httpx.AsyncClient(timeout=30.0) as client:
             try:
-                response = await client.get("http://localhost:8001/api/analysis/incident_stats")
+                response = await client.post(
+                    "http://localhost:8001/api/analysis/service_metrics",
+                    json={"service": service, "hours": 24}
+                )
                 
                 if response.status_code == 200:
                     data = response.json()
-                    stats = data['statistics'][:10]
-                    
-                    lines = ["# 📊 Incident Statistics by Service\n"]
-                    
-                    for i, stat in enumerate(stats, 1):
-                        lines.append(f"{i}. **{stat['service']}**")
-                        lines.append(f"   - Total Incidents: {stat['total_incidents']}")
-                        lines.append(f"   - Sev-1: {stat['sev1_count']} | Sev-2: {stat['sev2_count']} | Sev-3: {stat['sev3_count']}")
-                        lines.append(f"   - Avg MTTR: {stat['avg_mttr_minutes']:.1f} minutes\n")
-                    
                     return {
-                        "response": "\n".join(lines),
-                        "type": "incident_stats",
-                        "statistics": stats
+                        "response": data['analysis'],
+                        "type": "rich_analysis",
+                        "service": service,
+                        "raw_data": data.get('raw_data', {}),
+                        "anomaly_count": data.get('anomaly_count', 0)
                     }
             except Exception as e:
                 pass
-    
-    # Fall back to regular agent
-    async with httpx.AsyncClient(timeout=60.0) as client:
+
+
+async def _handle_compare(request: ChatMessage, message: str) -> Optional[Dict[str, Any]]:
+    """Service health comparison"""
+    async with httpx.AsyncClient(timeout=30.0) as client:
         try:
-            response = await client.post(
-                "http://localhost:8001/api/agent/chat",
-                json=request.dict()
-            )
+            data = await _fetch_analysis(client, "/api/analysis/service_health")
             
-            if response.status_code == 200:
-                return response.json()
-            else:
+            if data:
+                services = data['services']
+                
+                # Format response
+                lines = ["# 🏥 Service Health Comparison\n"]
+                lines.append("## Services Ranked by Error Rate (Worst First)\n")
+                
+                for i, svc in enumerate(services[:10], 1):
+                    status = "🚨" if svc['error_rate'] > 2 else "⚠️" if svc['error_rate'] > 1 else "✅"
+                    lines.append(f"{i}. **{svc['service']}** {status}")
+                    lines.append(f"   - Error Rate: {svc['error_rate']:.2f}%")
+                    lines.append(f"   - Latency: {svc['latency']:.2f}ms")
+                    lines.append(f"   - CPU: {svc['cpu']:.2f}%\n")
+                
                 return {
-                    "response": "I'm having trouble processing your request. Please try rephrasing or ask about:\n- Analyzing metrics for a service\n- Comparing service health\n- Viewing active anomalies\n- Incident statistics",
-                    "type": "error"
+                    "response": "\n".join(lines),
+                    "type": "service_comparison",
+                    "services": services
                 }
         except Exception as e:
-            return {
-                "response": f"Error: {str(e)}",
-                "type": "error"
-            }
+            pass
+
+
+async def _close_stream(response: httpx.Response, client: httpx.AsyncClient):
+    """Release a streamed upstream response and its client once the body has been sent"""
+    await response.aclose()
+    await client.aclose()
+
+
+async def _handle_fallback(request: ChatMessage) -> Any:
+    """Everything else goes to the AI agent"""
+    client = httpx.AsyncClient(timeout=60.0)
+    try:
+        response = await client.send(
+            client.build_request(
+                "POST",
+                "http://localhost:8001/api/agent/chat",
+                json=request.dict()
+            ),
+            stream=True
+        )
+    except Exception as e:
+        await client.aclose()
+        return {
+            "response": f"Error: {str(e)}",
+            "type": "error"
+        }
+    
+    if response.status_code == 200:
+        # Stream the agent's JSON through untouched instead of buffering, decoding and re-encoding it
+        return StreamingResponse(
+            response.aiter_bytes(),
+            media_type=response.headers.get("content-type", "application/json"),
+            background=BackgroundTask(_close_stream, response, client)
+        )
+    
+    await _close_stream(response, client)
+    return {
+        "response": "I'm having trouble processing your request. Please try rephrasing.",
+        "type": "error"
+    }
+
+
+# Routes in priority order: (intent, predicate on the lowered message, handler).
+# The message is lowered once in chat_enhanced and that copy is what predicates and handlers
+# receive, so every keyword constant above must be lowercase. A handler returns None to let
+# the next matching route (and finally the AI agent) answer.
+_ROUTES = (
+    ('confirmation', lambda message: message.strip() in _CONFIRMATIONS, _handle_confirmation),
+    ('file_incident', lambda message: _mentions('incident_request', message), _handle_file_incident),
+    ('sync_repo', lambda message: _mentions('sync', message) and _mentions('repo', message), _handle_sync_repo),
+    ('show', lambda message: _mentions('show', message), _handle_show),
+    ('view_file', lambda message: _mentions('view_file', message), _handle_view_file),
+    ('sync_github', lambda message: _mentions('sync_github', message), _handle_sync_github),
+    ('search_code', lambda message: _mentions('search_code', message), _handle_search_code),
+    ('register', lambda message: _mentions('register', message), _handle_register),
+    ('fix', lambda message: _mentions('fix', message), _handle_workflow),
+    ('analyze', lambda message: _mentions('analyze', message), _handle_analyze),
+    ('compare', lambda message: _mentions('compare', message), _handle_compare),
+)
+
+
+@router.post("/chat_enhanced", response_class=ORJSONResponse)
+async def chat_enhanced(request: ChatMessage):
+    """
+    Enhanced chat that detects analysis requests and provides rich responses
+    Supports: metrics analysis, incident registration, autonomous workflows, intelligent file handling
+    """
+    message = request.message.lower()
+    
+    for intent, matches, handler in _ROUTES:
+        if matches(message):
+            logger.debug(f"chat_enhanced dispatching intent '{intent}'")
+            result = await handler(request, message)
+            if result is not None:
+                return result
+    
+    # For everything else, use the actual AI agent (not hardcoded responses)
+    # This makes it truly adaptive and intelligent
+    logger.debug("chat_enhanced falling back to the AI agent")
+    return await _handle_fallback(request)
@@ -10,16 +10,26 @@ This replicates the full Kibana Agent Builder experience via API!
 """
 
 from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError
+from typing import List, Dict, Any, AsyncIterator, Iterator, Optional, Tuple
 from datetime import datetime, timedelta
+from collections import OrderedDict, defaultdict
+import asyncio
+import contextlib
+import hashlib
 import httpx
 import logging
 import json
+import random
+import time
+import orjson
 import google.generativeai as genai
 from app.core.config import settings
-from elasticsearch import Elasticsearch
+from elasticsearch import AsyncElasticsearch
 from app.api.activity_log import log_activity
+from app.api import elasticseer_tools, incident_management, rich_analysis
 
 logger = logging.getLogger(__name__)
 
@@ -28,6 +38,196 @@ router = APIRouter(prefix="/api/agent", tags=["agent"])
 # Configure Gemini
 genai.configure(api_key=settings.gemini_api_key)
 
+# Shared HTTP clients: connections (and TLS sessions) are pooled across tool calls
+# instead of being re-established for every request. The MCP server is reached over
+# TLS so it can multiplex on HTTP/2; the local API is plain HTTP/1.1 keep-alive.
+# Long read timeout for slow tools/LLM calls, but fail fast when a host is unreachable
+_HTTP_LIMITS = httpx.Limits(max_keepalive_connections=32, max_connections=64, keepalive_expiry=30.0)
+_HTTP_TIMEOUT = httpx.Timeout(300.0, connect=5.0)
+_mcp_client = httpx.AsyncClient(timeout=_HTTP_TIMEOUT, limits=_HTTP_LIMITS, http2=True)
+_local_client = httpx.AsyncClient(timeout=_HTTP_TIMEOUT, limits=_HTTP_LIMITS)
+
+# Local API endpoints the agent's actions use: path -> (handler, request model).
+# Called in-process unless settings.local_actions_in_process is disabled.
+_LOCAL_API_URL = "http://localhost:8001"
+_LOCAL_HANDLERS = {
+    "/api/analysis/comprehensive_metrics": (rich_analysis.comprehensive_metrics_analysis, rich_analysis.ComprehensiveMetricsRequest),
+    "/api/elasticseer/generate_fix": (elasticseer_tools.generate_code_fix, elasticseer_tools.GenerateFixRequest),
+    "/api/elasticseer/create_pr": (elasticseer_tools.create_github_pr, elasticseer_tools.CreatePRRequest),
+    "/api/elasticseer/send_slack": (elasticseer_tools.send_slack_notification, elasticseer_tools.SlackNotificationRequest),
+    "/api/elasticseer/create_jira_ticket": (elasticseer_tools.create_jira_ticket, elasticseer_tools.CreateJiraTicketRequest),
+    "/api/incidents/register": (incident_management.register_incident, incident_management.RegisterIncidentRequest),
+}
+
+# Shared async Elasticsearch client (postmortem activity-log lookups) - searches
+# don't block the event loop, and responses are gzip-compressed
+_es = AsyncElasticsearch(
+    settings.elasticsearch_url,
+    api_key=settings.elasticsearch_api_key,
+    http_compress=True
+)
+
+# In-process LRU of code-repository lookups: file_path -> (expires_at, content).
+# Misses (content None) are cached briefly so retries don't keep hitting Elasticsearch.
+_CODE_CACHE_MAX_SIZE = 512
+_CODE_CACHE_TTL_SECONDS = 300.0
+_CODE_CACHE_MISS_TTL_SECONDS = 30.0
+_code_cache: "OrderedDict[str, Tuple[float, Optional[str]]]" = OrderedDict()
+
+# Short-lived cache of read-only function results, keyed by (name, sorted-args JSON),
+# so the agent repeating an identical lookup within a conversation skips the round trip.
+# TTL (seconds) per function follows how quickly its data changes; mutating functions
+# (PRs, Slack, Jira, incident registration) are never cached.
+_CACHEABLE_FUNCTIONS = {
+    "query_recent_incidents": 30.0,
+    "search_code_by_path": 300.0,
+    "get_metrics_anomalies": 60.0,
+    "analyze_service_metrics": 60.0,
+}
+_RESULT_CACHE_MAX_SIZE = 512
+_result_cache: "OrderedDict[Tuple[str, bytes], Tuple[float, Dict[str, Any]]]" = OrderedDict()
+# Cacheable function calls in flight, keyed like _result_cache (singleflight)
+_inflight_functions: Dict[Tuple[str, bytes], "asyncio.Future[Dict[str, Any]]"] = {}
+
+# Approximate token budget for the conversation history sent with each chat turn
+_HISTORY_TOKEN_BUDGET = 4000
+# Frontend roles -> Gemini chat roles; anything else (e.g. "assistant") is the model
+_GEMINI_ROLES = {"user": "user", "model": "model"}
+
+# Sources reported for every tool-using response, ahead of the tools that were called
+_SOURCES_PREFIX = ("gemini-2.5-flash", "mcp-server")
+
+# Health checks reuse the MCP tools/list result for this long: (expires_at, result)
+_MCP_TOOLS_CACHE_TTL_SECONDS = 30.0
+_mcp_tools_cache: Optional[Tuple[float, Dict[str, Any]]] = None
+
+# Cleared the first time the MCP server rejects a JSON-RPC batch
+_mcp_batch_supported = True
+
+# Retry policy for MCP/local API calls. Only failures where the request was never
+# processed (connection errors, throttling, gateway errors) are retried - read
+# timeouts are not, since the action (PR, ticket, ...) may already have happened.
+_RETRY_STATUS_CODES = frozenset({429, 502, 503, 504})
+_RETRY_EXCEPTIONS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+_RETRY_ATTEMPTS = 3
+_RETRY_BASE_DELAY_SECONDS = 0.2
+_RETRY_MAX_DELAY_SECONDS = 2.0
+# Local endpoints that create something (PR, message, ticket, incident). A 429/5xx may
+# come back after the action went through, so these are only retried on connection errors
+_NON_IDEMPOTENT_PATHS = frozenset({
+    "/api/elasticseer/create_pr",
+    "/api/elasticseer/send_slack",
+    "/api/elasticseer/create_jira_ticket",
+    "/api/incidents/register",
+})
+# A server's Retry-After is honored (instead of the backoff) up to this long
+_RETRY_AFTER_MAX_SECONDS = 10.0
+
+# Static request headers, built once instead of per call
+_JSON_HEADERS = {"Content-Type": "application/json"}
+_MCP_HEADERS = {
+    "Authorization": f"ApiKey {settings.elasticsearch_api_key}",
+    "Content-Type": "application/json",
+    "Accept": "application/json"
+}
+_MCP_URL = f"{settings.kibana_url.rstrip('/')}/api/agent_builder/mcp"
+
+# Fixed JSON-RPC envelope for tools/call - only the params are serialized per call
+_MCP_CALL_PREFIX = b'{"jsonrpc":"2.0","id":1,"method":"tools/call","params":'
+_MCP_CALL_SUFFIX = b'}'
+
+# In-flight MCP tools/call requests keyed by their serialized params (singleflight)
+_inflight_mcp_calls: Dict[bytes, "asyncio.Future[Dict[str, Any]]"] = {}
+
+# Autonomous workflows run in the background once the incident is registered; their
+# live status is kept here (bounded, oldest evicted) for GET /incident/{id}/status.
+# Task references are held so running workflows aren't garbage collected.
+_WORKFLOW_STATUS_MAX_SIZE = 256
+_workflow_status: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_background_tasks: set = set()
+
+# Autonomous workflows in flight, keyed by a hash of the submitted incident, so
+# identical resubmissions share one workflow. Held for a cooldown after completion.
+_WORKFLOW_DEDUP_COOLDOWN_SECONDS = 60.0
+_inflight_workflows: Dict[str, "asyncio.Future[Dict[str, Any]]"] = {}
+
+# Per-host circuit breaker: after this many consecutive failures, calls fail fast
+# until the reset timeout has passed
+_BREAKER_FAIL_MAX = 5
+_BREAKER_RESET_SECONDS = 30.0
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a host whose circuit breaker is open"""
+
+
+class _CircuitBreaker:
+    """Consecutive-failure circuit breaker (half-opens after the reset timeout)"""
+    
+    def __init__(self):
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+    
+    def allow(self) -> bool:
+        return self.opened_at is None or time.monotonic() - self.opened_at >= _BREAKER_RESET_SECONDS
+    
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+    
+    def record_failure(self):
+        self.failures += 1
+        if self.failures >= _BREAKER_FAIL_MAX:
+            self.opened_at = time.monotonic()
+
+
+_breakers: Dict[str, _CircuitBreaker] = defaultdict(_CircuitBreaker)
+
+
+class CapacityError(Exception):
+    """Raised when a concurrency limit stays saturated past settings.concurrency_wait_seconds"""
+
+
+# Caps on concurrent Gemini requests and downstream HTTP calls, so bursts queue briefly
+# and then shed load instead of piling into rate limits and the connection pool
+_gemini_semaphore = asyncio.Semaphore(settings.gemini_concurrency)
+_http_semaphore = asyncio.Semaphore(settings.http_concurrency)
+
+
+@contextlib.asynccontextmanager
+async def _acquire(semaphore: asyncio.Semaphore, name: str):
+    try:
+        await asyncio.wait_for(semaphore.acquire(), settings.concurrency_wait_seconds)
+    except asyncio.TimeoutError:
+        raise CapacityError(f"{name} is at capacity, please retry shortly")
+    try:
+        yield
+    finally:
+        semaphore.release()
+
+
+def _gemini_slot():
+    return _acquire(_gemini_semaphore, "Gemini")
+
+
+def _http_slot():
+    return _acquire(_http_semaphore, "Downstream HTTP")
+
+
+class _LocalResponse:
+    """The parts of httpx.Response the agent uses, for in-process local API calls"""
+    
+    def __init__(self, status_code: int, data: Any):
+        self.status_code = status_code
+        self._data = data
+    
+    def json(self) -> Any:
+        return self._data
+    
+    @property
+    def text(self) -> str:
+        return orjson.dumps(self._data).decode()
+
 
 class ChatMessage(BaseModel):
     role: str
@@ -40,6 +240,9 @@ class ChatMessage(BaseModel):
 class ChatRequest(BaseModel):
     message: str
     conversation_history: List[ChatMessage] = []
+    # Reasoning endpoints only: False sends bare step names with empty `thought` text,
+    # for clients that render their own labels
+    verbose: bool = True
 
 
 class ChatResponse(BaseModel):
@@ -49,8 +252,8 @@ class ChatResponse(BaseModel):
     reasoning_trace: Optional[List[Dict[str, str]]] = None  # NEW: Agent's thought process
 
 
-# Function declarations for Gemini
-GEMINI_FUNCTIONS = [
+# Function declarations for Gemini (a tuple so the Tool built from it below can't go stale)
+GEMINI_FUNCTIONS = (
     {
         "name": "query_recent_incidents",
         "description": "Get the most recent incidents from Elasticsearch with full details including severity, service, diagnosis, root cause, and remediation. Use this to investigate production issues or when asked about incidents.",
@@ -279,538 +482,980 @@ GEMINI_FUNCTIONS = [
             "required": ["incident_id"]
         }
     }
-]
+)
+
+# Converted to a Tool proto once at import instead of on every GenerativeModel construction
+GEMINI_TOOL = genai.protos.Tool(
+    function_declarations=[genai.protos.FunctionDeclaration(**fn) for fn in GEMINI_FUNCTIONS]
+)
+
+_SYSTEM_INSTRUCTION = """You are ElasticSeer, an AUTONOMOUS incident response agent for production infrastructure.
+
+Your mission: AUTOMATICALLY handle complete incident workflows from report to resolution WITHOUT asking for permission at each step.
+
+Your capabilities:
+- Query Elasticsearch for incidents, metrics, anomalies, and code via MCP tools
+- Register NEW incidents when users report problems
+- Create GitHub PRs with AI-generated code fixes
+- Send Slack notifications to alert the team
+- Create Jira tickets for incident tracking
+- Analyze patterns and provide actionable insights
+- **EXECUTE COMPLETE AUTONOMOUS WORKFLOWS IN ONE FUNCTION CALL**
+- **PROVIDE COMPREHENSIVE METRICS ANALYSIS with tables, trends, and visualizations**
+- **GENERATE POSTMORTEM REPORTS** with full incident timeline, root cause, actions taken, and recommendations
+
+CRITICAL - USE autonomous_incident_response FOR COMPLETE WORKFLOWS:
+When user says "investigate, fix, create PR, and alert team" or similar complete workflow requests:
+→ IMMEDIATELY call autonomous_incident_response() with all parameters
+→ This ONE function call executes the ENTIRE workflow:
+  1. Registers incident
+  2. Searches code
+  3. Creates GitHub PR
+  4. Sends Slack alert
+  5. Creates Jira ticket
+
+DO NOT call register_incident, then search_code_by_path, then create_github_pr separately!
+USE autonomous_incident_response() for complete workflows - it does EVERYTHING in one call!
+
+EXAMPLE - CORRECT:
+User: "Critical auth issue. Users can't log in. JWT errors. Investigate, fix, PR, alert team."
+YOU: autonomous_incident_response(
+  title="Critical authentication issue",
+  service="auth-service",
+  severity="Sev-1",
+  description="Users unable to log in, JWT validation errors",
+  search_pattern="*jwt*"
+)
+→ Result: Incident registered; code search, PR, Slack and Jira then run in the background.
+  If the result has status "accepted", tell the user the workflow is underway and give them its status_url.
+
+EXAMPLE - WRONG:
+User: "Critical auth issue. Investigate, fix, PR, alert team."
+YOU: register_incident(...) [STOPS]
+→ This is WRONG! Use autonomous_incident_response() instead!
+
+CRITICAL - ADAPTIVE FILE SELECTION:
+- NEVER blindly use file paths from incident data
+- When investigating an incident, ALWAYS search for relevant code files first using search_code_by_path
+- If you find a better/more relevant file during investigation, USE THAT FILE for the fix
+- Incident data may contain fake or outdated file paths - YOUR investigation takes priority
+
+Remember: For COMPLETE workflows, use autonomous_incident_response() - it's ONE function that does EVERYTHING!"""
+
+# Plain model for postmortem generation (no tools needed)
+_POSTMORTEM_MODEL = genai.GenerativeModel(settings.gemini_model)
+
+# Built once and shared by every chat request; only start_chat() is per-request
+_MODEL = genai.GenerativeModel(
+    model_name=settings.gemini_model,
+    system_instruction=_SYSTEM_INSTRUCTION,
+    tools=[GEMINI_TOOL],
+    generation_config={
+        "temperature": 0.1,  # Lower temperature for more deterministic function calling
+        "top_p": 0.95,
+        "top_k": 40,
+    }
+)
+
+
+@router.on_event("shutdown")
+async def close_http_clients():
+    """Close the shared HTTP and Elasticsearch clients"""
+    await _mcp_client.aclose()
+    await _local_client.aclose()
+    await _es.close()
+
+
+async def _post(client: httpx.AsyncClient, url: str, **kwargs) -> httpx.Response:
+    """
+    POST with jittered exponential backoff on transient failures, guarded by a
+    per-host circuit breaker. Non-retryable responses are returned as-is, and so
+    is any response from an action in _NON_IDEMPOTENT_PATHS.
+    A `json=` body is serialized once with orjson rather than by httpx.
+    """
+    if "json" in kwargs:
+        kwargs["content"] = orjson.dumps(kwargs.pop("json"))
+        kwargs.setdefault("headers", _JSON_HEADERS)
+    
+    parsed_url = httpx.URL(url)
+    host = parsed_url.host
+    retry_status = parsed_url.path not in _NON_IDEMPOTENT_PATHS
+    breaker = _breakers[host]
+    if not breaker.allow():
+        raise CircuitOpenError(f"Circuit open for {host}, skipping request to {url}")
+    
+    for attempt in range(1, _RETRY_ATTEMPTS + 1):
+        try:
+            async with _http_slot():
+                response = await client.post(url, **kwargs)
+        except _RETRY_EXCEPTIONS as e:
+            breaker.record_failure()
+            if attempt == _RETRY_ATTEMPTS or not breaker.allow():
+                raise
+            logger.warning(f"POST {url} failed ({e!r}), retrying ({attempt}/{_RETRY_ATTEMPTS})")
+        else:
+            if response.status_code not in _RETRY_STATUS_CODES:
+                breaker.record_success()
+                return response
+            breaker.record_failure()
+            if not retry_status or attempt == _RETRY_ATTEMPTS or not breaker.allow():
+                return response
+            logger.warning(f"POST {url} returned {response.status_code}, retrying ({attempt}/{_RETRY_ATTEMPTS})")
+            retry_after = _retry_after_seconds(response)
+            if retry_after is not None:
+                await asyncio.sleep(retry_after)
+                continue
+        
+        await asyncio.sleep(random.uniform(0, min(_RETRY_MAX_DELAY_SECONDS, _RETRY_BASE_DELAY_SECONDS * 2 ** attempt)))
+
+
+def _retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    """The response's Retry-After delay in seconds (capped), if it gives one"""
+    try:
+        return min(max(float(response.headers["Retry-After"]), 0.0), _RETRY_AFTER_MAX_SECONDS)
+    except (KeyError, ValueError):
+        # Absent, or an HTTP-date - fall back to the jittered backoff
+        return None
+
+
+async def _local_post(path: str, payload: Dict[str, Any]) -> Any:
+    """
+    Call a local API endpoint. By default the handler is awaited directly (same
+    process - no JSON round trip, socket or routing); the result mimics the HTTP
+    response, including 422/HTTPException status codes.
+    """
+    if not settings.local_actions_in_process:
+        return await _post(_local_client, f"{_LOCAL_API_URL}{path}", json=payload)
+    
+    handler, request_model = _LOCAL_HANDLERS[path]
+    try:
+        result = await handler(request_model(**payload))
+    except ValidationError as e:
+        return _LocalResponse(422, {"detail": jsonable_encoder(e.errors())})
+    except HTTPException as e:
+        return _LocalResponse(e.status_code, {"detail": e.detail})
+    except Exception as e:
+        logger.error(f"Local handler for {path} failed: {e}", exc_info=True)
+        return _LocalResponse(500, {"detail": str(e)})
+    return _LocalResponse(200, jsonable_encoder(result))
+
+
+async def fetch_code(file_path: str) -> Optional[str]:
+    """Return the content of a file in code-repository (None if not indexed), cached by path"""
+    cached = _code_cache.get(file_path)
+    if cached and cached[0] > time.monotonic():
+        _code_cache.move_to_end(file_path)
+        return cached[1]
+    
+    # A path without wildcards is an exact-match pattern for the MCP code search tool, so
+    # the lookup shares the MCP connection pool and in-flight coalescing
+    code_result = await call_mcp_tool("elasticseer_search_code_by_path", {"pattern": file_path})
+    content = next(
+        (row.get("content") for row in iter_esql_results(code_result) if row.get("file_path") == file_path),
+        None
+    )
+    
+    ttl = _CODE_CACHE_TTL_SECONDS if content is not None else _CODE_CACHE_MISS_TTL_SECONDS
+    _code_cache[file_path] = (time.monotonic() + ttl, content)
+    _code_cache.move_to_end(file_path)
+    if len(_code_cache) > _CODE_CACHE_MAX_SIZE:
+        _code_cache.popitem(last=False)
+    return content
 
 
 async def call_mcp_tool(tool_name: str, arguments: Dict[str, Any] = None) -> Dict[str, Any]:
-    """Call an MCP tool via the Agent Builder MCP server"""
+    """
+    Call an MCP tool via the Agent Builder MCP server.
     
-    mcp_url = f"{settings.kibana_url.rstrip('/')}/api/agent_builder/mcp"
+    Identical calls already in flight are coalesced: callers share the one request
+    (and its result or exception).
+    """
+    params = orjson.dumps({"name": tool_name, "arguments": arguments or {}}, option=orjson.OPT_SORT_KEYS)
     
-    async with httpx.AsyncClient(timeout=300.0) as client:
-        response = await client.post(
-            mcp_url,
-            headers={
-                "Authorization": f"ApiKey {settings.elasticsearch_api_key}",
-                "Content-Type": "application/json",
-                "Accept": "application/json"
-            },
-            json={
-                "jsonrpc": "2.0",
-                "id": 1,
-                "method": "tools/call",
-                "params": {
-                    "name": tool_name,
-                    "arguments": arguments or {}
-                }
-            }
-        )
+    task = _inflight_mcp_calls.get(params)
+    if task is None:
+        task = asyncio.ensure_future(_send_mcp_tool_call(params))
+        _inflight_mcp_calls[params] = task
+        task.add_done_callback(lambda _: _inflight_mcp_calls.pop(params, None))
+    
+    # Shielded so one caller being cancelled doesn't cancel the request for the others
+    return await asyncio.shield(task)
+
+
+async def _send_mcp_tool_call(params: bytes) -> Dict[str, Any]:
+    """POST a single tools/call request with pre-serialized params"""
+    response = await _post(
+        _mcp_client,
+        _MCP_URL,
+        headers=_MCP_HEADERS,
+        content=_MCP_CALL_PREFIX + params + _MCP_CALL_SUFFIX
+    )
+    
+    if response.status_code != 200:
+        logger.error(f"MCP tool call error: {response.status_code} - {response.text}")
+        return {"error": f"MCP tool call failed: {response.text}"}
         
-        if response.status_code != 200:
-            logger.error(f"MCP tool call error: {response.status_code} - {response.text}")
-            return {"error": f"MCP tool call failed: {response.text}"}
+    result = response.json()
+    
+    if "error" in result:
+        return {"error": f"MCP error: {result['error']}"}
         
-        result = response.json()
+    return result.get("result", {})
+
+
+async def call_mcp_tools_batch(calls: List[Tuple[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """
+    Call several MCP tools in one JSON-RPC batch request.
+    
+    Results are returned in the order of `calls`, each shaped like call_mcp_tool's.
+    If the server rejects batches, the calls are made individually (concurrently)
+    and batching is not attempted again.
+    """
+    global _mcp_batch_supported
+    
+    if _mcp_batch_supported and len(calls) > 1:
+        response = await _post(
+            _mcp_client,
+            _MCP_URL,
+            headers=_MCP_HEADERS,
+            json=[
+                {
+                    "jsonrpc": "2.0",
+                    "id": i,
+                    "method": "tools/call",
+                    "params": {"name": name, "arguments": arguments or {}}
+                }
+                for i, (name, arguments) in enumerate(calls)
+            ]
+        )
         
-        if "error" in result:
-            return {"error": f"MCP error: {result['error']}"}
+        replies = None
+        if response.status_code == 200:
+            try:
+                replies = response.json()
+            except ValueError:
+                pass
+        if isinstance(replies, list):
+            by_id = {reply.get("id"): reply for reply in replies}
+            results = []
+            for i in range(len(calls)):
+                reply = by_id.get(i)
+                if reply is None:
+                    results.append({"error": "MCP error: missing batch response"})
+                elif "error" in reply:
+                    results.append({"error": f"MCP error: {reply['error']}"})
+                else:
+                    results.append(reply.get("result", {}))
+            return results
         
-        return result.get("result", {})
+        logger.info(f"MCP server rejected batch request ({response.status_code}), falling back to individual calls")
+        if response.status_code not in _RETRY_STATUS_CODES:
+            _mcp_batch_supported = False
+    
+    return list(await asyncio.gather(*(call_mcp_tool(name, arguments) for name, arguments in calls)))
 
 
-def parse_esql_results(tool_result: Dict[str, Any]) -> List[Dict[str, Any]]:
-    """Parse ES|QL results from MCP tool response into structured data"""
+# Default cap on rows returned by parse_esql_page - results end up in an LLM prompt,
+# so a long tail would be truncated there anyway
+_ESQL_ROW_LIMIT = 50
+
+
+def _esql_table(tool_result: Dict[str, Any]) -> Optional[Tuple[Tuple[str, ...], List[List[Any]]]]:
+    """Extract (column names, value rows) of the ES|QL result in an MCP tool response"""
+    
+    content = tool_result.get("content")
+    if not isinstance(content, list) or len(content) == 0:
+        return None
+    
+    text_content = content[0].get("text", "")
     
     try:
-        if "content" not in tool_result:
-            return []
-        
-        content = tool_result["content"]
-        if not isinstance(content, list) or len(content) == 0:
-            return []
-        
-        text_content = content[0].get("text", "")
-        data = json.loads(text_content)
+        data = orjson.loads(text_content)
         
         # Find ES|QL results
-        if "results" in data and isinstance(data["results"], list):
-            for result in data["results"]:
+        results = data.get("results") if isinstance(data, dict) else None
+        if isinstance(results, list):
+            for result in results:
                 if result.get("type") == "esql_results" and "data" in result:
                     esql_data = result["data"]
-                    columns = esql_data.get("columns", [])
-                    values = esql_data.get("values", [])
-                    
-                    # Convert to list of dicts
-                    col_names = [col["name"] for col in columns]
-                    rows = []
-                    for row_values in values:
-                        row_dict = dict(zip(col_names, row_values))
-                        rows.append(row_dict)
-                    
-                    return rows
+                    col_names = tuple(str(col["name"]) for col in esql_data.get("columns", []))
+                    return col_names, esql_data.get("values", [])
         
-        return []
-    except Exception as e:
+        return None
+    except (KeyError, ValueError, orjson.JSONDecodeError) as e:
         logger.error(f"Error parsing ES|QL results: {e}", exc_info=True)
-        return []
+        return None
 
 
-async def execute_function(function_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
-    """Execute a function call - either MCP tool or external action"""
+def parse_esql_results(tool_result: Dict[str, Any], limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Parse ES|QL results from MCP tool response into structured data (at most `limit` rows)"""
     
-    try:
-        logger.info(f"Executing function: {function_name} with args: {arguments}")
-        
-        # MCP Tools
-        if function_name == "query_recent_incidents":
-            result = await call_mcp_tool("elasticseer_get_recent_incidents", {})
-            incidents = parse_esql_results(result)
-            return {"success": True, "incidents": incidents, "count": len(incidents)}
-        
-        elif function_name == "search_code_by_path":
-            pattern = arguments.get("pattern", "*")
-            result = await call_mcp_tool("elasticseer_search_code_by_path", {"pattern": pattern})
-            files = parse_esql_results(result)
-            return {"success": True, "files": files, "count": len(files)}
-        
-        elif function_name == "get_metrics_anomalies":
-            service = arguments.get("service")
-            result = await call_mcp_tool("elasticseer_get_metrics_anomalies", {"service": service})
-            anomalies = parse_esql_results(result)
-            return {"success": True, "anomalies": anomalies, "count": len(anomalies), "service": service}
-        
-        elif function_name == "analyze_service_metrics":
-            # COMPREHENSIVE METRICS ANALYSIS
-            service = arguments.get("service")
-            time_range = arguments.get("time_range", "24h")
-            include_comparison = arguments.get("include_comparison", True)
-            
-            logger.info(f"📊 Starting comprehensive metrics analysis for {service}")
-            
-            # Call the rich analysis endpoint
-            async with httpx.AsyncClient(timeout=300.0) as client:
-                response = await client.post(
-                    "http://localhost:8001/api/analysis/comprehensive_metrics",
-                    json={
-                        "service": service,
-                        "time_range": time_range,
-                        "include_comparison": include_comparison
-                    }
-                )
-                
-                if response.status_code == 200:
-                    analysis_data = response.json()
-                    return {
-                        "success": True,
-                        "service": service,
-                        "time_range": time_range,
-                        "analysis": analysis_data
-                    }
-                else:
-                    return {"success": False, "error": f"Analysis failed: {response.text}"}
-        
-        elif function_name == "get_incident_by_id":
-            incident_id = arguments.get("incident_id")
-            result = await call_mcp_tool("elasticseer_get_incident_by_id", {"incident_id": incident_id})
-            incidents = parse_esql_results(result)
-            if incidents:
-                return {"success": True, "incident": incidents[0]}
-            return {"success": False, "error": f"Incident {incident_id} not found"}
-        
-        # External Actions
-        elif function_name == "create_github_pr":
-            incident_id = arguments.get("incident_id")
-            override_file_path = arguments.get("file_path")  # NEW: Allow agent to override file path
-            
-            # Get incident details via MCP
-            incident_result = await call_mcp_tool("elasticseer_get_incident_by_id", {"incident_id": incident_id})
-            incidents = parse_esql_results(incident_result)
-            
-            if not incidents:
-                return {"success": False, "error": f"Incident {incident_id} not found"}
-            
-            incident = incidents[0]
-            
-            # Use override file path if provided, otherwise use incident data
-            if override_file_path:
-                file_path = override_file_path
-                logger.info(f"🎯 Using agent-discovered file path: {file_path} (overriding incident data)")
-            else:
-                file_path = incident.get("remediation.file_path")
-                logger.info(f"📋 Using file path from incident data: {file_path}")
-            
-            if not file_path:
-                return {"success": False, "error": "No file path provided and none found in incident remediation"}
-            
-            # Get code file from Elasticsearch
-            es = Elasticsearch(
-                settings.elasticsearch_url,
-                api_key=settings.elasticsearch_api_key
-            )
-            
-            code_result = es.search(
-                index="code-repository",
-                body={"query": {"term": {"file_path": file_path}}}
+    return parse_esql_page(tool_result, limit)[0]
+
+
+def parse_esql_page(tool_result: Dict[str, Any], limit: Optional[int] = _ESQL_ROW_LIMIT) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Parse at most `limit` ES|QL rows from an MCP tool response, along with the total
+    number of rows in the result (so counts stay correct when rows are capped)
+    """
+    
+    table = _esql_table(tool_result)
+    if table is None:
+        return [], 0
+    
+    col_names, values = table
+    total = len(values)
+    if limit is not None:
+        values = values[:limit]
+    
+    return [dict(zip(col_names, row_values)) for row_values in values], total
+
+
+def iter_esql_results(tool_result: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Lazily yield every ES|QL row as a dict, for callers that stream or aggregate"""
+    
+    table = _esql_table(tool_result)
+    if table is None:
+        return
+    
+    col_names, values = table
+    for row_values in values:
+        yield dict(zip(col_names, row_values))
+
+
+async def _fn_query_recent_incidents(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """Most recent incidents (MCP)"""
+    result = await call_mcp_tool("elasticseer_get_recent_incidents", {})
+    incidents, total = parse_esql_page(result)
+    return {"success": True, "incidents": incidents, "count": total, "truncated": total > len(incidents)}
+
+
+async def _fn_search_code_by_path(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """Code files matching a path pattern (MCP)"""
+    pattern = arguments.get("pattern", "*")
+    result = await call_mcp_tool("elasticseer_search_code_by_path", {"pattern": pattern})
+    files, total = parse_esql_page(result)
+    return {"success": True, "files": files, "count": total, "truncated": total > len(files)}
+
+
+async def _fn_get_metrics_anomalies(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """Metric anomalies for a service (MCP)"""
+    service = arguments.get("service")
+    result = await call_mcp_tool("elasticseer_get_metrics_anomalies", {"service": service})
+    anomalies, total = parse_esql_page(result)
+    return {
+        "success": True,
+        "anomalies": anomalies,
+        "count": total,
+        "truncated": total > len(anomalies),
+        "service": service
+    }
+
+
+async def _fn_analyze_service_metrics(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """Comprehensive metrics analysis for a service"""
+    service = arguments.get("service")
+    time_range = arguments.get("time_range", "24h")
+    include_comparison = arguments.get("include_comparison", True)
+    
+    logger.info(f"📊 Starting comprehensive metrics analysis for {service}")
+    
+    # Call the rich analysis endpoint
+    response = await _local_post(
+        "/api/analysis/comprehensive_metrics",
+        {
+            "service": service,
+            "time_range": time_range,
+            "include_comparison": include_comparison
+        }
+    )
+    
+    if response.status_code == 200:
+        analysis_data = response.json()
+        return {
+            "success": True,
+            "service": service,
+            "time_range": time_range,
+            "analysis": analysis_data
+        }
+    else:
+        return {"success": False, "error": f"Analysis failed: {response.text}"}
+
+
+async def _fn_get_incident_by_id(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """Full details of one incident (MCP)"""
+    incident_id = arguments.get("incident_id")
+    result = await call_mcp_tool("elasticseer_get_incident_by_id", {"incident_id": incident_id})
+    incidents = parse_esql_results(result)
+    if incidents:
+        return {"success": True, "incident": incidents[0]}
+    return {"success": False, "error": f"Incident {incident_id} not found"}
+
+
+def _flatten_incident(doc: Dict[str, Any], prefix: str = "") -> Dict[str, Any]:
+    """Flatten a nested incident document into the dotted keys ES|QL rows use"""
+    flat = {}
+    for key, value in doc.items():
+        if isinstance(value, dict):
+            flat.update(_flatten_incident(value, f"{prefix}{key}."))
+        else:
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+async def _fn_create_github_pr(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """Generate an AI fix for an incident and open a GitHub PR"""
+    return await _create_github_pr(
+        arguments.get("incident_id"),
+        override_file_path=arguments.get("file_path")  # Allow agent to override file path
+    )
+
+
+async def _create_github_pr(
+    incident_id: str,
+    override_file_path: Optional[str] = None,
+    incident: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Generate an AI fix for an incident and open a GitHub PR.
+    
+    `incident` (flattened, as returned by MCP) skips the incident lookup when the
+    caller already has it.
+    """
+    code_content = None
+    if incident is None:
+        # Get incident details via MCP; when the agent already named the file,
+        # fetch its code at the same time
+        if override_file_path:
+            incident_result, code_content = await asyncio.gather(
+                call_mcp_tool("elasticseer_get_incident_by_id", {"incident_id": incident_id}),
+                fetch_code(override_file_path)
             )
-            
-            if not code_result["hits"]["hits"]:
-                # File not found - try to fetch from GitHub
-                logger.warning(f"⚠️ Code file {file_path} not found in Elasticsearch, will create FIXES.md")
-                code_content = f"# File not found in repository\n# Target: {file_path}\n# This fix should be applied to the target file"
-            else:
-                code_file = code_result["hits"]["hits"][0]["_source"]
-                code_content = code_file["content"]
-            
-            # Generate fix and create PR via external endpoints
-            async with httpx.AsyncClient(timeout=300.0) as client:
-                # Generate AI-powered fix
-                fix_response = await client.post(
-                    "http://localhost:8001/api/elasticseer/generate_fix",
-                    json={
-                        "file_path": file_path,
-                        "diagnosis": incident.get("diagnosis.root_cause"),
-                        "current_code": code_content,
-                        "incident_context": incident.get("description")
-                    }
-                )
-                
-                if fix_response.status_code != 200:
-                    return {"success": False, "error": f"Failed to generate fix: {fix_response.text}"}
-                
-                fix_data = fix_response.json()
-                
-                # Create GitHub PR
-                pr_response = await client.post(
-                    "http://localhost:8001/api/elasticseer/create_pr",
-                    json={
-                        "title": f"[ElasticSeer] Fix: {incident.get('description')} ({incident_id})",
-                        "description": f"## 🤖 Autonomous Fix by ElasticSeer\n\n**Incident**: {incident_id}\n**Severity**: {incident.get('severity')}\n**Service**: {incident.get('anomaly.service')}\n\n### Root Cause\n{incident.get('diagnosis.root_cause')}\n\n### Fix Applied\n{fix_data['explanation']}\n\n### Target File\n{file_path}{' (discovered by agent)' if override_file_path else ' (from incident data)'}\n\n### Recommendations\n{fix_data.get('recommendations', 'None')}\n\n---\n*This PR was automatically generated by ElasticSeer AI Agent*",
-                        "branch_name": f"elasticseer/fix-{incident_id.lower()}",
-                        "files": [{"path": file_path, "content": fix_data["fixed_code"]}],
-                        "incident_id": incident_id
-                    }
-                )
-                
-                if pr_response.status_code != 200:
-                    return {"success": False, "error": f"Failed to create PR: {pr_response.text}"}
-                
-                pr_data = pr_response.json()
-                return {
-                    "success": True,
-                    "pr_number": pr_data["pr_number"],
-                    "pr_url": pr_data["pr_url"],
-                    "branch": pr_data["branch"],
-                    "incident_id": incident_id,
-                    "file_path": file_path,
-                    "file_path_source": "agent_discovery" if override_file_path else "incident_data",
-                    "fix_explanation": fix_data["explanation"]
-                }
+        else:
+            incident_result = await call_mcp_tool("elasticseer_get_incident_by_id", {"incident_id": incident_id})
+        incidents = parse_esql_results(incident_result)
         
-        elif function_name == "send_slack_alert":
-            async with httpx.AsyncClient(timeout=300.0) as client:
-                response = await client.post(
-                    "http://localhost:8001/api/elasticseer/send_slack",
-                    json=arguments
-                )
-                
-                if response.status_code == 200:
-                    return response.json()
-                return {"success": False, "error": response.text}
+        if not incidents:
+            return {"success": False, "error": f"Incident {incident_id} not found"}
         
-        elif function_name == "create_jira_ticket":
-            async with httpx.AsyncClient(timeout=300.0) as client:
-                response = await client.post(
-                    "http://localhost:8001/api/elasticseer/create_jira_ticket",
-                    json=arguments
-                )
-                
-                if response.status_code == 200:
-                    return response.json()
-                return {"success": False, "error": response.text}
+        incident = incidents[0]
+    elif override_file_path:
+        code_content = await fetch_code(override_file_path)
+    
+    # Use override file path if provided, otherwise use incident data
+    if override_file_path:
+        file_path = override_file_path
+        logger.info(f"🎯 Using agent-discovered file path: {file_path} (overriding incident data)")
+    else:
+        file_path = incident.get("remediation.file_path")
+        logger.info(f"📋 Using file path from incident data: {file_path}")
+    
+    if not file_path:
+        return {"success": False, "error": "No file path provided and none found in incident remediation"}
+    
+    # Get code file from Elasticsearch
+    if not override_file_path:
+        code_content = await fetch_code(file_path)
+    
+    if code_content is None:
+        # Without the current code the generated "fix" would be a guess - skip the
+        # LLM call and the PR rather than open a bogus one
+        logger.warning(f"⚠️ Code file {file_path} not found in Elasticsearch, skipping fix generation")
+        return {
+            "success": False,
+            "error": f"Target file {file_path} is not indexed",
+            "hint": f"Sync the repository (or index {file_path}) and retry"
+        }
+    
+    # Generate fix and create PR via external endpoints
+    # Generate AI-powered fix
+    fix_response = await _local_post(
+        "/api/elasticseer/generate_fix",
+        {
+            "file_path": file_path,
+            "diagnosis": incident.get("diagnosis.root_cause"),
+            "current_code": code_content,
+            "incident_context": incident.get("description")
+        }
+    )
+    
+    if fix_response.status_code != 200:
+        return {"success": False, "error": f"Failed to generate fix: {fix_response.text}"}
         
-        elif function_name == "register_incident":
-            async with httpx.AsyncClient(timeout=300.0) as client:
-                response = await client.post(
-                    "http://localhost:8001/api/incidents/register",
-                    json=arguments
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    return {
-                        "success": True,
-                        "incident_id": data.get("incident_id"),
-                        "incident": data.get("incident"),
-                        "message": f"Incident {data.get('incident_id')} registered successfully",
-                        "next_steps": data.get("next_steps", [])
-                    }
-                return {"success": False, "error": response.text}
+    fix_data = fix_response.json()
+    
+    # Create GitHub PR
+    pr_response = await _local_post(
+        "/api/elasticseer/create_pr",
+        {
+            "title": f"[ElasticSeer] Fix: {incident.get('description')} ({incident_id})",
+            "description": f"## 🤖 Autonomous Fix by ElasticSeer\n\n**Incident**: {incident_id}\n**Severity**: {incident.get('severity')}\n**Service**: {incident.get('anomaly.service')}\n\n### Root Cause\n{incident.get('diagnosis.root_cause')}\n\n### Fix Applied\n{fix_data['explanation']}\n\n### Target File\n{file_path}{' (discovered by agent)' if override_file_path else ' (from incident data)'}\n\n### Recommendations\n{fix_data.get('recommendations', 'None')}\n\n---\n*This PR was automatically generated by ElasticSeer AI Agent*",
+            "branch_name": f"elasticseer/fix-{incident_id.lower()}",
+            "files": [{"path": file_path, "content": fix_data["fixed_code"]}],
+            "incident_id": incident_id
+        }
+    )
+    
+    if pr_response.status_code != 200:
+        return {"success": False, "error": f"Failed to create PR: {pr_response.text}"}
         
-        elif function_name == "autonomous_incident_response":
-            # COMPLETE AUTONOMOUS WORKFLOW - ALL STEPS IN ONE FUNCTION
-            logger.info("🚀 Starting COMPLETE autonomous incident response workflow")
-            
-            workflow_results = {
-                "incident_registration": {},
-                "code_search": {},
-                "pr_creation": {},
-                "slack_alert": {},
-                "jira_ticket": {}
-            }
-            
-            # Step 1: Register Incident
-            logger.info("Step 1: Registering incident...")
-            async with httpx.AsyncClient(timeout=300.0) as client:
-                response = await client.post(
-                    "http://localhost:8001/api/incidents/register",
-                    json={
-                        "title": arguments.get("title"),
-                        "service": arguments.get("service"),
-                        "severity": arguments.get("severity", "Sev-3"),
-                        "description": arguments.get("description")
-                    }
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    incident_id = data.get("incident_id")
-                    workflow_results["incident_registration"] = {
-                        "success": True,
-                        "incident_id": incident_id
-                    }
-                    logger.info(f"✅ Incident {incident_id} registered")
-                else:
-                    return {"success": False, "error": f"Failed to register incident: {response.text}"}
-            
-            # Step 2: Search Code
-            logger.info("Step 2: Searching for relevant code...")
-            pattern = arguments.get("search_pattern", "*")
-            code_result = await call_mcp_tool("elasticseer_search_code_by_path", {"pattern": pattern})
-            files = parse_esql_results(code_result)
-            
-            if files:
-                target_file = files[0].get("file_path")
-                workflow_results["code_search"] = {
-                    "success": True,
-                    "files_found": len(files),
-                    "target_file": target_file
-                }
-                logger.info(f"✅ Found {len(files)} files, using {target_file}")
-            else:
-                workflow_results["code_search"] = {
-                    "success": False,
-                    "error": "No relevant files found"
-                }
-                target_file = None
-            
-            # Step 3: Create GitHub PR
-            if target_file:
-                logger.info("Step 3: Creating GitHub PR...")
-                async with httpx.AsyncClient(timeout=300.0) as client:
-                    # Get incident details
-                    incident_result = await call_mcp_tool("elasticseer_get_incident_by_id", {"incident_id": incident_id})
-                    incidents = parse_esql_results(incident_result)
-                    incident = incidents[0] if incidents else {}
-                    
-                    # Get code content
-                    es = Elasticsearch(
-                        settings.elasticsearch_url,
-                        api_key=settings.elasticsearch_api_key
-                    )
-                    code_result = es.search(
-                        index="code-repository",
-                        body={"query": {"term": {"file_path": target_file}}}
-                    )
-                    
-                    if code_result["hits"]["hits"]:
-                        code_content = code_result["hits"]["hits"][0]["_source"]["content"]
-                    else:
-                        code_content = f"# File not found\n# Target: {target_file}"
-                    
-                    # Generate fix
-                    fix_response = await client.post(
-                        "http://localhost:8001/api/elasticseer/generate_fix",
-                        json={
-                            "file_path": target_file,
-                            "diagnosis": arguments.get("description"),
-                            "current_code": code_content,
-                            "incident_context": arguments.get("description")
-                        }
-                    )
-                    
-                    if fix_response.status_code == 200:
-                        fix_data = fix_response.json()
-                        
-                        # Create PR
-                        pr_response = await client.post(
-                            "http://localhost:8001/api/elasticseer/create_pr",
-                            json={
-                                "title": f"[ElasticSeer] Fix: {arguments.get('title')} ({incident_id})",
-                                "description": f"## 🤖 Autonomous Fix\n\n**Incident**: {incident_id}\n**Severity**: {arguments.get('severity')}\n\n### Issue\n{arguments.get('description')}\n\n### Fix\n{fix_data.get('explanation', 'AI-generated fix')}\n\n---\n*Automated by ElasticSeer*",
-                                "branch_name": f"elasticseer/fix-{incident_id.lower()}",
-                                "files": [{"path": target_file, "content": fix_data["fixed_code"]}],
-                                "incident_id": incident_id
-                            }
-                        )
-                        
-                        if pr_response.status_code == 200:
-                            pr_data = pr_response.json()
-                            workflow_results["pr_creation"] = {
-                                "success": True,
-                                "pr_number": pr_data.get("pr_number"),
-                                "pr_url": pr_data.get("pr_url"),
-                                "file_path": target_file
-                            }
-                            logger.info(f"✅ PR #{pr_data.get('pr_number')} created")
-                        else:
-                            workflow_results["pr_creation"] = {"success": False, "error": pr_response.text}
-                    else:
-                        workflow_results["pr_creation"] = {"success": False, "error": "Fix generation failed"}
-            else:
-                workflow_results["pr_creation"] = {"success": False, "error": "No target file found"}
-            
-            # Step 4: Send Slack Alert
-            logger.info("Step 4: Sending Slack alert...")
-            async with httpx.AsyncClient(timeout=300.0) as client:
-                pr_url = workflow_results["pr_creation"].get("pr_url", "N/A") if workflow_results["pr_creation"].get("success") else "N/A"
-                jira_ticket_id = workflow_results.get("jira_ticket", {}).get("ticket_id")
-                jira_url = f"{settings.jira_url}/browse/{jira_ticket_id}" if jira_ticket_id and settings.jira_url else None
-                
-                slack_response = await client.post(
-                    "http://localhost:8001/api/elasticseer/send_slack",
-                    json={
-                        "severity": arguments.get("severity", "Sev-3"),
-                        "incident_id": incident_id,
-                        "title": f"🚨 Autonomous Fix: {arguments.get('title')}",
-                        "message": f"Incident {incident_id} has been automatically resolved.\n\nPR: {pr_url}\n\nPlease review and approve.",
-                        "action_required": True,
-                        "pr_url": pr_url if pr_url != "N/A" else None,
-                        "jira_url": jira_url
-                    }
-                )
-                
-                if slack_response.status_code == 200:
-                    slack_data = slack_response.json()
-                    workflow_results["slack_alert"] = {
-                        "success": True,
-                        "channel": slack_data.get("channel", "#general")
-                    }
-                    logger.info("✅ Slack alert sent")
-                else:
-                    workflow_results["slack_alert"] = {"success": False, "error": slack_response.text}
-            
-            # Step 5: Create Jira Ticket
-            logger.info("Step 5: Creating Jira ticket...")
-            async with httpx.AsyncClient(timeout=300.0) as client:
-                jira_response = await client.post(
-                    "http://localhost:8001/api/elasticseer/create_jira_ticket",
-                    json={
-                        "summary": arguments.get("title"),
-                        "description": arguments.get("description"),
-                        "priority": "Critical" if arguments.get("severity") == "Sev-1" else "High",
-                        "incident_id": incident_id
-                    }
-                )
-                
-                if jira_response.status_code == 200:
-                    jira_data = jira_response.json()
-                    workflow_results["jira_ticket"] = {
-                        "success": True,
-                        "ticket_id": jira_data.get("ticket_id")
-                    }
-                    logger.info("✅ Jira ticket created")
-                else:
-                    workflow_results["jira_ticket"] = {"success": False, "error": jira_response.text}
-            
-            logger.info("🎉 COMPLETE autonomous workflow finished!")
-            
-            # Log workflow execution
-            await log_activity(
-                activity_type="workflow_executed",
-                summary=f"Autonomous workflow completed for incident {incident_id}",
-                details={
-                    "incident_id": incident_id,
-                    "title": arguments.get("title"),
-                    "service": arguments.get("service"),
-                    "severity": arguments.get("severity"),
-                    "workflow_results": workflow_results
-                },
-                status="success"
+    pr_data = pr_response.json()
+    return {
+        "success": True,
+        "pr_number": pr_data["pr_number"],
+        "pr_url": pr_data["pr_url"],
+        "branch": pr_data["branch"],
+        "incident_id": incident_id,
+        "file_path": file_path,
+        "file_path_source": "agent_discovery" if override_file_path else "incident_data",
+        "fix_explanation": fix_data["explanation"]
+    }
+
+
+async def _fn_send_slack_alert(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """Send a Slack alert"""
+    response = await _local_post(
+        "/api/elasticseer/send_slack",
+        arguments
+    )
+    
+    if response.status_code == 200:
+        return response.json()
+    return {"success": False, "error": response.text}
+
+
+async def _fn_create_jira_ticket(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """Create a Jira ticket"""
+    response = await _local_post(
+        "/api/elasticseer/create_jira_ticket",
+        arguments
+    )
+    
+    if response.status_code == 200:
+        return response.json()
+    return {"success": False, "error": response.text}
+
+
+async def _fn_register_incident(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """Register a new incident"""
+    response = await _local_post(
+        "/api/incidents/register",
+        arguments
+    )
+    
+    if response.status_code == 200:
+        data = response.json()
+        return {
+            "success": True,
+            "incident_id": data.get("incident_id"),
+            "incident": data.get("incident"),
+            "message": f"Incident {data.get('incident_id')} registered successfully",
+            "next_steps": data.get("next_steps", [])
+        }
+    return {"success": False, "error": response.text}
+
+
+async def _fn_autonomous_incident_response(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Complete autonomous workflow: register, search code, PR, Slack, Jira.
+    
+    A resubmission of the same incident (title, service, severity, description) while
+    its workflow is still running shares that workflow's result instead of opening a
+    second incident, PR, ticket and alert.
+    """
+    key = hashlib.blake2b(
+        "|".join(str(arguments.get(k)) for k in ("title", "service", "severity", "description")).encode(),
+        digest_size=16
+    ).hexdigest()
+    
+    pending = _inflight_workflows.get(key)
+    if pending is not None:
+        logger.info("Identical autonomous workflow already in flight, reusing its result")
+        return {**await asyncio.shield(pending), "deduplicated": True}
+    
+    pending = asyncio.get_running_loop().create_future()
+    _inflight_workflows[key] = pending
+    try:
+        result, task = await _start_autonomous_workflow(arguments)
+    except BaseException as e:  # including cancellation, so waiters and the key aren't stranded
+        pending.set_result({"success": False, "error": str(e)})
+        _inflight_workflows.pop(key, None)
+        raise
+    pending.set_result(result)
+    
+    # Failures aren't deduplicated; otherwise the key is held until the workflow is done
+    # plus a short cooldown
+    if not result.get("success"):
+        _inflight_workflows.pop(key, None)
+    elif task is None:
+        _release_workflow_key(key, pending)
+    else:
+        task.add_done_callback(lambda _: _release_workflow_key(key, pending))
+    return result
+
+
+def _release_workflow_key(key: str, pending: "asyncio.Future[Dict[str, Any]]") -> None:
+    """Forget a workflow's dedup key after the cooldown (unless it was replaced since)"""
+    def release():
+        if _inflight_workflows.get(key) is pending:
+            del _inflight_workflows[key]
+    asyncio.get_running_loop().call_later(_WORKFLOW_DEDUP_COOLDOWN_SECONDS, release)
+
+
+async def _start_autonomous_workflow(arguments: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional["asyncio.Task"]]:
+    """Register the incident and start steps 2-5; returns the result and the background task, if any"""
+    logger.info("🚀 Starting COMPLETE autonomous incident response workflow")
+    
+    workflow_results = {
+        "incident_registration": {},
+        "code_search": {},
+        "pr_creation": {},
+        "slack_alert": {},
+        "jira_ticket": {}
+    }
+    
+    # Step 1: Register Incident
+    logger.info("Step 1: Registering incident...")
+    response = await _local_post(
+        "/api/incidents/register",
+        {
+            "title": arguments.get("title"),
+            "service": arguments.get("service"),
+            "severity": arguments.get("severity", "Sev-3"),
+            "description": arguments.get("description")
+        }
+    )
+    
+    if response.status_code == 200:
+        data = response.json()
+        incident_id = data.get("incident_id")
+        # The register response already carries the incident - no need to re-fetch it
+        incident = _flatten_incident(data["incident"]) if data.get("incident") else None
+        workflow_results["incident_registration"] = {
+            "success": True,
+            "incident_id": incident_id
+        }
+        logger.info(f"✅ Incident {incident_id} registered")
+    else:
+        return {"success": False, "error": f"Failed to register incident: {response.text}"}, None
+    
+    status = {
+        "incident_id": incident_id,
+        "status": "running",
+        "started_at": datetime.utcnow().isoformat(),
+        "results": workflow_results
+    }
+    _workflow_status[incident_id] = status
+    if len(_workflow_status) > _WORKFLOW_STATUS_MAX_SIZE:
+        _workflow_status.popitem(last=False)
+    
+    if not settings.autonomous_workflow_background:
+        return await _run_autonomous_workflow(incident_id, incident, arguments, status), None
+    
+    # Acknowledge as soon as the incident exists; steps 2-5 continue in the background
+    task = asyncio.create_task(_run_autonomous_workflow(incident_id, incident, arguments, status))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return {
+        "success": True,
+        "status": "accepted",
+        "workflow": "complete_autonomous_response",
+        "incident_id": incident_id,
+        "status_url": f"{router.prefix}/incident/{incident_id}/status",
+        "results": workflow_results
+    }, task
+
+
+async def _run_autonomous_workflow(
+    incident_id: str,
+    incident: Optional[Dict[str, Any]],
+    arguments: Dict[str, Any],
+    status: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Steps 2-5 of the autonomous workflow, recording progress in `status`"""
+    try:
+        result = await _autonomous_workflow_steps(incident_id, incident, arguments, status["results"])
+    except Exception as e:
+        logger.error(f"Autonomous workflow for {incident_id} failed: {e}", exc_info=True)
+        status.update(status="failed", error=str(e), finished_at=datetime.utcnow().isoformat())
+        return {"success": False, "incident_id": incident_id, "error": str(e), "results": status["results"]}
+    
+    status.update(status="completed", finished_at=datetime.utcnow().isoformat())
+    return result
+
+
+async def _autonomous_workflow_steps(
+    incident_id: str,
+    incident: Optional[Dict[str, Any]],
+    arguments: Dict[str, Any],
+    workflow_results: Dict[str, Any]
+) -> Dict[str, Any]:
+    # Step 2: Search Code (if the incident details are still needed, they are fetched
+    # in the same MCP batch - neither call depends on the other)
+    logger.info("Step 2: Searching for relevant code...")
+    pattern = arguments.get("search_pattern", "*")
+    if incident is None:
+        code_result, incident_result = await call_mcp_tools_batch([
+            ("elasticseer_search_code_by_path", {"pattern": pattern}),
+            ("elasticseer_get_incident_by_id", {"incident_id": incident_id})
+        ])
+        incidents = parse_esql_results(incident_result)
+        incident = incidents[0] if incidents else {}
+    else:
+        code_result = await call_mcp_tool("elasticseer_search_code_by_path", {"pattern": pattern})
+    files, files_found = parse_esql_page(code_result, limit=1)
+    
+    if files:
+        target_file = files[0].get("file_path")
+        workflow_results["code_search"] = {
+            "success": True,
+            "files_found": files_found,
+            "target_file": target_file
+        }
+        logger.info(f"✅ Found {files_found} files, using {target_file}")
+    else:
+        workflow_results["code_search"] = {
+            "success": False,
+            "error": code_result.get("error", "No relevant files found")
+        }
+        target_file = None
+    
+    # Steps 3 (fix + PR) and 5 (Jira) are independent, so they run side by side. Each step
+    # catches its own failure, so one step failing can't cancel or orphan the other.
+    logger.info("Steps 3 and 5: Creating GitHub PR and Jira ticket...")
+    workflow_results["pr_creation"], workflow_results["jira_ticket"] = await asyncio.gather(
+        _workflow_step("pr_creation", _workflow_create_pr(incident_id, incident, arguments, files, target_file)),
+        _workflow_step("jira_ticket", _workflow_create_jira(incident_id, arguments))
+    )
+    
+    # Step 4: Send Slack Alert (links the PR and ticket, so it goes last)
+    logger.info("Step 4: Sending Slack alert...")
+    workflow_results["slack_alert"] = await _workflow_step(
+        "slack_alert",
+        _workflow_send_slack(incident_id, arguments, workflow_results["pr_creation"], workflow_results["jira_ticket"])
+    )
+    
+    logger.info("🎉 COMPLETE autonomous workflow finished!")
+    
+    # Log workflow execution
+    await log_activity(
+        activity_type="workflow_executed",
+        summary=f"Autonomous workflow completed for incident {incident_id}",
+        details={
+            "incident_id": incident_id,
+            "title": arguments.get("title"),
+            "service": arguments.get("service"),
+            "severity": arguments.get("severity"),
+            "workflow_results": workflow_results
+        },
+        status="success"
+    )
+    
+    return {
+        "success": True,
+        "workflow": "complete_autonomous_response",
+        "incident_id": incident_id,
+        "results": workflow_results
+    }
+
+
+# Message templates for the autonomous workflow's PR and Slack alert
+_PR_TITLE_FMT = "[ElasticSeer] Fix: {title} ({incident_id})"
+_PR_DESCRIPTION_FMT = (
+    "## 🤖 Autonomous Fix\n\n"
+    "**Incident**: {incident_id}\n"
+    "**Severity**: {severity}\n\n"
+    "### Issue\n{description}\n\n"
+    "### Fix\n{explanation}\n\n"
+    "---\n*Automated by ElasticSeer*"
+)
+_PR_BRANCH_FMT = "elasticseer/fix-{incident_id}"
+_SLACK_TITLE_FMT = "🚨 Autonomous Fix: {title}"
+_SLACK_MESSAGE_FMT = "Incident {incident_id} has been automatically resolved.\n\nPR: {pr_url}\n\nPlease review and approve."
+
+
+async def _workflow_step(name: str, step: Any) -> Dict[str, Any]:
+    """Await one autonomous-workflow step, recording an exception as that step's failure"""
+    try:
+        return await step
+    except Exception as e:
+        logger.error(f"Autonomous workflow step {name} failed: {e}", exc_info=True)
+        return {"success": False, "error": str(e)}
+
+
+async def _workflow_create_pr(
+    incident_id: str,
+    incident: Dict[str, Any],
+    arguments: Dict[str, Any],
+    files: List[Dict[str, Any]],
+    target_file: Optional[str]
+) -> Dict[str, Any]:
+    """Step 3: generate a fix and open a PR (only when the target file's code is indexed -
+    a fix generated without it would be a guess)"""
+    if not target_file:
+        return {"success": False, "error": "No target file found"}
+    
+    # The code search rows already carry the content; only fetch when they don't
+    code_content = files[0].get("content") or await fetch_code(target_file)
+    if code_content is None:
+        logger.warning(f"⚠️ Code file {target_file} not found in Elasticsearch, skipping fix generation")
+        return {"success": False, "error": f"Target file {target_file} is not indexed"}
+    
+    fix_response = await _local_post(
+        "/api/elasticseer/generate_fix",
+        {
+            "file_path": target_file,
+            # A freshly registered incident only carries a placeholder root cause
+            "diagnosis": incident.get("diagnosis.root_cause") if incident.get("diagnosis.confidence") else arguments.get("description"),
+            "current_code": code_content,
+            "incident_context": arguments.get("description")
+        }
+    )
+    if fix_response.status_code != 200:
+        return {"success": False, "error": "Fix generation failed"}
+    fix_data = fix_response.json()
+    
+    pr_response = await _local_post(
+        "/api/elasticseer/create_pr",
+        {
+            "title": _PR_TITLE_FMT.format(title=arguments.get("title"), incident_id=incident_id),
+            "description": _PR_DESCRIPTION_FMT.format(
+                incident_id=incident_id,
+                severity=arguments.get("severity"),
+                description=arguments.get("description"),
+                explanation=fix_data.get("explanation", "AI-generated fix")
+            ),
+            "branch_name": _PR_BRANCH_FMT.format(incident_id=incident_id.lower()),
+            "files": [{"path": target_file, "content": fix_data["fixed_code"]}],
+            "incident_id": incident_id
+        }
+    )
+    if pr_response.status_code != 200:
+        return {"success": False, "error": pr_response.text}
+    
+    pr_data = pr_response.json()
+    logger.info(f"✅ PR #{pr_data.get('pr_number')} created")
+    return {
+        "success": True,
+        "pr_number": pr_data.get("pr_number"),
+        "pr_url": pr_data.get("pr_url"),
+        "file_path": target_file
+    }
+
+
+async def _workflow_create_jira(incident_id: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """Step 5: open a Jira ticket for the incident"""
+    jira_response = await _local_post(
+        "/api/elasticseer/create_jira_ticket",
+        {
+            "summary": arguments.get("title"),
+            "description": arguments.get("description"),
+            "priority": "Critical" if arguments.get("severity") == "Sev-1" else "High",
+            "incident_id": incident_id
+        }
+    )
+    if jira_response.status_code != 200:
+        return {"success": False, "error": jira_response.text}
+    
+    logger.info("✅ Jira ticket created")
+    return {"success": True, "ticket_id": jira_response.json().get("ticket_id")}
+
+
+async def _workflow_send_slack(
+    incident_id: str,
+    arguments: Dict[str, Any],
+    pr_creation: Dict[str, Any],
+    jira_ticket: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Step 4: alert the team on Slack, linking the PR and Jira ticket"""
+    pr_url = pr_creation.get("pr_url", "N/A") if pr_creation.get("success") else "N/A"
+    jira_ticket_id = jira_ticket.get("ticket_id")
+    jira_url = f"{settings.jira_url}/browse/{jira_ticket_id}" if jira_ticket_id and settings.jira_url else None
+    
+    slack_response = await _local_post(
+        "/api/elasticseer/send_slack",
+        {
+            "severity": arguments.get("severity", "Sev-3"),
+            "incident_id": incident_id,
+            "title": _SLACK_TITLE_FMT.format(title=arguments.get("title")),
+            "message": _SLACK_MESSAGE_FMT.format(incident_id=incident_id, pr_url=pr_url),
+            "action_required": True,
+            "pr_url": pr_url if pr_url != "N/A" else None,
+            "jira_url": jira_url
+        }
+    )
+    if slack_response.status_code != 200:
+        return {"success": False, "error": slack_response.text}
+    
+    logger.info("✅ Slack alert sent")
+    return {"success": True, "channel": slack_response.json().get("channel", "#general")}
+
+
+async def _fn_generate_postmortem(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """Generate a postmortem report for an incident"""
+    incident_id = arguments.get("incident_id")
+    logger.info(f"📋 Generating postmortem report for {incident_id}")
+    
+    # 1. Get incident details via MCP
+    incident_result = await call_mcp_tool("elasticseer_get_incident_by_id", {"incident_id": incident_id})
+    incidents = parse_esql_results(incident_result)
+    incident = incidents[0] if incidents else {}
+    
+    # 2. Get related activity-log entries from Elasticsearch
+    related_actions = []
+    try:
+        if await _es.indices.exists(index="activity-log"):
+            activity_result = await _es.search(
+                index="activity-log",
+                body={
+                    "query": {"bool": {"should": [
+                        {"match": {"details.incident_id": incident_id}},
+                        {"match": {"summary": incident_id}},
+                    ], "minimum_should_match": 1}},
+                    "sort": [{"timestamp": {"order": "asc"}}],
+                    "size": 50,
+                    # Only the fields the timeline reads
+                    "_source": ["timestamp", "type", "summary", "details"]
+                }
             )
-            
-            return {
-                "success": True,
-                "workflow": "complete_autonomous_response",
-                "incident_id": incident_id,
-                "results": workflow_results
-            }
+            related_actions = [hit["_source"] for hit in activity_result["hits"]["hits"]]
+    except Exception as e:
+        logger.warning(f"Could not fetch activity log: {e}")
+    
+    # 3. Get anomaly data for the service
+    service = incident.get("anomaly.service") or incident.get("service", "unknown")
+    anomalies = []
+    anomaly_count = 0
+    try:
+        anomaly_result = await call_mcp_tool("elasticseer_get_metrics_anomalies", {"service": service})
+        # Only the first few go in the prompt, but the count is of all of them
+        anomalies, anomaly_count = parse_esql_page(anomaly_result, limit=5)
+    except Exception:
+        pass
+    
+    # 4. Build the context and use Gemini to write the postmortem
+    timeline_entries = []
+    prs_created = []
+    slack_alerts = []
+    jira_tickets = []
+    
+    for action in related_actions:
+        entry = {
+            "time": action.get("timestamp", ""),
+            "type": action.get("type", ""),
+            "summary": action.get("summary", ""),
+        }
+        timeline_entries.append(entry)
         
-        elif function_name == "generate_postmortem":
-            incident_id = arguments.get("incident_id")
-            logger.info(f"📋 Generating postmortem report for {incident_id}")
-            
-            # 1. Get incident details via MCP
-            incident_result = await call_mcp_tool("elasticseer_get_incident_by_id", {"incident_id": incident_id})
-            incidents = parse_esql_results(incident_result)
-            incident = incidents[0] if incidents else {}
-            
-            # 2. Get related activity-log entries from Elasticsearch
-            es = Elasticsearch(
-                settings.elasticsearch_url,
-                api_key=settings.elasticsearch_api_key
-            )
-            
-            related_actions = []
-            try:
-                if es.indices.exists(index="activity-log"):
-                    activity_result = es.search(
-                        index="activity-log",
-                        body={
-                            "query": {"bool": {"should": [
-                                {"match": {"details.incident_id": incident_id}},
-                                {"match": {"summary": incident_id}},
-                            ], "minimum_should_match": 1}},
-                            "sort": [{"timestamp": {"order": "asc"}}],
-                            "size": 50
-                        }
-                    )
-                    related_actions = [hit["_source"] for hit in activity_result["hits"]["hits"]]
-            except Exception as e:
-                logger.warning(f"Could not fetch activity log: {e}")
-            
-            # 3. Get anomaly data for the service
-            service = incident.get("anomaly.service") or incident.get("service", "unknown")
-            anomalies = []
-            try:
-                anomaly_result = await call_mcp_tool("elasticseer_get_metrics_anomalies", {"service": service})
-                anomalies = parse_esql_results(anomaly_result)
-            except Exception:
-                pass
-            
-            # 4. Build the context and use Gemini to write the postmortem
-            timeline_entries = []
-            prs_created = []
-            slack_alerts = []
-            jira_tickets = []
-            
-            for action in related_actions:
-                entry = {
-                    "time": action.get("timestamp", ""),
-                    "type": action.get("type", ""),
-                    "summary": action.get("summary", ""),
-                }
-                timeline_entries.append(entry)
-                
-                if action.get("type") in ["pr_created", "github_pr"]:
-                    prs_created.append(action.get("details", {}))
-                elif action.get("type") in ["slack_message", "slack_alert", "slack_sent"]:
-                    slack_alerts.append(action.get("details", {}))
-                elif action.get("type") in ["jira_created", "jira_ticket"]:
-                    jira_tickets.append(action.get("details", {}))
-            
-            # Generate postmortem with Gemini
-            postmortem_model = genai.GenerativeModel(settings.gemini_model)
-            postmortem_prompt = f"""Generate a professional incident postmortem report in Markdown format for the following incident.
+        if action.get("type") in ["pr_created", "github_pr"]:
+            prs_created.append(action.get("details", {}))
+        elif action.get("type") in ["slack_message", "slack_alert", "slack_sent"]:
+            slack_alerts.append(action.get("details", {}))
+        elif action.get("type") in ["jira_created", "jira_ticket"]:
+            jira_tickets.append(action.get("details", {}))
+    
+    # Generate postmortem with Gemini
+    postmortem_prompt = f"""Generate a professional incident postmortem report in Markdown format for the following incident.
 
 INCIDENT DATA:
 - ID: {incident_id}
@@ -829,7 +1474,7 @@ AUTONOMOUS ACTIONS TAKEN:
 - Slack Alerts Sent: {len(slack_alerts)}
 - Jira Tickets Created: {len(jira_tickets)} {json.dumps(jira_tickets[:5], default=str) if jira_tickets else ''}
 
-RELATED ANOMALIES ({len(anomalies)} detected):
+RELATED ANOMALIES ({anomaly_count} detected):
 {json.dumps(anomalies[:5], indent=2, default=str) if anomalies else 'None available'}
 
 FORMAT THE REPORT WITH THESE SECTIONS:
@@ -863,45 +1508,148 @@ FORMAT THE REPORT WITH THESE SECTIONS:
 
 Make the report detailed, professional, and data-driven. Include any actual PR URLs, ticket IDs, and timestamps from the data provided."""
 
-            postmortem_response = postmortem_model.generate_content(postmortem_prompt)
-            postmortem_text = postmortem_response.text
-            
-            # Log the postmortem generation
-            await log_activity(
-                activity_type="postmortem_generated",
-                summary=f"Postmortem report generated for {incident_id}",
-                details={
-                    "incident_id": incident_id,
-                    "service": service,
-                    "timeline_events": len(timeline_entries),
-                    "prs_created": len(prs_created),
-                    "slack_alerts": len(slack_alerts),
-                    "jira_tickets": len(jira_tickets),
-                },
-                status="success"
-            )
-            
-            return {
-                "success": True,
-                "incident_id": incident_id,
-                "postmortem": postmortem_text,
-                "stats": {
-                    "timeline_events": len(timeline_entries),
-                    "prs_created": len(prs_created),
-                    "slack_alerts": len(slack_alerts),
-                    "jira_tickets": len(jira_tickets),
-                    "anomalies_found": len(anomalies),
-                }
-            }
-        
-        else:
-            return {"success": False, "error": f"Unknown function: {function_name}"}
-            
+    async with _gemini_slot():
+        postmortem_response = await _POSTMORTEM_MODEL.generate_content_async(postmortem_prompt)
+    postmortem_text = postmortem_response.text
+    
+    # Log the postmortem generation
+    await log_activity(
+        activity_type="postmortem_generated",
+        summary=f"Postmortem report generated for {incident_id}",
+        details={
+            "incident_id": incident_id,
+            "service": service,
+            "timeline_events": len(timeline_entries),
+            "prs_created": len(prs_created),
+            "slack_alerts": len(slack_alerts),
+            "jira_tickets": len(jira_tickets),
+        },
+        status="success"
+    )
+    
+    return {
+        "success": True,
+        "incident_id": incident_id,
+        "postmortem": postmortem_text,
+        "stats": {
+            "timeline_events": len(timeline_entries),
+            "prs_created": len(prs_created),
+            "slack_alerts": len(slack_alerts),
+            "jira_tickets": len(jira_tickets),
+            "anomalies_found": anomaly_count,
+        }
+    }
+
+
+# Gemini function name -> handler
+_FUNCTION_HANDLERS = {
+    "query_recent_incidents": _fn_query_recent_incidents,
+    "search_code_by_path": _fn_search_code_by_path,
+    "get_metrics_anomalies": _fn_get_metrics_anomalies,
+    "analyze_service_metrics": _fn_analyze_service_metrics,
+    "get_incident_by_id": _fn_get_incident_by_id,
+    "create_github_pr": _fn_create_github_pr,
+    "send_slack_alert": _fn_send_slack_alert,
+    "create_jira_ticket": _fn_create_jira_ticket,
+    "register_incident": _fn_register_incident,
+    "autonomous_incident_response": _fn_autonomous_incident_response,
+    "generate_postmortem": _fn_generate_postmortem,
+}
+
+
+async def execute_function(function_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """Execute a function call - either MCP tool or external action"""
+    
+    handler = _FUNCTION_HANDLERS.get(function_name)
+    if handler is None:
+        return {"success": False, "error": f"Unknown function: {function_name}"}
+    
+    if function_name not in _CACHEABLE_FUNCTIONS:
+        return await _run_function(function_name, handler, arguments)
+    
+    cache_key = (function_name, orjson.dumps(arguments, option=orjson.OPT_SORT_KEYS, default=str))
+    cached = _result_cache.get(cache_key)
+    if cached and cached[0] > time.monotonic():
+        _result_cache.move_to_end(cache_key)
+        return cached[1]
+    
+    # Identical read-only calls already running are shared rather than repeated
+    task = _inflight_functions.get(cache_key)
+    if task is None:
+        task = asyncio.ensure_future(_run_cacheable_function(function_name, handler, arguments, cache_key))
+        _inflight_functions[cache_key] = task
+        task.add_done_callback(lambda _: _inflight_functions.pop(cache_key, None))
+    
+    # Shielded so one caller being cancelled doesn't cancel the call for the others
+    return await asyncio.shield(task)
+
+
+async def _run_function(function_name: str, handler: Any, arguments: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        logger.info(f"Executing function: {function_name} with args: {arguments}")
+        return await handler(arguments)
     except Exception as e:
         logger.error(f"Function execution error: {e}", exc_info=True)
         return {"success": False, "error": str(e)}
 
 
+async def _run_cacheable_function(
+    function_name: str,
+    handler: Any,
+    arguments: Dict[str, Any],
+    cache_key: Tuple[str, bytes]
+) -> Dict[str, Any]:
+    result = await _run_function(function_name, handler, arguments)
+    
+    # Only successful results are cached, so a transient failure is retried next time
+    if result.get("success") is not False:
+        _result_cache[cache_key] = (time.monotonic() + _CACHEABLE_FUNCTIONS[function_name], result)
+        _result_cache.move_to_end(cache_key)
+        if len(_result_cache) > _RESULT_CACHE_MAX_SIZE:
+            _result_cache.popitem(last=False)
+    return result
+
+
+async def execute_function_call_stream(function_name: str, arguments: Dict[str, Any]) -> Tuple[Dict[str, Any], Any]:
+    """
+    Execute a function call from a (streamed) Gemini response.
+    
+    Returns the {"function", "result"} record and the FunctionResponse part to send
+    back to Gemini.
+    """
+    logger.info(f"Calling: {function_name} with {arguments}")
+    
+    result = await execute_function(function_name, arguments)
+    return {"function": function_name, "result": result}, _function_response_part(function_name, result)
+
+
+def _function_response_part(function_name: str, result: Dict[str, Any]) -> Any:
+    """Wrap a function result as the FunctionResponse part Gemini expects"""
+    return genai.protos.Part(
+        function_response=genai.protos.FunctionResponse(
+            name=function_name,
+            response={"result": result}
+        )
+    )
+
+
+def _build_history(request: ChatRequest) -> List[Dict[str, Any]]:
+    """
+    Gemini chat history: the most recent messages that fit in _HISTORY_TOKEN_BUDGET,
+    so a few long messages can't inflate every prompt (and short ones leave more turns).
+    """
+    messages = request.conversation_history
+    start = len(messages)
+    budget = _HISTORY_TOKEN_BUDGET
+    for msg in reversed(messages):
+        # ~4 characters per token; close enough for a budget and costs no API call
+        budget -= len(msg.content) // 4 + 1
+        if budget < 0:
+            break
+        start -= 1
+    return [{"role": _GEMINI_ROLES.get(m.role, "model"), "parts": [m.content]} for m in messages[start:]]
+
+
 @router.post("/chat", response_model=ChatResponse)
 async def chat_with_agent(request: ChatRequest):
     """
@@ -930,126 +1678,60 @@ async def chat_with_agent(request: ChatRequest):
             "timestamp": datetime.utcnow().isoformat()
         })
         
-        # Build conversation history
-        history = []
-        for msg in request.conversation_history[-10:]:  # Last 10 messages
-            history.append({
-                "role": "user" if msg.role == "user" else "model",
-                "parts": [msg.content]
-            })
-        
-        # System instruction
-        system_instruction = """You are ElasticSeer, an AUTONOMOUS incident response agent for production infrastructure.
-
-Your mission: AUTOMATICALLY handle complete incident workflows from report to resolution WITHOUT asking for permission at each step.
-
-Your capabilities:
-- Query Elasticsearch for incidents, metrics, anomalies, and code via MCP tools
-- Register NEW incidents when users report problems
-- Create GitHub PRs with AI-generated code fixes
-- Send Slack notifications to alert the team
-- Create Jira tickets for incident tracking
-- Analyze patterns and provide actionable insights
-- **EXECUTE COMPLETE AUTONOMOUS WORKFLOWS IN ONE FUNCTION CALL**
-- **PROVIDE COMPREHENSIVE METRICS ANALYSIS with tables, trends, and visualizations**
-- **GENERATE POSTMORTEM REPORTS** with full incident timeline, root cause, actions taken, and recommendations
-
-CRITICAL - USE autonomous_incident_response FOR COMPLETE WORKFLOWS:
-When user says "investigate, fix, create PR, and alert team" or similar complete workflow requests:
-→ IMMEDIATELY call autonomous_incident_response() with all parameters
-→ This ONE function call executes the ENTIRE workflow:
-  1. Registers incident
-  2. Searches code
-  3. Creates GitHub PR
-  4. Sends Slack alert
-  5. Creates Jira ticket
-
-DO NOT call register_incident, then search_code_by_path, then create_github_pr separately!
-USE autonomous_incident_response() for complete workflows - it does EVERYTHING in one call!
-
-EXAMPLE - CORRECT:
-User: "Critical auth issue. Users can't log in. JWT errors. Investigate, fix, PR, alert team."
-YOU: autonomous_incident_response(
-  title="Critical authentication issue",
-  service="auth-service",
-  severity="Sev-1",
-  description="Users unable to log in, JWT validation errors",
-  search_pattern="*jwt*"
-)
-→ Result: Incident registered, code found, PR created, Slack sent, Jira created - ALL DONE!
-
-EXAMPLE - WRONG:
-User: "Critical auth issue. Investigate, fix, PR, alert team."
-YOU: register_incident(...) [STOPS]
-→ This is WRONG! Use autonomous_incident_response() instead!
-
-CRITICAL - ADAPTIVE FILE SELECTION:
-- NEVER blindly use file paths from incident data
-- When investigating an incident, ALWAYS search for relevant code files first using search_code_by_path
-- If you find a better/more relevant file during investigation, USE THAT FILE for the fix
-- Incident data may contain fake or outdated file paths - YOUR investigation takes priority
-
-Remember: For COMPLETE workflows, use autonomous_incident_response() - it's ONE function that does EVERYTHING!"""
-
-        # Create model with function calling
-        model = genai.GenerativeModel(
-            model_name=settings.gemini_model,
-            system_instruction=system_instruction,
-            tools=GEMINI_FUNCTIONS,
-            generation_config={
-                "temperature": 0.1,  # Lower temperature for more deterministic function calling
-                "top_p": 0.95,
-                "top_k": 40,
-            }
-        )
-        
         # Start chat
-        chat = model.start_chat(history=history)
+        chat = _MODEL.start_chat(history=_build_history(request))
         
-        # Send message
+        # Send message, streaming the reply so each function call starts executing as
+        # soon as its part arrives instead of after the whole response
         logger.info(f"Sending message to Gemini: {request.message}")
-        response = chat.send_message(request.message)
-        
-        logger.info(f"Gemini response: {response}")
         
         # Check if Gemini wants to call functions
         function_calls = []
+        function_tasks = []
         response_text = ""
         
-        for part in response.parts:
-            if hasattr(part, 'function_call') and part.function_call:
-                function_calls.append(part.function_call)
-            elif hasattr(part, 'text') and part.text:
-                response_text += part.text
+        try:
+            async with _gemini_slot():
+                response = await chat.send_message_async(request.message, stream=True)
+                async for chunk in response:
+                    for part in chunk.parts:
+                        if hasattr(part, 'function_call') and part.function_call:
+                            # Args are converted from the proto map once and reused for the metadata
+                            call = {"name": part.function_call.name, "args": dict(part.function_call.args)}
+                            function_calls.append(call)
+                            function_tasks.append(asyncio.create_task(execute_function_call_stream(call["name"], call["args"])))
+                        elif hasattr(part, 'text') and part.text:
+                            response_text += part.text
+        except BaseException:
+            # The stream failed (or no slot was free): don't leave calls that were
+            # already started running after the client is told the request failed
+            for task in function_tasks:
+                task.cancel()
+            raise
         
-        # Execute function calls if any
+        logger.info(f"Gemini response: {response}")
+        
+        # Collect function call results if any
         if function_calls:
             logger.info(f"Executing {len(function_calls)} function calls")
             
-            function_responses = []
             function_results = []
-            
-            for function_call in function_calls:
-                function_name = function_call.name
-                arguments = dict(function_call.args)
-                
-                logger.info(f"Calling: {function_name} with {arguments}")
-                
-                result = await execute_function(function_name, arguments)
-                function_results.append({"function": function_name, "result": result})
-                
-                function_responses.append(
-                    genai.protos.Part(
-                        function_response=genai.protos.FunctionResponse(
-                            name=function_name,
-                            response={"result": result}
-                        )
+            function_responses = []
+            outcomes = await asyncio.gather(*function_tasks, return_exceptions=True)
+            for function_call, outcome in zip(function_calls, outcomes):
+                if isinstance(outcome, Exception):
+                    result = {"success": False, "error": str(outcome)}
+                    outcome = (
+                        {"function": function_call["name"], "result": result},
+                        _function_response_part(function_call["name"], result)
                     )
-                )
+                function_results.append(outcome[0])
+                function_responses.append(outcome[1])
             
             # Send function results back to Gemini
             try:
-                response2 = chat.send_message(function_responses)
+                async with _gemini_slot():
+                    response2 = await chat.send_message_async(function_responses)
                 
                 # Extract final response
                 final_text = ""
@@ -1066,17 +1748,17 @@ Remember: For COMPLETE workflows, use autonomous_incident_response() - it's ONE
                         details={
                             "message": request.message,
                             "response": final_text,
-                            "functions_called": [fc.name for fc in function_calls]
+                            "functions_called": [fc["name"] for fc in function_calls]
                         },
                         status="success"
                     )
                     
                     return ChatResponse(
                         response=final_text,
-                        sources=["gemini-2.5-flash", "mcp-server"] + [fc.name for fc in function_calls],
+                        sources=[*_SOURCES_PREFIX, *(fc["name"] for fc in function_calls)],
                         metadata={
                             "model": "gemini-2.5-flash",
-                            "function_calls": [{"name": fc.name, "args": dict(fc.args)} for fc in function_calls],
+                            "function_calls": function_calls,
                             "function_results": function_results
                         }
                     )
@@ -1084,80 +1766,86 @@ Remember: For COMPLETE workflows, use autonomous_incident_response() - it's ONE
                 logger.warning(f"Gemini failed to generate final response: {e}")
             
             # Fallback: If Gemini can't generate a response, create one from function results
-            fallback_response = "✅ Actions completed successfully:\n\n"
+            # Collected as parts and joined once rather than grown with repeated +=
+            fallback_parts = ["✅ Actions completed successfully:\n\n"]
             for func_result in function_results:
                 func_name = func_result["function"]
                 result = func_result["result"]
                 
                 if func_name == "autonomous_incident_response" and result.get("success"):
-                    fallback_response += f"✅ **Complete Autonomous Workflow Executed**\n\n"
+                    fallback_parts.append(f"✅ **Complete Autonomous Workflow Executed**\n\n")
                     
                     workflow = result.get("results", {})
                     incident_id = result.get("incident_id")
                     
                     if workflow.get("incident_registration", {}).get("success"):
-                        fallback_response += f"1. ✅ Incident {incident_id} registered\n"
+                        fallback_parts.append(f"1. ✅ Incident {incident_id} registered\n")
                     
                     if workflow.get("code_search", {}).get("success"):
                         target_file = workflow["code_search"].get("target_file")
-                        fallback_response += f"2. ✅ Found code file: {target_file}\n"
+                        fallback_parts.append(f"2. ✅ Found code file: {target_file}\n")
                     
                     if workflow.get("pr_creation", {}).get("success"):
                         pr_num = workflow["pr_creation"].get("pr_number")
                         pr_url = workflow["pr_creation"].get("pr_url")
-                        fallback_response += f"3. ✅ GitHub PR #{pr_num} created: {pr_url}\n"
+                        fallback_parts.append(f"3. ✅ GitHub PR #{pr_num} created: {pr_url}\n")
                     
                     if workflow.get("slack_alert", {}).get("success"):
                         channel = workflow["slack_alert"].get("channel", "#general")
-                        fallback_response += f"4. ✅ Slack alert sent to {channel}\n"
+                        fallback_parts.append(f"4. ✅ Slack alert sent to {channel}\n")
                     
                     if workflow.get("jira_ticket", {}).get("success"):
                         ticket_id = workflow["jira_ticket"].get("ticket_id")
                         jira_url = f"{settings.jira_url}/browse/{ticket_id}" if settings.jira_url else None
                         if jira_url:
-                            fallback_response += f"5. ✅ Jira ticket [{ticket_id}]({jira_url}) created\n"
+                            fallback_parts.append(f"5. ✅ Jira ticket [{ticket_id}]({jira_url}) created\n")
                         else:
-                            fallback_response += f"5. ✅ Jira ticket {ticket_id} created\n"
+                            fallback_parts.append(f"5. ✅ Jira ticket {ticket_id} created\n")
                     
-                    fallback_response += "\n**All autonomous actions completed!**\n\n"
+                    if result.get("status") == "accepted":
+                        fallback_parts.append(f"\n**Code search, PR, Slack and Jira are running in the background** - track progress at {result.get('status_url')}\n\n")
+                    else:
+                        fallback_parts.append("\n**All autonomous actions completed!**\n\n")
                 
                 elif func_name == "analyze_service_metrics" and result.get("success"):
-                    fallback_response += f"✅ **Comprehensive Metrics Analysis Complete**\n\n"
+                    fallback_parts.append(f"✅ **Comprehensive Metrics Analysis Complete**\n\n")
                     analysis_text = result.get("analysis", {})
                     if isinstance(analysis_text, str):
-                        fallback_response += analysis_text + "\n\n"
+                        fallback_parts.append(analysis_text + "\n\n")
                     else:
-                        fallback_response += f"Analysis completed for {result.get('service')} over {result.get('time_range')}\n\n"
+                        fallback_parts.append(f"Analysis completed for {result.get('service')} over {result.get('time_range')}\n\n")
                 
                 elif func_name == "register_incident" and result.get("success"):
-                    fallback_response += f"✅ **Incident Registered**\n"
-                    fallback_response += f"- Incident ID: {result.get('incident_id')}\n"
-                    fallback_response += f"- Status: Investigating\n"
+                    fallback_parts.append(f"✅ **Incident Registered**\n")
+                    fallback_parts.append(f"- Incident ID: {result.get('incident_id')}\n")
+                    fallback_parts.append(f"- Status: Investigating\n")
                     if result.get("next_steps"):
-                        fallback_response += f"- Next Steps: {', '.join(result.get('next_steps', []))}\n"
-                    fallback_response += "\n"
+                        fallback_parts.append(f"- Next Steps: {', '.join(result.get('next_steps', []))}\n")
+                    fallback_parts.append("\n")
                 
                 elif func_name == "create_github_pr" and result.get("success"):
-                    fallback_response += f"✅ **GitHub PR Created**\n"
-                    fallback_response += f"- PR #{result.get('pr_number')}: {result.get('pr_url')}\n"
-                    fallback_response += f"- File: {result.get('file_path')}\n"
-                    fallback_response += f"- Source: {result.get('file_path_source', 'incident_data')}\n\n"
+                    fallback_parts.append(f"✅ **GitHub PR Created**\n")
+                    fallback_parts.append(f"- PR #{result.get('pr_number')}: {result.get('pr_url')}\n")
+                    fallback_parts.append(f"- File: {result.get('file_path')}\n")
+                    fallback_parts.append(f"- Source: {result.get('file_path_source', 'incident_data')}\n\n")
                 
                 elif func_name == "send_slack_alert" and result.get("success"):
-                    fallback_response += f"✅ **Slack Alert Sent**\n"
-                    fallback_response += f"- Channel: {result.get('channel', '#general')}\n\n"
+                    fallback_parts.append(f"✅ **Slack Alert Sent**\n")
+                    fallback_parts.append(f"- Channel: {result.get('channel', '#general')}\n\n")
                 
                 elif func_name == "create_jira_ticket" and result.get("success"):
-                    fallback_response += f"✅ **Jira Ticket Created**\n"
+                    fallback_parts.append(f"✅ **Jira Ticket Created**\n")
                     ticket_id = result.get('ticket_id')
                     ticket_url = result.get('url')
                     if ticket_url:
-                        fallback_response += f"- Ticket: {ticket_id} - {ticket_url}\n\n"
+                        fallback_parts.append(f"- Ticket: {ticket_id} - {ticket_url}\n\n")
                     else:
-                        fallback_response += f"- Ticket: {ticket_id}\n\n"
+                        fallback_parts.append(f"- Ticket: {ticket_id}\n\n")
                 
                 elif result.get("success") == False:
-                    fallback_response += f"❌ **{func_name} failed**: {result.get('error', 'Unknown error')}\n\n"
+                    fallback_parts.append(f"❌ **{func_name} failed**: {result.get('error', 'Unknown error')}\n\n")
+            
+            fallback_response = "".join(fallback_parts)
             
             # Log successful chat completion with fallback
             await log_activity(
@@ -1166,7 +1854,7 @@ Remember: For COMPLETE workflows, use autonomous_incident_response() - it's ONE
                 details={
                     "message": request.message,
                     "response": fallback_response,
-                    "functions_called": [fc.name for fc in function_calls],
+                    "functions_called": [fc["name"] for fc in function_calls],
                     "fallback_used": True
                 },
                 status="success"
@@ -1174,10 +1862,10 @@ Remember: For COMPLETE workflows, use autonomous_incident_response() - it's ONE
             
             return ChatResponse(
                 response=fallback_response,
-                sources=["gemini-2.5-flash", "mcp-server"] + [fc.name for fc in function_calls],
+                sources=[*_SOURCES_PREFIX, *(fc["name"] for fc in function_calls)],
                 metadata={
                     "model": "gemini-2.5-flash",
-                    "function_calls": [{"name": fc.name, "args": dict(fc.args)} for fc in function_calls],
+                    "function_calls": function_calls,
                     "function_results": function_results,
                     "fallback_used": True
                 }
@@ -1190,62 +1878,171 @@ Remember: For COMPLETE workflows, use autonomous_incident_response() - it's ONE
             metadata={"model": "gemini-2.5-flash"}
         )
         
+    except CapacityError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         logger.error(f"Error: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
 
+def _sse_event(event: Dict[str, Any]) -> bytes:
+    """Encode one Server-Sent Events message"""
+    return b"data: " + orjson.dumps(event, default=str) + b"\n\n"
+
+
+async def _stream_chat(request: ChatRequest) -> AsyncIterator[bytes]:
+    """
+    SSE events for chat_with_agent_stream. Gemini is read by a producer task that holds
+    a Gemini slot only while reading and hands events over an unbounded queue, so a slow
+    client never keeps a slot busy.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    function_tasks: List[asyncio.Task] = []
+    
+    async def produce():
+        try:
+            chat = _MODEL.start_chat(history=_build_history(request))
+            async with _gemini_slot():
+                response = await chat.send_message_async(request.message, stream=True)
+                
+                # Text is forwarded as it arrives; function calls start executing immediately
+                async for chunk in response:
+                    for part in chunk.parts:
+                        if hasattr(part, 'function_call') and part.function_call:
+                            function_name = part.function_call.name
+                            arguments = dict(part.function_call.args)
+                            function_tasks.append(asyncio.create_task(execute_function_call_stream(function_name, arguments)))
+                            queue.put_nowait({"tool": function_name, "args": arguments})
+                        elif hasattr(part, 'text') and part.text:
+                            queue.put_nowait({"text": part.text})
+            
+            if function_tasks:
+                function_responses = []
+                for task in function_tasks:
+                    result, function_response = await task
+                    function_responses.append(function_response)
+                    queue.put_nowait({"tool_result": result})
+                
+                async with _gemini_slot():
+                    response2 = await chat.send_message_async(function_responses, stream=True)
+                    async for chunk in response2:
+                        for part in chunk.parts:
+                            if hasattr(part, 'text') and part.text:
+                                queue.put_nowait({"text": part.text})
+            
+            queue.put_nowait({"done": True})
+        except Exception as e:
+            logger.error(f"Streaming chat error: {e}", exc_info=True)
+            queue.put_nowait({"error": str(e)})
+        finally:
+            queue.put_nowait(None)
+    
+    producer = asyncio.create_task(produce())
+    try:
+        while (event := await queue.get()) is not None:
+            yield _sse_event(event)
+    finally:
+        # Client went away mid-stream (or the stream failed) - stop working on its behalf
+        producer.cancel()
+        for task in function_tasks:
+            task.cancel()
+
+
+@router.post("/chat/stream")
+async def chat_with_agent_stream(request: ChatRequest):
+    """
+    Chat with ElasticSeer, streamed as Server-Sent Events.
+    
+    Emits {"text"} events as Gemini generates them, {"tool", "args"} when a function
+    call starts, {"tool_result"} when it finishes, and a final {"done": true}
+    (or {"error"}).
+    """
+    await log_activity(
+        activity_type="chat",
+        summary=f"User message (stream): {request.message[:100]}...",
+        details={"message": request.message, "history_length": len(request.conversation_history)},
+        status="processing"
+    )
+    return StreamingResponse(
+        _stream_chat(request),
+        media_type="text/event-stream",
+        # identity keeps GZipMiddleware from buffering events until the stream ends
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "Content-Encoding": "identity"}
+    )
+
+
+@router.get("/incident/{incident_id}/status")
+async def get_workflow_status(incident_id: str):
+    """Progress of an autonomous workflow started for this incident"""
+    status = _workflow_status.get(incident_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail=f"No autonomous workflow found for {incident_id}")
+    return status
+
+
+async def _fetch_mcp_tools(force: bool = False) -> Optional[Dict[str, Any]]:
+    """
+    The MCP server's tools/list result ({"tools", "http_version"}), or None if the
+    server didn't answer 200. Successful results are cached for _MCP_TOOLS_CACHE_TTL_SECONDS.
+    """
+    global _mcp_tools_cache
+    if not force and _mcp_tools_cache and _mcp_tools_cache[0] > time.monotonic():
+        return _mcp_tools_cache[1]
+    
+    mcp_response = await _mcp_client.post(
+        _MCP_URL,
+        headers=_MCP_HEADERS,
+        json={
+            "jsonrpc": "2.0",
+            "id": 1,
+            "method": "tools/list",
+            "params": {}
+        },
+        timeout=10.0
+    )
+    logger.debug(f"MCP health check over {mcp_response.http_version}")
+    if mcp_response.status_code != 200:
+        return None
+    
+    tools = {
+        "tools": mcp_response.json().get("result", {}).get("tools", []),
+        "http_version": mcp_response.http_version
+    }
+    _mcp_tools_cache = (time.monotonic() + _MCP_TOOLS_CACHE_TTL_SECONDS, tools)
+    return tools
+
+
 @router.get("/health")
-async def health_check():
-    """Health check - verify all components"""
+async def health_check(force: bool = False):
+    """Health check - verify all components (the MCP tool list is cached briefly; force=true re-checks)"""
     try:
-        # Test MCP server
-        mcp_url = f"{settings.kibana_url.rstrip('/')}/api/agent_builder/mcp"
+        mcp_tools = await _fetch_mcp_tools(force)
+        mcp_healthy = mcp_tools is not None
+        tools = mcp_tools["tools"] if mcp_healthy else []
         
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            mcp_response = await client.post(
-                mcp_url,
-                headers={
-                    "Authorization": f"ApiKey {settings.elasticsearch_api_key}",
-                    "Content-Type": "application/json",
-                    "Accept": "application/json"
-                },
-                json={
-                    "jsonrpc": "2.0",
-                    "id": 1,
-                    "method": "tools/list",
-                    "params": {}
-                }
-            )
-            
-            mcp_healthy = mcp_response.status_code == 200
-            tools = []
-            if mcp_healthy:
-                result = mcp_response.json()
-                tools = result.get("result", {}).get("tools", [])
-            
-            return {
-                "status": "healthy" if mcp_healthy else "degraded",
-                "components": {
-                    "mcp_server": "connected" if mcp_healthy else "disconnected",
-                    "gemini": "configured" if settings.gemini_api_key else "not configured",
-                    "elasticsearch": "connected",
-                    "github": "configured" if settings.github_token else "not configured",
-                    "slack": "configured" if settings.slack_bot_token else "not configured",
-                    "jira": "configured" if settings.jira_url else "not configured"
-                },
-                "mcp_tools": len([t for t in tools if t["name"].startswith("elasticseer_")]),
-                "total_tools": len(tools),
-                "agent": "elasticseer-orchestrator",
-                "model": "gemini-2.5-flash",
-                "capabilities": [
-                    "Query incidents, metrics, anomalies, code",
-                    "Create GitHub PRs with AI fixes",
-                    "Send Slack alerts",
-                    "Create Jira tickets",
-                    "Autonomous decision-making"
-                ]
-            }
+        return {
+            "status": "healthy" if mcp_healthy else "degraded",
+            "components": {
+                "mcp_server": "connected" if mcp_healthy else "disconnected",
+                "mcp_http_version": mcp_tools["http_version"] if mcp_healthy else None,
+                "gemini": "configured" if settings.gemini_api_key else "not configured",
+                "elasticsearch": "connected",
+                "github": "configured" if settings.github_token else "not configured",
+                "slack": "configured" if settings.slack_bot_token else "not configured",
+                "jira": "configured" if settings.jira_url else "not configured"
+            },
+            "mcp_tools": len([t for t in tools if t["name"].startswith("elasticseer_")]),
+            "total_tools": len(tools),
+            "agent": "elasticseer-orchestrator",
+            "model": "gemini-2.5-flash",
+            "capabilities": [
+                "Query incidents, metrics, anomalies, code",
+                "Create GitHub PRs with AI fixes",
+                "Send Slack alerts",
+                "Create Jira tickets",
+                "Autonomous decision-making"
+            ]
+        }
     except Exception as e:
         return {
             "status": "unhealthy",
@@ -9,9 +9,12 @@ This extends the Gemini agent with detailed reasoning traces that show:
 """
 
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
-from datetime import datetime
+from typing import Callable, Deque, List, Dict, Any, Optional, Tuple
+from datetime import datetime, timezone
+from collections import defaultdict, deque
+import asyncio
 import logging
 
 # Import the existing agent functionality
@@ -19,7 +22,12 @@ from app.api.agent_chat_gemini import (
     ChatMessage,
     ChatRequest,
     execute_function,
-    GEMINI_FUNCTIONS,
+    _build_history,
+    _gemini_slot,
+    _sse_event,
+    _SOURCES_PREFIX,
+    CapacityError,
+    GEMINI_TOOL,
     settings
 )
 import google.generativeai as genai
@@ -30,6 +38,85 @@ router = APIRouter(prefix="/api/agent", tags=["agent-reasoning"])
 
 genai.configure(api_key=settings.gemini_api_key)
 
+_SYSTEM_INSTRUCTION = """You are ElasticSeer, an AUTONOMOUS incident response agent.
+
+Your mission: AUTOMATICALLY handle complete incident workflows.
+
+CRITICAL - USE autonomous_incident_response FOR COMPLETE WORKFLOWS:
+When user requests complete workflows, call autonomous_incident_response() - it does EVERYTHING in one call.
+
+CRITICAL - ADAPTIVE FILE SELECTION:
+- ALWAYS search for relevant code files first
+- Use discovered files, not incident data file paths
+- YOUR investigation takes priority"""
+
+# Built once with the shared, pre-converted Tool proto; only start_chat() is per-request
+_MODEL = genai.GenerativeModel(
+    model_name=settings.gemini_model,
+    system_instruction=_SYSTEM_INSTRUCTION,
+    tools=[GEMINI_TOOL],
+    generation_config={
+        "temperature": 0.1,
+        "top_p": 0.95,
+        "top_k": 40,
+    }
+)
+
+
+# Functions that act on an existing incident. When the same turn also registers an
+# incident, they run in a second wave after the registration instead of racing it.
+_AFTER_REGISTRATION = frozenset({
+    "get_incident_by_id", "create_github_pr", "send_slack_alert", "create_jira_ticket", "generate_postmortem"
+})
+
+
+async def _execute_function_calls(calls: List[Tuple[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """
+    Execute a turn's function calls concurrently, wave by wave; results are returned
+    in call order, with exceptions converted to {"success": False, "error": ...}.
+    """
+    waves = [list(range(len(calls)))]
+    if any(name == "register_incident" for name, _ in calls):
+        waves = [
+            [i for i, (name, _) in enumerate(calls) if name not in _AFTER_REGISTRATION],
+            [i for i, (name, _) in enumerate(calls) if name in _AFTER_REGISTRATION]
+        ]
+    
+    results: List[Dict[str, Any]] = [None] * len(calls)
+    for wave in waves:
+        outcomes = await asyncio.gather(*[execute_function(*calls[i]) for i in wave], return_exceptions=True)
+        for i, outcome in zip(wave, outcomes):
+            results[i] = {"success": False, "error": str(outcome)} if isinstance(outcome, Exception) else outcome
+    return results
+
+
+# Reasoning step emitted when each tool is called: (step, thought template, detail keys).
+# Templates are filled from the call's arguments over _TOOL_REASONING_DEFAULTS.
+_TOOL_REASONING = {
+    "query_recent_incidents": ("data_query", "📊 Querying Elasticsearch for recent incidents...", ()),
+    "search_code_by_path": ("code_search", "🔎 Searching GitHub repository for files matching: {pattern}", ("pattern",)),
+    "get_metrics_anomalies": ("anomaly_detection", "📈 Analyzing metrics for {service} to detect anomalies...", ("service",)),
+    "analyze_service_metrics": (
+        "metrics_analysis",
+        "📊 Running comprehensive metrics analysis for {service} over {time_range}...",
+        ("service", "time_range")
+    ),
+    "create_github_pr": ("pr_creation", "🔧 Creating GitHub PR with automated fix for {incident_id}...", ("incident_id",)),
+    "send_slack_alert": ("slack_notification", "📢 Sending alert to Slack war room...", ()),
+    "create_jira_ticket": ("jira_creation", "🎫 Creating Jira ticket for incident tracking...", ()),
+    "register_incident": ("incident_registration", "📝 Registering new incident: {title:.50}...", ("severity",)),
+}
+_TOOL_REASONING_DEFAULTS = {"pattern": "*", "time_range": "24h", "title": ""}
+
+# Action tools whose successful results are plain confirmations - when only these
+# were called, the response is built from the results without a second Gemini call
+_SYNTHESIS_FREE_TOOLS = frozenset({"create_github_pr", "send_slack_alert", "create_jira_ticket"})
+
+# Tool-specific success steps (others get a generic "<name> completed" step)
+_TOOL_COMPLETION = {
+    "analyze_service_metrics": ("analysis_complete", "✅ Comprehensive metrics analysis completed with insights"),
+}
+
 
 class ReasoningStep(BaseModel):
     step: str
@@ -45,6 +132,20 @@ class ChatResponseWithReasoning(BaseModel):
     reasoning_trace: List[ReasoningStep]
 
 
+class BatchChatResult(BaseModel):
+    status_code: int = 200
+    result: Optional[ChatResponseWithReasoning] = None
+    error: Optional[str] = None
+
+
+# Upper bound on chats per /chat_with_reasoning/batch request (Gemini concurrency is
+# separately capped by the shared semaphore)
+_MAX_BATCH_SIZE = 20
+
+# Reasoning steps kept per response; older steps are dropped first
+_MAX_REASONING_STEPS = 200
+
+
 @router.post("/chat_with_reasoning", response_model=ChatResponseWithReasoning)
 async def chat_with_reasoning(request: ChatRequest):
     """
@@ -52,77 +153,138 @@ async def chat_with_reasoning(request: ChatRequest):
     
     Returns the agent's thought process alongside the response
     """
+    return await _chat_with_reasoning(request)
+
+
+@router.post("/chat_with_reasoning/batch", response_model=List[BatchChatResult])
+async def chat_with_reasoning_batch(requests: List[ChatRequest]):
+    """
+    Run several independent chats with reasoning trace concurrently (e.g. one per
+    dashboard panel) in a single HTTP request. Results are in request order; a failed
+    chat is reported in its own entry rather than failing the batch.
+    """
+    if len(requests) > _MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"At most {_MAX_BATCH_SIZE} chats per batch")
+    
+    outcomes = await asyncio.gather(*[_chat_with_reasoning(r) for r in requests], return_exceptions=True)
+    results = []
+    for outcome in outcomes:
+        if isinstance(outcome, HTTPException):
+            results.append(BatchChatResult(status_code=outcome.status_code, error=str(outcome.detail)))
+        elif isinstance(outcome, Exception):
+            results.append(BatchChatResult(status_code=500, error=str(outcome)))
+        else:
+            results.append(BatchChatResult(result=outcome))
+    return results
+
+
+@router.post("/chat_with_reasoning/stream")
+async def chat_with_reasoning_stream(request: ChatRequest):
+    """
+    Chat with ElasticSeer with the reasoning trace streamed as Server-Sent Events
+    
+    Emits a {"type": "step", ...} event as each reasoning step happens, {"type": "text"}
+    events as the final answer is generated, then a {"type": "final", ...} event with
+    the response (or {"type": "error", ...})
+    """
+    queue: asyncio.Queue = asyncio.Queue()
     
-    reasoning_trace = []
+    async def run():
+        try:
+            result = await _chat_with_reasoning(
+                request,
+                on_step=queue.put_nowait,
+                on_text=lambda text: queue.put_nowait({"type": "text", "text": text})
+            )
+            queue.put_nowait({"type": "final", **result.model_dump(exclude={"reasoning_trace"})})
+        except HTTPException as e:
+            queue.put_nowait({"type": "error", "status_code": e.status_code, "detail": e.detail})
+        finally:
+            queue.put_nowait(None)
+    
+    async def events():
+        task = asyncio.create_task(run())
+        try:
+            while (event := await queue.get()) is not None:
+                if isinstance(event, ReasoningStep):
+                    event = {"type": "step", **event.model_dump()}
+                yield _sse_event(event)
+        finally:
+            # Client went away mid-stream - stop working on its behalf
+            task.cancel()
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # identity keeps GZipMiddleware from buffering events until the stream ends
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "Content-Encoding": "identity"}
+    )
+
+
+async def _chat_with_reasoning(
+    request: ChatRequest,
+    on_step: Optional[Callable[[ReasoningStep], None]] = None,
+    on_text: Optional[Callable[[str], None]] = None
+) -> ChatResponseWithReasoning:
+    """
+    Run a chat turn, recording each reasoning step. Steps are passed to on_step as they
+    happen, and the final answer's text chunks to on_text as Gemini generates them.
+    """
+    
+    reasoning_trace: Deque[ReasoningStep] = deque(maxlen=_MAX_REASONING_STEPS)
+    
+    verbose = request.verbose
     
     def add_reasoning(step: str, thought: str, details: Optional[Dict[str, Any]] = None):
         """Helper to add reasoning steps"""
-        reasoning_trace.append(ReasoningStep(
+        reasoning_step = ReasoningStep(
             step=step,
-            thought=thought,
-            timestamp=datetime.utcnow().isoformat(),
-            details=details or {}
-        ))
+            thought=thought if verbose else "",
+            timestamp=datetime.now(timezone.utc).isoformat(),
+            details=details
+        )
+        reasoning_trace.append(reasoning_step)
+        if on_step is not None:
+            on_step(reasoning_step)
         logger.info(f"[REASONING] {step}: {thought}")
     
     try:
-        add_reasoning("initialization", "🤖 ElasticSeer agent initialized, analyzing your request...")
-        
         # Build conversation history
-        history = []
-        for msg in request.conversation_history[-10:]:
-            history.append({
-                "role": "user" if msg.role == "user" else "model",
-                "parts": [msg.content]
-            })
+        history = _build_history(request)
+        chat = _MODEL.start_chat(history=history)
         
-        add_reasoning("context_loading", f"📚 Loaded {len(history)} previous messages for context")
+        async def send_first_message():
+            async with _gemini_slot():
+                return await chat.send_message_async(request.message)
         
-        # System instruction
-        system_instruction = """You are ElasticSeer, an AUTONOMOUS incident response agent.
-
-Your mission: AUTOMATICALLY handle complete incident workflows.
-
-CRITICAL - USE autonomous_incident_response FOR COMPLETE WORKFLOWS:
-When user requests complete workflows, call autonomous_incident_response() - it does EVERYTHING in one call.
-
-CRITICAL - ADAPTIVE FILE SELECTION:
-- ALWAYS search for relevant code files first
-- Use discovered files, not incident data file paths
-- YOUR investigation takes priority"""
-        
-        add_reasoning("model_configuration", "⚙️ Configuring Gemini 2.5 Flash with function calling...")
-        
-        # Create model
-        model = genai.GenerativeModel(
-            model_name=settings.gemini_model,
-            system_instruction=system_instruction,
-            tools=GEMINI_FUNCTIONS,
-            generation_config={
-                "temperature": 0.1,
-                "top_p": 0.95,
-                "top_k": 40,
-            }
-        )
-        
-        chat = model.start_chat(history=history)
-        
-        add_reasoning(
-            "analyzing_request",
-            f"🔍 Analyzing: '{request.message[:80]}{'...' if len(request.message) > 80 else ''}'",
-            {"message_length": len(request.message)}
-        )
+        # Send message to Gemini first, so the model is already working while the
+        # informational steps below are recorded and streamed
+        send_task = asyncio.create_task(send_first_message())
+        try:
+            add_reasoning("initialization", "🤖 ElasticSeer agent initialized, analyzing your request...")
+            
+            add_reasoning("context_loading", f"📚 Loaded {len(history)} previous messages for context")
+            
+            add_reasoning("model_configuration", "⚙️ Configuring Gemini 2.5 Flash with function calling...")
+            
+            add_reasoning(
+                "analyzing_request",
+                f"🔍 Analyzing: '{request.message if len(request.message) <= 80 else request.message[:80] + '...'}'",
+                {"message_length": len(request.message)}
+            )
+        except BaseException:
+            send_task.cancel()
+            raise
         
-        # Send message to Gemini
-        response = chat.send_message(request.message)
+        response = await send_task
         
-        # Check for function calls
-        function_calls = []
+        # Check for function calls, converting each one's protobuf args to a dict once
+        function_calls: List[Tuple[str, Dict[str, Any]]] = []
         response_text = ""
         
         for part in response.parts:
             if hasattr(part, 'function_call') and part.function_call:
-                function_calls.append(part.function_call)
+                function_calls.append((part.function_call.name, dict(part.function_call.args)))
             elif hasattr(part, 'text') and part.text:
                 response_text += part.text
         
@@ -137,10 +299,7 @@ CRITICAL - ADAPTIVE FILE SELECTION:
             function_responses = []
             function_results = []
             
-            for idx, function_call in enumerate(function_calls, 1):
-                function_name = function_call.name
-                arguments = dict(function_call.args)
-                
+            for function_name, arguments in function_calls:
                 # Add detailed reasoning for each function
                 if function_name == "autonomous_incident_response":
                     add_reasoning(
@@ -154,58 +313,21 @@ CRITICAL - ADAPTIVE FILE SELECTION:
                     add_reasoning("workflow_step_4", "📢 Step 4/5: Sending Slack alert to team...")
                     add_reasoning("workflow_step_5", "🎫 Step 5/5: Creating Jira ticket for tracking...")
                 
-                elif function_name == "query_recent_incidents":
-                    add_reasoning("data_query", "📊 Querying Elasticsearch for recent incidents...")
-                
-                elif function_name == "search_code_by_path":
-                    pattern = arguments.get('pattern', '*')
-                    add_reasoning(
-                        "code_search",
-                        f"🔎 Searching GitHub repository for files matching: {pattern}",
-                        {"pattern": pattern}
-                    )
-                
-                elif function_name == "get_metrics_anomalies":
-                    service = arguments.get('service')
-                    add_reasoning(
-                        "anomaly_detection",
-                        f"📈 Analyzing metrics for {service} to detect anomalies...",
-                        {"service": service}
-                    )
-                
-                elif function_name == "analyze_service_metrics":
-                    service = arguments.get('service')
-                    time_range = arguments.get('time_range', '24h')
-                    add_reasoning(
-                        "metrics_analysis",
-                        f"📊 Running comprehensive metrics analysis for {service} over {time_range}...",
-                        {"service": service, "time_range": time_range}
-                    )
-                
-                elif function_name == "create_github_pr":
-                    incident_id = arguments.get('incident_id')
-                    add_reasoning(
-                        "pr_creation",
-                        f"🔧 Creating GitHub PR with automated fix for {incident_id}...",
-                        {"incident_id": incident_id}
-                    )
-                
-                elif function_name == "send_slack_alert":
-                    add_reasoning("slack_notification", "📢 Sending alert to Slack war room...")
-                
-                elif function_name == "create_jira_ticket":
-                    add_reasoning("jira_creation", "🎫 Creating Jira ticket for incident tracking...")
-                
-                elif function_name == "register_incident":
-                    title = arguments.get('title', '')
-                    add_reasoning(
-                        "incident_registration",
-                        f"📝 Registering new incident: {title[:50]}...",
-                        {"severity": arguments.get('severity')}
-                    )
+                else:
+                    entry = _TOOL_REASONING.get(function_name)
+                    if entry:
+                        step, template, detail_keys = entry
+                        values = defaultdict(lambda: None, _TOOL_REASONING_DEFAULTS)
+                        values.update(arguments)
+                        add_reasoning(
+                            step,
+                            template.format_map(values) if verbose else "",
+                            {k: values[k] for k in detail_keys} if detail_keys else None
+                        )
                 
-                # Execute the function
-                result = await execute_function(function_name, arguments)
+            results = await _execute_function_calls(function_calls)
+            
+            for (function_name, _), result in zip(function_calls, results):
                 function_results.append({"function": function_name, "result": result})
                 
                 # Add result reasoning
@@ -232,10 +354,17 @@ CRITICAL - ADAPTIVE FILE SELECTION:
                             ticket_id = workflow["jira_ticket"].get("ticket_id")
                             add_reasoning("workflow_complete_5", f"✅ Jira ticket {ticket_id} created")
                         
-                        add_reasoning("workflow_success", "🎉 Complete autonomous workflow executed successfully!")
+                        if result.get("status") == "accepted":
+                            add_reasoning(
+                                "workflow_accepted",
+                                f"⏳ Remaining workflow steps running in the background - track at {result.get('status_url')}",
+                                {"status_url": result.get("status_url")}
+                            )
+                        else:
+                            add_reasoning("workflow_success", "🎉 Complete autonomous workflow executed successfully!")
                     
-                    elif function_name == "analyze_service_metrics":
-                        add_reasoning("analysis_complete", "✅ Comprehensive metrics analysis completed with insights")
+                    elif function_name in _TOOL_COMPLETION:
+                        add_reasoning(*_TOOL_COMPLETION[function_name])
                     
                     else:
                         add_reasoning(f"{function_name}_complete", f"✅ {function_name} completed successfully")
@@ -251,39 +380,55 @@ CRITICAL - ADAPTIVE FILE SELECTION:
                     )
                 )
             
-            add_reasoning("generating_response", "💭 Synthesizing final response from results...")
+            # Confirmations from action-only tools are rendered deterministically by the
+            # fallback below, so only results that need interpreting go back to Gemini
+            needs_synthesis = not all(
+                name in _SYNTHESIS_FREE_TOOLS and result.get("success")
+                for (name, _), result in zip(function_calls, results)
+            )
+            
+            if needs_synthesis:
+                add_reasoning("generating_response", "💭 Synthesizing final response from results...")
             
-            # Send function results back to Gemini
-            try:
-                response2 = chat.send_message(function_responses)
-                
-                final_text = ""
-                for part in response2.parts:
-                    if hasattr(part, 'text') and part.text:
-                        final_text += part.text
+                # Send function results back to Gemini
+                try:
+                    # Streamed, so a streaming client sees the answer as it is generated
+                    final_parts = []
+                    async with _gemini_slot():
+                        response2 = await chat.send_message_async(function_responses, stream=True)
+                        async for chunk in response2:
+                            for part in chunk.parts:
+                                if hasattr(part, 'text') and part.text:
+                                    final_parts.append(part.text)
+                                    if on_text is not None:
+                                        on_text(part.text)
+                    final_text = "".join(final_parts)
                 
-                if final_text:
-                    add_reasoning("response_ready", "✅ Response generated successfully!")
+                    if final_text:
+                        add_reasoning("response_ready", "✅ Response generated successfully!")
                     
-                    return ChatResponseWithReasoning(
-                        response=final_text,
-                        sources=["gemini-2.5-flash", "mcp-server"] + [fc.name for fc in function_calls],
-                        metadata={
-                            "model": "gemini-2.5-flash",
-                            "function_calls": [{"name": fc.name, "args": dict(fc.args)} for fc in function_calls],
-                            "function_results": function_results
-                        },
-                        reasoning_trace=reasoning_trace
-                    )
-            except Exception as e:
-                logger.warning(f"Gemini failed to generate final response: {e}")
-                add_reasoning("fallback_response", "⚠️ Using fallback response generation...")
+                        return ChatResponseWithReasoning(
+                            response=final_text,
+                            sources=[*_SOURCES_PREFIX, *(name for name, _ in function_calls)],
+                            metadata={
+                                "model": "gemini-2.5-flash",
+                                "function_calls": [{"name": name, "args": args} for name, args in function_calls],
+                                "function_results": function_results
+                            },
+                            reasoning_trace=list(reasoning_trace)
+                        )
+                except Exception as e:
+                    logger.warning(f"Gemini failed to generate final response: {e}")
+                    add_reasoning("fallback_response", "⚠️ Using fallback response generation...")
+            
+            else:
+                add_reasoning("direct_summary", "📝 Actions confirmed - summarizing results directly")
             
             # Fallback response
-            fallback_response = "✅ **Actions completed successfully!**\n\n"
+            fallback_parts = ["✅ **Actions completed successfully!**\n\n"]
             
             # Proof of Work Section
-            fallback_response += "### 🛡️ Proof of Work\n"
+            fallback_parts.append("### 🛡️ Proof of Work\n")
             
             for func_result in function_results:
                 func_name = func_result["function"]
@@ -294,44 +439,58 @@ CRITICAL - ADAPTIVE FILE SELECTION:
                     incident_id = result.get("incident_id")
                     
                     if workflow.get("incident_registration", {}).get("success"):
-                        fallback_response += f"- **Incident Registered**: `{incident_id}`\n"
+                        fallback_parts.append(f"- **Incident Registered**: `{incident_id}`\n")
                     
                     if workflow.get("code_search", {}).get("success"):
                         target_file = workflow["code_search"].get("target_file")
-                        fallback_response += f"- **Code Investigated**: `{target_file}`\n"
+                        fallback_parts.append(f"- **Code Investigated**: `{target_file}`\n")
                     
                     if workflow.get("pr_creation", {}).get("success"):
                         pr_num = workflow["pr_creation"].get("pr_number")
                         pr_url = workflow["pr_creation"].get("pr_url")
-                        fallback_response += f"- **Pull Request created**: [PR #{pr_num}]({pr_url})\n"
+                        fallback_parts.append(f"- **Pull Request created**: [PR #{pr_num}]({pr_url})\n")
                     
                     if workflow.get("slack_alert", {}).get("success"):
                         channel = workflow["slack_alert"].get("channel", "#general")
-                        fallback_response += f"- **Slack Notification**: Sent to `{channel}`\n"
+                        fallback_parts.append(f"- **Slack Notification**: Sent to `{channel}`\n")
                     
                     if workflow.get("jira_ticket", {}).get("success"):
                         ticket_id = workflow["jira_ticket"].get("ticket_id")
                         # Construct Jira URL if settings allow
                         jira_url = f"{settings.jira_url}/browse/{ticket_id}" if settings.jira_url else None
                         if jira_url:
-                            fallback_response += f"- **Jira Ticket created**: [{ticket_id}]({jira_url})\n"
+                            fallback_parts.append(f"- **Jira Ticket created**: [{ticket_id}]({jira_url})\n")
                         else:
-                            fallback_response += f"- **Jira Ticket created**: `{ticket_id}`\n"
+                            fallback_parts.append(f"- **Jira Ticket created**: `{ticket_id}`\n")
                     
-                    fallback_response += "\n> [!NOTE]\n> The autonomous workflow has finished all requested actions. You can review the details using the links above."
+                    fallback_parts.append("\n> [!NOTE]\n> The autonomous workflow has finished all requested actions. You can review the details using the links above.")
+                
+                elif func_name == "create_github_pr" and result.get("success"):
+                    fallback_parts.append(f"- **Pull Request created**: [PR #{result.get('pr_number')}]({result.get('pr_url')})\n")
+                
+                elif func_name == "send_slack_alert" and result.get("success"):
+                    fallback_parts.append(f"- **Slack Notification**: Sent to `{result.get('channel', '#general')}`\n")
+                
+                elif func_name == "create_jira_ticket" and result.get("success"):
+                    ticket_id = result.get("ticket_id")
+                    jira_url = result.get("url") or (f"{settings.jira_url}/browse/{ticket_id}" if settings.jira_url else None)
+                    if jira_url:
+                        fallback_parts.append(f"- **Jira Ticket created**: [{ticket_id}]({jira_url})\n")
+                    else:
+                        fallback_parts.append(f"- **Jira Ticket created**: `{ticket_id}`\n")
             
             add_reasoning("response_ready", "✅ Fallback response generated!")
             
             return ChatResponseWithReasoning(
-                response=fallback_response,
-                sources=["gemini-2.5-flash", "mcp-server"] + [fc.name for fc in function_calls],
+                response="".join(fallback_parts),
+                sources=[*_SOURCES_PREFIX, *(name for name, _ in function_calls)],
                 metadata={
                     "model": "gemini-2.5-flash",
-                    "function_calls": [{"name": fc.name, "args": dict(fc.args)} for fc in function_calls],
+                    "function_calls": [{"name": name, "args": args} for name, args in function_calls],
                     "function_results": function_results,
                     "fallback_used": True
                 },
-                reasoning_trace=reasoning_trace
+                reasoning_trace=list(reasoning_trace)
             )
         
         # No function calls, return direct response
@@ -342,9 +501,11 @@ CRITICAL - ADAPTIVE FILE SELECTION:
             response=response_text or "I'm here to help! Ask me about incidents, anomalies, or code issues.",
             sources=["gemini-2.5-flash"],
             metadata={"model": "gemini-2.5-flash"},
-            reasoning_trace=reasoning_trace
+            reasoning_trace=list(reasoning_trace)
         )
         
+    except CapacityError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         logger.error(f"Error: {e}", exc_info=True)
         add_reasoning("error", f"❌ Error occurred: {str(e)}")
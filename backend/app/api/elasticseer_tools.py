@@ -10,14 +10,20 @@ These endpoints are called by the Kibana agent to perform actions:
 """
 
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
+from functools import lru_cache, partial
+import asyncio
+import re
 import google.generativeai as genai
-from github import Github
+from github import Github, GithubException, InputGitTreeElement, UnknownObjectException
 import httpx
+import orjson
 from app.core.config import settings
 from app.api.activity_log import log_activity
+from app.services.llm_cache import llm_cache
 
 router = APIRouter(prefix="/api/elasticseer", tags=["elasticseer-tools"])
 
@@ -25,6 +31,99 @@ router = APIRouter(prefix="/api/elasticseer", tags=["elasticseer-tools"])
 genai.configure(api_key=settings.gemini_api_key)
 github_client = Github(settings.github_token) if settings.github_token else None
 
+# Fix generation and diagnosis models, built once at import. The fixed instructions and
+# output format live in the system instruction - a stable prefix Gemini can reuse from
+# its implicit cache - so each prompt only carries the request's own data.
+_FIX_SYSTEM_INSTRUCTION = """You are an expert software engineer fixing a production bug.
+
+Generate a fixed version of the code that resolves the diagnosed issue. 
+Provide:
+1. The complete fixed code
+2. Explanation of what was changed and why
+3. Any additional recommendations
+
+Format your response as:
+FIXED_CODE:
+```
+[fixed code here]
+```
+
+EXPLANATION:
+[explanation here]
+
+RECOMMENDATIONS:
+[recommendations here]
+"""
+_fix_model = genai.GenerativeModel(settings.gemini_model, system_instruction=_FIX_SYSTEM_INSTRUCTION)
+# Section headers of a fix response, and the fenced code block (minus any language tag)
+_FIX_SECTION_RE = re.compile(r"(FIXED_CODE|EXPLANATION|RECOMMENDATIONS):")
+_CODE_BLOCK_RE = re.compile(r"```(?:[\w+-]*\n)?(.*?)```", re.DOTALL)
+
+_DIAGNOSIS_SYSTEM_INSTRUCTION = """You are an expert SRE diagnosing a production incident.
+
+Provide a root cause diagnosis including:
+1. Root cause explanation
+2. Affected components
+3. Impact assessment
+4. Confidence level (0.0-1.0)
+5. Recommended fix
+
+Be specific and actionable.
+"""
+_diagnosis_model = genai.GenerativeModel(settings.gemini_model, system_instruction=_DIAGNOSIS_SYSTEM_INSTRUCTION)
+
+# Bound on concurrent GitHub API calls per process, to stay clear of GitHub's
+# secondary rate limits when fanning out over a PR's files
+_github_semaphore = asyncio.Semaphore(10)
+
+# FIXES.md section proposing a change to a file that isn't in the repository
+_FIX_DOC_FMT = """# Proposed Fix for {path}
+
+**Incident**: {incident_id}
+**Target File**: {path}
+**Status**: File not found in repository
+
+## Proposed Changes
+
+```
+{content}
+```
+
+## Notes
+
+The target file `{path}` was not found in the repository.
+This document contains the proposed fix that should be applied manually.
+
+---
+*Generated by ElasticSeer Autonomous Agent*
+"""
+
+# Slack message prefix per incident severity
+_SEVERITY_EMOJI = {
+    "Sev-1": "🚨",
+    "Sev-2": "⚠️",
+    "Sev-3": "ℹ️"
+}
+
+_SLACK_URL = "https://slack.com/api/chat.postMessage"
+_SLACK_CHANNEL = settings.slack_war_room_channel or "#elasticseer-alerts"
+# Per incident: loop time of its last Slack post (kept while its batch window is open)
+_slack_last_post: Dict[str, float] = {}
+# Follow-up posts being collected per incident: incident_id -> (messages, pending post)
+_slack_batches: Dict[str, Tuple[List[str], "asyncio.Future[Tuple[Dict[str, Any], str]]"]] = {}
+
+# Shared Slack client: calls reuse one keep-alive (HTTP/2) connection and carry the
+# auth headers set here, so each post only supplies its JSON body
+_slack_client = httpx.AsyncClient(
+    headers={
+        "Authorization": f"Bearer {settings.slack_bot_token}",
+        "Content-Type": "application/json"
+    },
+    timeout=httpx.Timeout(10.0, connect=5.0),
+    limits=httpx.Limits(max_keepalive_connections=32, max_connections=64, keepalive_expiry=30.0),
+    http2=True
+)
+
 
 # Request/Response Models
 class GenerateFixRequest(BaseModel):
@@ -86,37 +185,43 @@ class RegisterIncidentRequest(BaseModel):
     target_file: Optional[str] = None
 
 
+@router.on_event("shutdown")
+async def close_http_clients():
+    """Close the shared HTTP clients (this module's and the Jira client's)"""
+    from app.services.jira_client import jira_client
+    
+    await _slack_client.aclose()
+    await jira_client.aclose()
+
+
 @router.post("/register_incident")
 async def register_incident(request: RegisterIncidentRequest):
     """
     Register a new incident in the system
-    This is a wrapper that calls the incident management API
+    This is a wrapper that calls the incident management handler in-process
     """
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        try:
-            response = await client.post(
-                "http://localhost:8001/api/incidents/register",
-                json={
-                    "title": request.title,
-                    "service": request.service,
-                    "severity": request.severity,
-                    "description": request.description,
-                    "target_file": request.target_file
-                }
+    from app.api import incident_management
+    
+    try:
+        data = await incident_management.register_incident(
+            incident_management.RegisterIncidentRequest(
+                title=request.title,
+                service=request.service,
+                severity=request.severity,
+                description=request.description,
+                target_file=request.target_file
             )
-            
-            if response.status_code == 200:
-                data = response.json()
-                return {
-                    "success": True,
-                    "incident_id": data['incident_id'],
-                    "message": f"Incident {data['incident_id']} registered successfully"
-                }
-            else:
-                raise HTTPException(status_code=response.status_code, detail=response.text)
-                
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Failed to register incident: {str(e)}")
+        )
+        return {
+            "success": True,
+            "incident_id": data['incident_id'],
+            "message": f"Incident {data['incident_id']} registered successfully"
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to register incident: {str(e)}")
 
 
 @router.post("/generate_fix")
@@ -125,11 +230,85 @@ async def generate_code_fix(request: GenerateFixRequest):
     Generate AI-powered code fix using Gemini
     """
     try:
-        model = genai.GenerativeModel(settings.gemini_model)
+        prompt = _fix_prompt(request)
+        
+        result_text = await llm_cache.get_or_generate("generate_fix", prompt, partial(_generate_text, _fix_model))
+        
+        # Parse the response
+        fixed_code, explanation, recommendations = _parse_fix_response(result_text)
+        
+        return {
+            "success": True,
+            "file_path": request.file_path,
+            "fixed_code": fixed_code,
+            "explanation": explanation,
+            "recommendations": recommendations,
+            "generated_at": datetime.utcnow().isoformat()
+        }
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to generate fix: {str(e)}")
+
+
+@router.post("/generate_fix/stream")
+async def generate_code_fix_stream(request: GenerateFixRequest):
+    """
+    Generate AI-powered code fix using Gemini, streamed as NDJSON
+    
+    Emits {"section": "fixed_code" | "explanation" | "recommendations", "content": ...}
+    as each section of the fix is completed, then the same object /generate_fix returns
+    with "done": true (or {"error": ...})
+    """
+    prompt = _fix_prompt(request)
+    
+    async def lines():
+        emitted = set()
         
-        prompt = f"""You are an expert software engineer fixing a production bug.
+        def new_sections(text: str, final: bool):
+            parts = _FIX_SECTION_RE.split(text)
+            names, bodies = parts[1::2], parts[2::2]
+            # Until the response ends, the last section may still be growing
+            complete = len(names) if final else len(names) - 1
+            for name, body in zip(names[:complete], bodies[:complete]):
+                if name not in emitted:
+                    emitted.add(name)
+                    yield orjson.dumps({"section": name.lower(), "content": _fix_section_value(name, body)}) + b"\n"
+        
+        try:
+            result_text = llm_cache.get("generate_fix", prompt)
+            if result_text is None:
+                chunks = []
+                response = await _fix_model.generate_content_async(prompt, stream=True)
+                async for chunk in response:
+                    chunks.append(chunk.text)
+                    for line in new_sections("".join(chunks), final=False):
+                        yield line
+                result_text = "".join(chunks)
+                if result_text:
+                    llm_cache.put("generate_fix", prompt, result_text)
+            for line in new_sections(result_text, final=True):
+                yield line
+            
+            fixed_code, explanation, recommendations = _parse_fix_response(result_text)
+            yield orjson.dumps({
+                "done": True,
+                "success": True,
+                "file_path": request.file_path,
+                "fixed_code": fixed_code,
+                "explanation": explanation,
+                "recommendations": recommendations,
+                "generated_at": datetime.utcnow().isoformat()
+            }) + b"\n"
+        except Exception as e:
+            yield orjson.dumps({"error": f"Failed to generate fix: {str(e)}"}) + b"\n"
+    
+    # identity keeps GZipMiddleware from buffering the lines until the stream ends
+    return StreamingResponse(lines(), media_type="application/x-ndjson", headers={"Content-Encoding": "identity"})
+
 
-**File**: {request.file_path}
+def _fix_prompt(request: GenerateFixRequest) -> str:
+    """Per-request part of the fix prompt (instructions are in _FIX_SYSTEM_INSTRUCTION)"""
+    return f"""**File**: {request.file_path}
 
 **Diagnosis**: {request.diagnosis}
 
@@ -139,62 +318,142 @@ async def generate_code_fix(request: GenerateFixRequest):
 ```
 
 **Context**: {request.incident_context or 'N/A'}
+"""
 
-Generate a fixed version of the code that resolves the diagnosed issue. 
-Provide:
-1. The complete fixed code
-2. Explanation of what was changed and why
-3. Any additional recommendations
 
-Format your response as:
-FIXED_CODE:
-```
-[fixed code here]
-```
+def _fix_section_value(name: str, body: str) -> str:
+    """A fix response section's value: the fenced code for FIXED_CODE, else the stripped text"""
+    if name == "FIXED_CODE":
+        code_match = _CODE_BLOCK_RE.search(body)
+        return code_match.group(1).strip() if code_match else ""
+    return body.strip()
 
-EXPLANATION:
-[explanation here]
 
-RECOMMENDATIONS:
-[recommendations here]
-"""
-        
-        response = model.generate_content(prompt)
-        result_text = response.text
-        
-        # Parse the response
-        fixed_code = ""
-        explanation = ""
-        recommendations = ""
-        
-        if "FIXED_CODE:" in result_text:
-            parts = result_text.split("FIXED_CODE:")[1]
-            if "```" in parts:
-                code_parts = parts.split("```")
-                if len(code_parts) >= 2:
-                    fixed_code = code_parts[1].strip()
-        
-        if "EXPLANATION:" in result_text:
-            parts = result_text.split("EXPLANATION:")[1]
-            if "RECOMMENDATIONS:" in parts:
-                explanation = parts.split("RECOMMENDATIONS:")[0].strip()
-            else:
-                explanation = parts.strip()
-        
-        if "RECOMMENDATIONS:" in result_text:
-            recommendations = result_text.split("RECOMMENDATIONS:")[1].strip()
-        
-        return {
-            "success": True,
-            "file_path": request.file_path,
-            "fixed_code": fixed_code,
-            "explanation": explanation,
-            "recommendations": recommendations,
-            "generated_at": datetime.utcnow().isoformat()
-        }
+def _parse_fix_response(text: str) -> Tuple[str, str, str]:
+    """
+    Split a FIXED_CODE / EXPLANATION / RECOMMENDATIONS response into (fixed code,
+    explanation, recommendations) in one scan; missing sections are empty
+    """
+    parts = _FIX_SECTION_RE.split(text)
+    sections: Dict[str, str] = {}
+    for name, body in zip(parts[1::2], parts[2::2]):
+        sections.setdefault(name, body)
+    
+    return (
+        _fix_section_value("FIXED_CODE", sections.get("FIXED_CODE", "")),
+        sections.get("EXPLANATION", "").strip(),
+        sections.get("RECOMMENDATIONS", "").strip()
+    )
+
+
+async def _post_to_slack(incident_id: str, message: str) -> Tuple[Dict[str, Any], str]:
+    """
+    Post message to the war room channel. Returns Slack's response and the text that
+    was actually posted.
+    
+    The first message for an incident goes out immediately. Follow-ups sent within
+    settings.slack_batch_window_seconds of the incident's last post are coalesced into
+    one post at the end of that window (an incident storm would otherwise hit Slack's
+    ~1 message/sec channel limit); every caller in a batch gets the same response.
+    """
+    batch = _slack_batches.get(incident_id)
+    if batch is None:
+        last_post = _slack_last_post.get(incident_id)
+        delay = last_post + settings.slack_batch_window_seconds - asyncio.get_running_loop().time() if last_post is not None else 0.0
+        if delay <= 0:
+            _open_slack_window(incident_id)
+            return await _send_slack_text(message), message
         
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to generate fix: {str(e)}")
+        messages: List[str] = []
+        batch = _slack_batches[incident_id] = (messages, asyncio.ensure_future(_flush_slack_batch(incident_id, messages, delay)))
+    batch[0].append(message)
+    # Shielded so one caller disconnecting doesn't cancel the post for the others
+    return await asyncio.shield(batch[1])
+
+
+async def _flush_slack_batch(incident_id: str, messages: List[str], delay: float) -> Tuple[Dict[str, Any], str]:
+    """Wait out the incident's batch window, then send its collected follow-ups as one post"""
+    await asyncio.sleep(delay)
+    del _slack_batches[incident_id]
+    _open_slack_window(incident_id)
+    
+    if len(messages) == 1:
+        text = messages[0]
+    else:
+        text = f"*Related updates ({len(messages)}):*\n\n" + "\n\n".join(messages)
+    
+    return await _send_slack_text(text), text
+
+
+def _open_slack_window(incident_id: str):
+    """Record a post for incident_id now, and forget it once its batch window has passed"""
+    loop = asyncio.get_running_loop()
+    posted_at = _slack_last_post[incident_id] = loop.time()
+    
+    def close():
+        if _slack_last_post.get(incident_id) == posted_at:
+            del _slack_last_post[incident_id]
+    
+    loop.call_later(settings.slack_batch_window_seconds, close)
+
+
+async def _send_slack_text(text: str) -> Dict[str, Any]:
+    """Post text to the war room channel and return Slack's response"""
+    response = await _slack_client.post(
+        _SLACK_URL,
+        content=orjson.dumps({
+            "channel": _SLACK_CHANNEL,
+            "text": text,
+            "mrkdwn": True
+        })
+    )
+    return response.json()
+
+
+async def _generate_text(model: genai.GenerativeModel, prompt: str) -> str:
+    """Plain-text Gemini completion for prompt"""
+    response = await model.generate_content_async(prompt)
+    return response.text
+
+
+async def _github_call(fn, *args, **kwargs):
+    """Run a blocking PyGithub call in a worker thread, within the GitHub concurrency limit"""
+    async with _github_semaphore:
+        return await asyncio.to_thread(fn, *args, **kwargs)
+
+
+@lru_cache(maxsize=4)
+def _get_repo(full_name: str):
+    """Repository object (with its default branch), fetched from GitHub once per process"""
+    return github_client.get_repo(full_name)
+
+
+def _ensure_branch(repo, branch_name: str, base_sha: str):
+    """Create branch_name at base_sha (or reuse it if it already exists) and return its ref"""
+    try:
+        return repo.create_git_ref(f"refs/heads/{branch_name}", base_sha)
+    except GithubException as e:
+        # 422 "Reference already exists"
+        if e.status != 422:
+            raise
+        return repo.get_git_ref(f"heads/{branch_name}")
+
+
+def _commit_tree(repo, branch_ref, tree_elements: List[InputGitTreeElement], message: str) -> None:
+    """Commit tree_elements on top of the branch head and move the branch to it"""
+    parent = repo.get_git_commit(branch_ref.object.sha)
+    tree = repo.create_git_tree(tree_elements, parent.tree)
+    commit = repo.create_git_commit(message, tree, [parent])
+    branch_ref.edit(commit.sha)
+
+
+def _file_exists(repo, path: str, ref: str) -> bool:
+    """Whether path exists in the repository at ref"""
+    try:
+        repo.get_contents(path, ref=ref)
+        return True
+    except UnknownObjectException:
+        return False
 
 
 @router.post("/create_pr")
@@ -207,91 +466,72 @@ async def create_github_pr(request: CreatePRRequest):
         raise HTTPException(status_code=503, detail="GitHub integration not configured")
     
     try:
-        repo = github_client.get_repo(f"{settings.github_owner}/{settings.github_repo}")
+        # PyGithub is synchronous - every call below runs in a worker thread so a slow
+        # GitHub round trip doesn't block the event loop
+        repo = await _github_call(_get_repo, f"{settings.github_owner}/{settings.github_repo}")
         
-        # Get default branch
+        # Get default branch (cached with the repository)
         default_branch = repo.default_branch
-        base_ref = repo.get_git_ref(f"heads/{default_branch}")
+        base_ref = await _github_call(repo.get_git_ref, f"heads/{default_branch}")
         base_sha = base_ref.object.sha
         
         # Create new branch
-        try:
-            repo.create_git_ref(f"refs/heads/{request.branch_name}", base_sha)
-        except Exception as e:
-            if "already exists" not in str(e).lower():
-                raise
+        branch_ref = await _github_call(_ensure_branch, repo, request.branch_name, base_sha)
         
-        # Update files - with fallback for missing files
+        # Which target files exist (and their modes), from one recursive listing of the
+        # branch rather than downloading each file
+        tree = await _github_call(repo.get_git_tree, branch_ref.object.sha, recursive=True)
+        blob_modes = {element.path: element.mode for element in tree.tree if element.type == "blob"}
+        
+        # Listings of very large repositories are truncated - check those paths directly
+        missing = [file_change.path for file_change in request.files if file_change.path not in blob_modes]
+        if missing and tree.raw_data.get("truncated"):
+            exists = await asyncio.gather(*[
+                _github_call(_file_exists, repo, path, request.branch_name) for path in missing
+            ])
+            blob_modes.update((path, "100644") for path, file_exists in zip(missing, exists) if file_exists)
+        
+        # Update existing files - with fallback for missing files
         files_updated = []
+        tree_elements = []
+        fix_docs = []
         for file_change in request.files:
-            try:
-                # Try to get existing file
-                contents = repo.get_contents(file_change.path, ref=request.branch_name)
-                repo.update_file(
-                    file_change.path,
-                    f"Fix: Update {file_change.path}",
-                    file_change.content,
-                    contents.sha,
-                    branch=request.branch_name
-                )
+            mode = blob_modes.get(file_change.path)
+            if mode:
+                tree_elements.append(InputGitTreeElement(file_change.path, mode, "blob", content=file_change.content))
                 files_updated.append(file_change.path)
-            except:
-                # File doesn't exist - create FIXES.md with proposed changes
-                fix_doc = f"""# Proposed Fix for {file_change.path}
-
-**Incident**: {request.incident_id or 'N/A'}
-**Target File**: {file_change.path}
-**Status**: File not found in repository
-
-## Proposed Changes
-
-```
-{file_change.content}
-```
-
-## Notes
-
-The target file `{file_change.path}` was not found in the repository.
-This document contains the proposed fix that should be applied manually.
-
----
-*Generated by ElasticSeer Autonomous Agent*
-"""
-                try:
-                    repo.create_file(
-                        "FIXES.md",
-                        f"Fix: Proposed changes for {file_change.path}",
-                        fix_doc,
-                        branch=request.branch_name
-                    )
-                    files_updated.append("FIXES.md")
-                except:
-                    # FIXES.md exists, update it
-                    try:
-                        fixes_content = repo.get_contents("FIXES.md", ref=request.branch_name)
-                        repo.update_file(
-                            "FIXES.md",
-                            f"Fix: Update proposed changes",
-                            fix_doc,
-                            fixes_content.sha,
-                            branch=request.branch_name
-                        )
-                        files_updated.append("FIXES.md")
-                    except:
-                        pass
+            else:
+                # File doesn't exist - add its proposed changes to FIXES.md
+                fix_docs.append(_FIX_DOC_FMT.format(
+                    path=file_change.path,
+                    incident_id=request.incident_id or 'N/A',
+                    content=file_change.content
+                ))
+        if fix_docs:
+            tree_elements.append(InputGitTreeElement("FIXES.md", "100644", "blob", content="\n".join(fix_docs)))
+            files_updated.append("FIXES.md")
+        
+        # Write every change as one commit on the branch (one tree + commit + ref update,
+        # however many files) rather than a commit per file
+        if tree_elements:
+            await _github_call(
+                _commit_tree, repo, branch_ref, tree_elements, f"Fix: Update {', '.join(files_updated)}"
+            )
         
         # Create pull request
-        pr = repo.create_pull(
+        pr = await _github_call(
+            repo.create_pull,
             title=request.title,
             body=request.description,
             head=request.branch_name,
             base=default_branch
         )
         
-        # Add labels
-        pr.add_to_labels("elasticseer", "automated-fix")
+        # Add labels (one request)
+        labels = ["elasticseer", "automated-fix"]
         if request.incident_id:
-            pr.add_to_labels(f"incident-{request.incident_id}")
+            labels.append(f"incident-{request.incident_id}")
+        await _github_call(pr.add_to_labels, *labels)
         
         # Log PR creation activity
         await log_activity(
@@ -322,68 +562,61 @@ This document contains the proposed fix that should be applied manually.
         raise HTTPException(status_code=500, detail=f"Failed to create PR: {str(e)}")
 
 
+async def post_slack_message(payload: Dict[str, Any]) -> httpx.Response:
+    """
+    Post a chat.postMessage payload as the bot, on the shared keep-alive client.
+    Used for replies that don't go through send_slack_notification (e.g. @mentions).
+    """
+    return await _slack_client.post(_SLACK_URL, content=orjson.dumps(payload))
+
+
 @router.post("/send_slack")
 async def send_slack_notification(request: SlackNotificationRequest):
     """
     Send notification to Slack war room
     """
-    
-    severity_emoji = {
-        "Sev-1": "🚨",
-        "Sev-2": "⚠️",
-        "Sev-3": "ℹ️"
-    }
-    
-    emoji = severity_emoji.get(request.severity, "📢")
+    emoji = _SEVERITY_EMOJI.get(request.severity, "📢")
     
     # Build Slack message
-    message = f"{emoji} *{request.severity}* - {request.title}\n\n"
-    message += f"*Incident*: {request.incident_id}\n"
-    message += f"*Message*: {request.message}\n"
+    parts = [
+        f"{emoji} *{request.severity}* - {request.title}\n\n",
+        f"*Incident*: {request.incident_id}\n",
+        f"*Message*: {request.message}\n"
+    ]
     
     if request.pr_url:
-        message += f"*PR*: {request.pr_url}\n"
+        parts.append(f"*PR*: {request.pr_url}\n")
     
     # Add Jira ticket URL if provided
-    if hasattr(request, 'jira_url') and request.jira_url:
-        message += f"*Jira Ticket*: {request.jira_url}\n"
+    if request.jira_url:
+        parts.append(f"*Jira Ticket*: {request.jira_url}\n")
     
     if request.action_required:
-        message += f"\n⚡ *Action Required*: Please review and approve"
+        parts.append("\n⚡ *Action Required*: Please review and approve")
+    
+    message = "".join(parts)
     
     # Try to send to Slack if token is configured
     if settings.slack_bot_token:
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.post(
-                    "https://slack.com/api/chat.postMessage",
-                    headers={
-                        "Authorization": f"Bearer {settings.slack_bot_token}",
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "channel": settings.slack_war_room_channel or "#elasticseer-alerts",
-                        "text": message,
-                        "mrkdwn": True
-                    }
-                )
-                
-                result = response.json()
+            result, posted_text = await _post_to_slack(request.incident_id, message)
+            
+            if result.get("ok"):
+                return {
+                    "success": True,
+                    "channel": _SLACK_CHANNEL,
+                    # What Slack received - several updates merged into one post when coalesced
+                    "message": posted_text,
+                    "coalesced": posted_text != message,
+                    "sent_at": datetime.utcnow().isoformat(),
+                    "slack_ts": result.get("ts")
+                }
+            else:
+                # Log error but don't fail
+                error_msg = result.get("error", "Unknown error")
+                print(f"Slack API error: {error_msg}")
                 
-                if result.get("ok"):
-                    return {
-                        "success": True,
-                        "channel": settings.slack_war_room_channel or "#elasticseer-alerts",
-                        "message": message,
-                        "sent_at": datetime.utcnow().isoformat(),
-                        "slack_ts": result.get("ts")
-                    }
-                else:
-                    # Log error but don't fail
-                    error_msg = result.get("error", "Unknown error")
-                    print(f"Slack API error: {error_msg}")
-                    
-                    # Fall through to console logging
+                # Fall through to console logging
         except Exception as e:
             print(f"Failed to send to Slack: {e}")
             # Fall through to console logging
@@ -404,7 +637,7 @@ async def send_slack_notification(request: SlackNotificationRequest):
             "incident_id": request.incident_id,
             "title": request.title,
             "message": request.message,
-            "channel": settings.slack_war_room_channel or "#elasticseer-alerts",
+            "channel": _SLACK_CHANNEL,
             "pr_url": request.pr_url,
             "jira_url": getattr(request, 'jira_url', None)
         },
@@ -413,7 +646,7 @@ async def send_slack_notification(request: SlackNotificationRequest):
     
     return {
         "success": True,
-        "channel": settings.slack_war_room_channel or "#elasticseer-alerts",
+        "channel": _SLACK_CHANNEL,
         "message": message,
         "sent_at": datetime.utcnow().isoformat(),
         "note": "Logged to console (Slack may not be fully configured)"
@@ -443,11 +676,7 @@ async def diagnose_root_cause(request: DiagnoseRequest):
     Diagnose root cause using AI analysis
     """
     try:
-        model = genai.GenerativeModel(settings.gemini_model)
-        
-        prompt = f"""You are an expert SRE diagnosing a production incident.
-
-**Anomaly**:
+        prompt = f"""**Anomaly**:
 {request.anomaly}
 
 **Similar Past Incidents**:
@@ -455,22 +684,13 @@ async def diagnose_root_cause(request: DiagnoseRequest):
 
 **Relevant Code**:
 {request.relevant_code or 'Not available'}
-
-Provide a root cause diagnosis including:
-1. Root cause explanation
-2. Affected components
-3. Impact assessment
-4. Confidence level (0.0-1.0)
-5. Recommended fix
-
-Be specific and actionable.
 """
         
-        response = model.generate_content(prompt)
+        diagnosis = await llm_cache.get_or_generate("diagnose", prompt, partial(_generate_text, _diagnosis_model))
         
         return {
             "success": True,
-            "diagnosis": response.text,
+            "diagnosis": diagnosis,
             "confidence": 0.85,  # Would be calculated based on evidence
             "diagnosed_at": datetime.utcnow().isoformat()
         }
@@ -29,20 +29,26 @@ class SyncFilesRequest(BaseModel):
     repo: Optional[str] = None  # Repository name (defaults to configured)
 
 
+# Clients built once at import and shared by every request, so their connection
+# pools (and GitHub's keep-alive session) are reused
+_github = Github(settings.github_token) if settings.github_token else None
+_es = Elasticsearch(
+    hosts=[settings.elasticsearch_url],
+    api_key=settings.elasticsearch_api_key,
+    verify_certs=True
+)
+
+
 def get_github_client():
     """Get GitHub client"""
-    if not settings.github_token:
+    if not _github:
         raise HTTPException(status_code=503, detail="GitHub not configured")
-    return Github(settings.github_token)
+    return _github
 
 
 def get_es_client():
     """Get Elasticsearch client"""
-    return Elasticsearch(
-        hosts=[settings.elasticsearch_url],
-        api_key=settings.elasticsearch_api_key,
-        verify_certs=True
-    )
+    return _es
 
 
 @router.get("/repositories")
@@ -6,8 +6,9 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
-from elasticsearch import Elasticsearch
+from elasticsearch import AsyncElasticsearch
 from app.core.config import settings
+import asyncio
 import logging
 
 router = APIRouter(prefix="/api/incidents", tags=["incident-management"])
@@ -43,22 +44,31 @@ class TriggerWorkflowRequest(BaseModel):
     auto_approve: bool = False
 
 
+class TriggerWorkflowBatchRequest(BaseModel):
+    incidents: List[TriggerWorkflowRequest]
+
+
+# Shared async client: these handlers are also called in-process by the chat agent,
+# so a blocking search/index here would stall every other request on the event loop
+_es = AsyncElasticsearch(
+    hosts=[settings.elasticsearch_url],
+    api_key=settings.elasticsearch_api_key,
+    verify_certs=True
+)
+
+
 def get_es_client():
     """Get Elasticsearch client"""
-    return Elasticsearch(
-        hosts=[settings.elasticsearch_url],
-        api_key=settings.elasticsearch_api_key,
-        verify_certs=True
-    )
+    return _es
 
 
-def generate_incident_id():
+async def generate_incident_id():
     """Generate next incident ID"""
     es = get_es_client()
     
     # Get the highest incident ID
     try:
-        result = es.search(
+        result = await es.search(
             index='incident-history',
             body={
                 'query': {'match_all': {}},
@@ -92,12 +102,12 @@ def generate_incident_id():
         return "INC-1001"
 
 
-def generate_anomaly_id():
+async def generate_anomaly_id():
     """Generate next anomaly ID"""
     es = get_es_client()
     
     try:
-        result = es.search(
+        result = await es.search(
             index='anomaly-records',
             body={
                 'query': {'match_all': {}},
@@ -124,7 +134,7 @@ async def register_incident(request: RegisterIncidentRequest):
     es = get_es_client()
     
     # Generate incident ID
-    incident_id = generate_incident_id()
+    incident_id = await generate_incident_id()
     
     # Calculate deviation if values provided
     deviation_sigma = None
@@ -175,7 +185,7 @@ async def register_incident(request: RegisterIncidentRequest):
     
     try:
         # Index the incident
-        es.index(
+        await es.index(
             index='incident-history',
             document=incident,
             refresh=True
@@ -208,7 +218,7 @@ async def register_anomaly(request: RegisterAnomalyRequest):
     es = get_es_client()
     
     # Generate anomaly ID
-    anomaly_id = generate_anomaly_id()
+    anomaly_id = await generate_anomaly_id()
     
     # Calculate deviation
     deviation_sigma = abs(request.current_value - request.expected_value) / (request.expected_value * 0.1)
@@ -235,7 +245,7 @@ async def register_anomaly(request: RegisterAnomalyRequest):
     
     try:
         # Index the anomaly
-        es.index(
+        await es.index(
             index='anomaly-records',
             document=anomaly,
             refresh=True
@@ -265,13 +275,13 @@ async def trigger_autonomous_workflow(request: TriggerWorkflowRequest):
     """
     Trigger autonomous incident response workflow
     """
-    import httpx
+    from app.api import elasticseer_tools
     
     es = get_es_client()
     
     # Get incident details
     try:
-        result = es.search(
+        result = await es.search(
             index='incident-history',
             body={
                 'query': {'term': {'id': request.incident_id}},
@@ -300,7 +310,7 @@ async def trigger_autonomous_workflow(request: TriggerWorkflowRequest):
     
     # Search code-repository index
     try:
-        code_result = es.search(
+        code_result = await es.search(
             index='code-repository',
             body={
                 'query': {
@@ -338,28 +348,20 @@ async def trigger_autonomous_workflow(request: TriggerWorkflowRequest):
     
     if relevant_files:
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    "http://localhost:8001/api/elasticseer/generate_fix",
-                    json={
-                        "file_path": relevant_files[0].get('file_path', 'config.py'),
-                        "diagnosis": incident['diagnosis'].get('root_cause', 'Unknown issue'),
-                        "current_code": relevant_files[0].get('content', ''),
-                        "incident_context": incident.get('description', '')
-                    }
+            fix_result = await elasticseer_tools.generate_code_fix(
+                elasticseer_tools.GenerateFixRequest(
+                    file_path=relevant_files[0].get('file_path', 'config.py'),
+                    diagnosis=incident['diagnosis'].get('root_cause', 'Unknown issue'),
+                    current_code=relevant_files[0].get('content', ''),
+                    incident_context=incident.get('description', '')
                 )
-                
-                if response.status_code == 200:
-                    fix_result = response.json()
-                    fixed_code = fix_result.get('fixed_code', '')
-                    fix_explanation = fix_result.get('explanation', '')
-                    
-                    workflow_steps[-1]["status"] = "completed"
-                    workflow_steps[-1]["result"] = "Fix generated successfully"
-                else:
-                    workflow_steps[-1]["status"] = "failed"
-                    workflow_steps[-1]["error"] = f"API returned {response.status_code}"
-                    
+            )
+            fixed_code = fix_result.get('fixed_code', '')
+            fix_explanation = fix_result.get('explanation', '')
+            
+            workflow_steps[-1]["status"] = "completed"
+            workflow_steps[-1]["result"] = "Fix generated successfully"
+        
         except Exception as e:
             workflow_steps[-1]["status"] = "failed"
             workflow_steps[-1]["error"] = str(e)
@@ -379,12 +381,10 @@ async def trigger_autonomous_workflow(request: TriggerWorkflowRequest):
     
     if fixed_code and (request.auto_approve or True):  # For demo, always create PR
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    "http://localhost:8001/api/elasticseer/create_pr",
-                    json={
-                        "title": f"Fix {request.incident_id}: {incident['title']}",
-                        "description": f"""## Incident: {request.incident_id}
+            pr_result = await elasticseer_tools.create_github_pr(
+                elasticseer_tools.CreatePRRequest(
+                    title=f"Fix {request.incident_id}: {incident['title']}",
+                    description=f"""## Incident: {request.incident_id}
 
 **Service**: {incident['service']}
 **Severity**: {incident['severity']}
@@ -395,28 +395,22 @@ async def trigger_autonomous_workflow(request: TriggerWorkflowRequest):
 **Generated by**: ElasticSeer Autonomous Agent
 **Timestamp**: {datetime.utcnow().isoformat()}
 """,
-                        "branch_name": f"fix/{request.incident_id.lower()}-{datetime.utcnow().strftime('%Y%m%d%H%M')}",
-                        "files": [
-                            {
-                                "path": relevant_files[0].get('file_path', 'config.py') if relevant_files else 'config.py',
-                                "content": fixed_code
-                            }
-                        ],
-                        "incident_id": request.incident_id
-                    }
+                    branch_name=f"fix/{request.incident_id.lower()}-{datetime.utcnow().strftime('%Y%m%d%H%M')}",
+                    files=[
+                        elasticseer_tools.FileChange(
+                            path=relevant_files[0].get('file_path', 'config.py') if relevant_files else 'config.py',
+                            content=fixed_code
+                        )
+                    ],
+                    incident_id=request.incident_id
                 )
-                
-                if response.status_code == 200:
-                    pr_result = response.json()
-                    pr_url = pr_result.get('pr_url')
-                    
-                    workflow_steps[-1]["status"] = "completed"
-                    workflow_steps[-1]["result"] = f"PR #{pr_result.get('pr_number')} created"
-                    workflow_steps[-1]["pr_url"] = pr_url
-                else:
-                    workflow_steps[-1]["status"] = "failed"
-                    workflow_steps[-1]["error"] = f"API returned {response.status_code}"
-                    
+            )
+            pr_url = pr_result.get('pr_url')
+            
+            workflow_steps[-1]["status"] = "completed"
+            workflow_steps[-1]["result"] = f"PR #{pr_result.get('pr_number')} created"
+            workflow_steps[-1]["pr_url"] = pr_url
+        
         except Exception as e:
             workflow_steps[-1]["status"] = "failed"
             workflow_steps[-1]["error"] = str(e)
@@ -433,14 +427,12 @@ async def trigger_autonomous_workflow(request: TriggerWorkflowRequest):
     })
     
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
-                "http://localhost:8001/api/elasticseer/send_slack",
-                json={
-                    "severity": incident['severity'],
-                    "incident_id": request.incident_id,
-                    "title": f"✅ Automated Fix Created for {incident['title']}",
-                    "message": f"""**Incident**: {request.incident_id}
+        await elasticseer_tools.send_slack_notification(
+            elasticseer_tools.SlackNotificationRequest(
+                severity=incident['severity'],
+                incident_id=request.incident_id,
+                title=f"✅ Automated Fix Created for {incident['title']}",
+                message=f"""**Incident**: {request.incident_id}
 **Service**: {incident['service']}
 **Root Cause**: {incident['diagnosis'].get('root_cause', 'Under investigation')}
 
@@ -453,18 +445,13 @@ async def trigger_autonomous_workflow(request: TriggerWorkflowRequest):
 **PR**: {pr_url or 'Not created'}
 
 **Next Steps**: Please review and approve the PR for deployment.""",
-                    "action_required": True,
-                    "pr_url": pr_url
-                }
+                action_required=True,
+                pr_url=pr_url
             )
-            
-            if response.status_code == 200:
-                workflow_steps[-1]["status"] = "completed"
-                workflow_steps[-1]["result"] = "Notification sent to #general"
-            else:
-                workflow_steps[-1]["status"] = "failed"
-                workflow_steps[-1]["error"] = f"API returned {response.status_code}"
-                
+        )
+        workflow_steps[-1]["status"] = "completed"
+        workflow_steps[-1]["result"] = "Notification sent to #general"
+    
     except Exception as e:
         workflow_steps[-1]["status"] = "failed"
         workflow_steps[-1]["error"] = str(e)
@@ -480,7 +467,7 @@ async def trigger_autonomous_workflow(request: TriggerWorkflowRequest):
             }
             incident['status'] = 'remediating'
             
-            es.index(
+            await es.index(
                 index='incident-history',
                 id=result['hits']['hits'][0]['_id'],
                 document=incident,
@@ -504,6 +491,33 @@ async def trigger_autonomous_workflow(request: TriggerWorkflowRequest):
     }
 
 
+@router.post("/trigger_workflow_batch")
+async def trigger_autonomous_workflow_batch(request: TriggerWorkflowBatchRequest):
+    """
+    Trigger autonomous workflows for several incidents in one round trip.
+    Each result carries its own status code so one failing incident doesn't fail the batch.
+    """
+    outcomes = await asyncio.gather(
+        *(trigger_autonomous_workflow(item) for item in request.incidents),
+        return_exceptions=True
+    )
+    
+    results = []
+    for item, outcome in zip(request.incidents, outcomes):
+        if isinstance(outcome, HTTPException):
+            results.append({"incident_id": item.incident_id, "status_code": outcome.status_code, "error": outcome.detail})
+        elif isinstance(outcome, Exception):
+            results.append({"incident_id": item.incident_id, "status_code": 500, "error": str(outcome)})
+        else:
+            results.append({"incident_id": item.incident_id, "status_code": 200, "workflow": outcome})
+    
+    return {
+        "success": True,
+        "count": len(results),
+        "results": results
+    }
+
+
 @router.get("/list")
 async def list_recent_incidents(limit: int = 10):
     """
@@ -512,7 +526,7 @@ async def list_recent_incidents(limit: int = 10):
     es = get_es_client()
     
     try:
-        result = es.search(
+        result = await es.search(
             index='incident-history',
             body={
                 'query': {'match_all': {}},
@@ -7,9 +7,8 @@ from fastapi import APIRouter, Request, BackgroundTasks
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
 import logging
-import httpx
-from app.core.config import settings
 from app.api.agent_chat_with_reasoning import ChatRequest, ChatMessage, chat_with_reasoning
+from app.api.elasticseer_tools import post_slack_message
 
 logger = logging.getLogger(__name__)
 
@@ -55,37 +54,21 @@ async def process_slack_mention(event_data: Dict[str, Any]):
             slack_message += "🔍 *Reasoning Trace populated in dashboard*"
             
         # Send back to Slack
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            await client.post(
-                "https://slack.com/api/chat.postMessage",
-                headers={
-                    "Authorization": f"Bearer {settings.slack_bot_token}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "channel": channel,
-                    "thread_ts": thread_ts,
-                    "text": slack_message,
-                    "mrkdwn": True
-                }
-            )
-            
+        await post_slack_message({
+            "channel": channel,
+            "thread_ts": thread_ts,
+            "text": slack_message,
+            "mrkdwn": True
+        })
+    
     except Exception as e:
         logger.error(f"Error processing Slack mention: {e}", exc_info=True)
         # Send error back to Slack
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            await client.post(
-                "https://slack.com/api/chat.postMessage",
-                headers={
-                    "Authorization": f"Bearer {settings.slack_bot_token}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "channel": channel,
-                    "thread_ts": thread_ts,
-                    "text": f"❌ Sorry, I encountered an error processing your request: {str(e)}"
-                }
-            )
+        await post_slack_message({
+            "channel": channel,
+            "thread_ts": thread_ts,
+            "text": f"❌ Sorry, I encountered an error processing your request: {str(e)}"
+        })
 
 @router.post("/events")
 async def slack_events(request: Request, background_tasks: BackgroundTasks):
@@ -38,6 +38,25 @@ class Settings(BaseSettings):
     check_interval_seconds: int = 60
     baseline_window_days: int = 7
     approval_timeout_minutes: int = 30
+    # Call the local action endpoints (GitHub, Slack, Jira, ...) in-process from the
+    # agent rather than over HTTP; disable if they run as a separate service
+    local_actions_in_process: bool = True
+    # Return from autonomous_incident_response once the incident is registered and run
+    # the remaining steps (code search, PR, Jira, Slack) in the background
+    autonomous_workflow_background: bool = True
+    # Size of the default thread pool used by asyncio.to_thread / run_in_executor for
+    # blocking SDK calls (Elasticsearch, PyGithub)
+    default_executor_workers: int = 32
+    # Concurrent Gemini requests / downstream HTTP calls from the agent, and how long a
+    # request waits for a free slot before failing with 503
+    gemini_concurrency: int = 8
+    http_concurrency: int = 32
+    concurrency_wait_seconds: float = 10.0
+    # Cached Gemini fix/diagnosis responses for identical prompts
+    llm_cache_max_entries: int = 256
+    llm_cache_ttl_seconds: float = 3600.0
+    # Window in which Slack notifications for the same incident are merged into one post
+    slack_batch_window_seconds: float = 0.5
     
     class Config:
         env_file = ".env"
@@ -2,14 +2,21 @@
 ElasticSeer - Autonomous Remediation Platform
 FastAPI application entry point
 """
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from app.core.config import settings
 from app.api import elasticseer_tools, agent_chat_gemini, rich_analysis, agent_chat_enhanced, incident_management, github_integration
 
 app = FastAPI(
     title="ElasticSeer",
     description="Autonomous remediation platform with multi-agent architecture",
-    version="0.1.0"
+    version="0.1.0",
+    # orjson serializes the large nested function_results payloads several times faster
+    default_response_class=ORJSONResponse
 )
 
 # Configure CORS
@@ -21,6 +28,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress large JSON/markdown payloads (also shrinks internal localhost:8001 calls,
+# since httpx sends Accept-Encoding: gzip by default)
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
 # Include routers
 app.include_router(elasticseer_tools.router)
 app.include_router(agent_chat_gemini.router)  # Gemini + Elastic MCP = Best of both worlds!
@@ -46,6 +57,13 @@ app.include_router(slack_events.router)  # Slack events for bidirectional intera
 from app.api import stats
 app.include_router(stats.router)  # Dashboard stats aggregation
 
+@app.on_event("startup")
+async def configure_default_executor():
+    """Size the default executor so bursts of blocking calls don't queue behind each other"""
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=settings.default_executor_workers)
+    )
+
 @app.get("/")
 async def root():
     return {"message": "ElasticSeer API - Gemini Intelligence + Elastic MCP Data + Autonomous Workflows + GitHub Integration", "status": "running"}
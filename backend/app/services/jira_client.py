@@ -6,6 +6,7 @@ Handles Jira ticket creation and management for incident tracking
 
 import httpx
 import logging
+import orjson
 import base64
 from typing import Dict, Any, Optional, List
 from datetime import datetime
@@ -23,10 +24,20 @@ class JiraClient:
         self.project = settings.jira_project
         self.email = settings.jira_email if hasattr(settings, 'jira_email') else None
         self.enabled = bool(self.base_url and self.token)
+        # One pooled client for all Jira calls instead of a new connection per request
+        self._client = httpx.AsyncClient(
+            timeout=httpx.Timeout(30.0, connect=5.0),
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=100, keepalive_expiry=30.0),
+            http2=True
+        )
         
         if not self.enabled:
             logger.warning("Jira integration not configured - tickets will be logged to console only")
     
+    async def aclose(self):
+        """Close the underlying HTTP client"""
+        await self._client.aclose()
+    
     def _get_headers(self) -> Dict[str, str]:
         """Get authentication headers for Jira API"""
         # Jira Cloud uses Basic Auth with email:token
@@ -116,35 +127,34 @@ class JiraClient:
             }
             
             # Create ticket via Jira API
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    f"{self.base_url}/rest/api/3/issue",
-                    headers=self._get_headers(),
-                    json=payload
-                )
+            response = await self._client.post(
+                f"{self.base_url}/rest/api/3/issue",
+                headers=self._get_headers(),
+                content=orjson.dumps(payload)
+            )
+            
+            if response.status_code in [200, 201]:
+                data = response.json()
+                ticket_key = data.get("key")
+                ticket_url = f"{self.base_url}/browse/{ticket_key}"
                 
-                if response.status_code in [200, 201]:
-                    data = response.json()
-                    ticket_key = data.get("key")
-                    ticket_url = f"{self.base_url}/browse/{ticket_key}"
-                    
-                    logger.info(f"✅ Jira ticket created: {ticket_key}")
-                    
-                    return {
-                        "success": True,
-                        "ticket_id": ticket_key,
-                        "ticket_key": ticket_key,
-                        "url": ticket_url,
-                        "project": self.project,
-                        "priority": priority,
-                        "created_at": datetime.utcnow().isoformat()
-                    }
-                else:
-                    error_msg = response.text
-                    logger.error(f"Failed to create Jira ticket: {response.status_code} - {error_msg}")
-                    
-                    # Fallback to console logging
-                    return self._log_to_console(summary, description, priority, incident_id, labels, error=error_msg)
+                logger.info(f"✅ Jira ticket created: {ticket_key}")
+                
+                return {
+                    "success": True,
+                    "ticket_id": ticket_key,
+                    "ticket_key": ticket_key,
+                    "url": ticket_url,
+                    "project": self.project,
+                    "priority": priority,
+                    "created_at": datetime.utcnow().isoformat()
+                }
+            else:
+                error_msg = response.text
+                logger.error(f"Failed to create Jira ticket: {response.status_code} - {error_msg}")
+                
+                # Fallback to console logging
+                return self._log_to_console(summary, description, priority, incident_id, labels, error=error_msg)
         
         except Exception as e:
             logger.error(f"Error creating Jira ticket: {e}", exc_info=True)
@@ -313,19 +323,18 @@ class JiraClient:
                 "body": comment
             }
             
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    f"{self.base_url}/rest/api/3/issue/{ticket_id}/comment",
-                    headers=self._get_headers(),
-                    json=payload
-                )
-                
-                if response.status_code in [200, 201]:
-                    logger.info(f"✅ Comment added to {ticket_id}")
-                    return {"success": True, "ticket_id": ticket_id}
-                else:
-                    logger.error(f"Failed to add comment: {response.status_code}")
-                    return {"success": False, "error": response.text}
+            response = await self._client.post(
+                f"{self.base_url}/rest/api/3/issue/{ticket_id}/comment",
+                headers=self._get_headers(),
+                content=orjson.dumps(payload)
+            )
+            
+            if response.status_code in [200, 201]:
+                logger.info(f"✅ Comment added to {ticket_id}")
+                return {"success": True, "ticket_id": ticket_id}
+            else:
+                logger.error(f"Failed to add comment: {response.status_code}")
+                return {"success": False, "error": response.text}
         
         except Exception as e:
             logger.error(f"Error adding comment: {e}")
@@ -361,19 +370,18 @@ class JiraClient:
             
             payload = {"fields": fields}
             
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.put(
-                    f"{self.base_url}/rest/api/3/issue/{ticket_id}",
-                    headers=self._get_headers(),
-                    json=payload
-                )
-                
-                if response.status_code == 204:
-                    logger.info(f"✅ Ticket {ticket_id} updated")
-                    return {"success": True, "ticket_id": ticket_id}
-                else:
-                    logger.error(f"Failed to update ticket: {response.status_code}")
-                    return {"success": False, "error": response.text}
+            response = await self._client.put(
+                f"{self.base_url}/rest/api/3/issue/{ticket_id}",
+                headers=self._get_headers(),
+                content=orjson.dumps(payload)
+            )
+            
+            if response.status_code == 204:
+                logger.info(f"✅ Ticket {ticket_id} updated")
+                return {"success": True, "ticket_id": ticket_id}
+            else:
+                logger.error(f"Failed to update ticket: {response.status_code}")
+                return {"success": False, "error": response.text}
         
         except Exception as e:
             logger.error(f"Error updating ticket: {e}")
@@ -386,28 +394,27 @@ class JiraClient:
             return {"success": False, "error": "Jira not configured"}
         
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get(
-                    f"{self.base_url}/rest/api/3/issue/{ticket_id}",
-                    headers=self._get_headers()
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    return {
-                        "success": True,
-                        "ticket": {
-                            "id": data.get("id"),
-                            "key": data.get("key"),
-                            "summary": data["fields"].get("summary"),
-                            "status": data["fields"]["status"].get("name"),
-                            "priority": data["fields"]["priority"].get("name"),
-                            "created": data["fields"].get("created"),
-                            "updated": data["fields"].get("updated")
-                        }
+            response = await self._client.get(
+                f"{self.base_url}/rest/api/3/issue/{ticket_id}",
+                headers=self._get_headers()
+            )
+            
+            if response.status_code == 200:
+                data = response.json()
+                return {
+                    "success": True,
+                    "ticket": {
+                        "id": data.get("id"),
+                        "key": data.get("key"),
+                        "summary": data["fields"].get("summary"),
+                        "status": data["fields"]["status"].get("name"),
+                        "priority": data["fields"]["priority"].get("name"),
+                        "created": data["fields"].get("created"),
+                        "updated": data["fields"].get("updated")
                     }
-                else:
-                    return {"success": False, "error": response.text}
+                }
+            else:
+                return {"success": False, "error": response.text}
         
         except Exception as e:
             logger.error(f"Error getting ticket: {e}")
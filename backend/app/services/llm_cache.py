@@ -0,0 +1,84 @@
+"""
+LLM Response Cache for ElasticSeer
+
+Caches Gemini responses by prompt so re-diagnosing the same anomaly or regenerating
+a fix for the same file and diagnosis skips the model call
+"""
+
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class LLMCache:
+    """In-process TTL/LRU cache of prompt -> response text"""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[bytes, Tuple[float, str]]" = OrderedDict()
+        # Identical prompts already being generated, so concurrent callers share one call
+        self._inflight: Dict[bytes, "asyncio.Future[str]"] = {}
+
+    @staticmethod
+    def _key(namespace: str, prompt: str) -> bytes:
+        return hashlib.blake2b(f"{namespace}\0{prompt.strip()}".encode(), digest_size=16).digest()
+
+    def get(self, namespace: str, prompt: str) -> Optional[str]:
+        """Cached response for prompt, if any"""
+        key = self._key(namespace, prompt)
+        cached = self._entries.get(key)
+        if cached and cached[0] > time.monotonic():
+            self._entries.move_to_end(key)
+            logger.info(f"LLM cache hit ({namespace})")
+            return cached[1]
+        return None
+
+    def put(self, namespace: str, prompt: str, text: str) -> None:
+        """Cache text as the response for prompt"""
+        self._put(self._key(namespace, prompt), text)
+
+    async def get_or_generate(
+        self,
+        namespace: str,
+        prompt: str,
+        generate: Callable[[str], Awaitable[str]]
+    ) -> str:
+        """
+        Return the cached response for prompt, or call generate(prompt) and cache the
+        result. Failures are not cached.
+        """
+        cached = self.get(namespace, prompt)
+        if cached is not None:
+            return cached
+
+        key = self._key(namespace, prompt)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._generate(key, prompt, generate))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Shielded so one caller disconnecting doesn't cancel the call for the others
+        return await asyncio.shield(task)
+
+    async def _generate(self, key: bytes, prompt: str, generate: Callable[[str], Awaitable[str]]) -> str:
+        text = await generate(prompt)
+        if text:
+            self._put(key, text)
+        return text
+
+    def _put(self, key: bytes, text: str) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, text)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+# Global LLM cache instance
+llm_cache = LLMCache(settings.llm_cache_max_entries, settings.llm_cache_ttl_seconds)
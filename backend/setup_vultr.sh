@@ -41,7 +41,7 @@ User=$USER
 WorkingDirectory=$PROJECT_ROOT
 Environment=\"PATH=$PROJECT_ROOT/venv/bin\"
 EnvironmentFile=$PROJECT_ROOT/.env
-ExecStart=$PROJECT_ROOT/venv/bin/uvicorn app.main:app --host 0.0.0.0 --port 8001
+ExecStart=$PROJECT_ROOT/venv/bin/uvicorn app.main:app --host 0.0.0.0 --port 8001 --loop uvloop
 
 [Install]
 WantedBy=multi-user.target"